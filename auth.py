@@ -1,9 +1,112 @@
+import asyncio
 import bcrypt
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dotenv import load_dotenv
+from sqlalchemy.util.concurrency import await_only, in_greenlet
+from metricas import medir
 
-def hash_password(password: str) -> str:
+load_dotenv()
+
+# Pool dedicado para bcrypt: acota cuántos hashes corren y esperan a la vez
+BCRYPT_WORKERS = int(os.getenv("BCRYPT_WORKERS", "2"))
+BCRYPT_MAX_QUEUE = int(os.getenv("BCRYPT_MAX_QUEUE", "16"))
+
+
+class HashingPoolBusy(Exception):
+    pass
+
+
+class HashingPool:
+    def __init__(self, workers: int, max_queue: int):
+        self.workers = workers
+        self.max_queue = max_queue
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="bcrypt")
+        # Lugares disponibles = workers ocupados + cola de espera
+        self._lugares = threading.BoundedSemaphore(workers + max_queue)
+        self._lock = threading.Lock()
+        self._en_cola = 0
+        self._en_ejecucion = 0
+        self._completadas = 0
+        self._rechazadas = 0
+        self._espera_total = 0.0
+        self._espera_max = 0.0
+        self._duracion_total = 0.0
+        self._duracion_max = 0.0
+
+    def run(self, fn, *args):
+        if not self._lugares.acquire(blocking=False):
+            with self._lock:
+                self._rechazadas += 1
+            raise HashingPoolBusy("Pool de hashing saturado")
+
+        encolado = time.perf_counter()
+        with self._lock:
+            self._en_cola += 1
+
+        def tarea():
+            inicio = time.perf_counter()
+            with self._lock:
+                self._en_cola -= 1
+                self._en_ejecucion += 1
+            try:
+                return fn(*args)
+            finally:
+                fin = time.perf_counter()
+                espera = inicio - encolado
+                duracion = fin - inicio
+                with self._lock:
+                    self._en_ejecucion -= 1
+                    self._completadas += 1
+                    self._espera_total += espera
+                    self._espera_max = max(self._espera_max, espera)
+                    self._duracion_total += duracion
+                    self._duracion_max = max(self._duracion_max, duracion)
+
+        try:
+            future = self._executor.submit(tarea)
+            if in_greenlet():
+                # Dentro de AsyncSession.run_sync: esperar sin bloquear el event loop
+                return await_only(asyncio.wrap_future(future))
+            return future.result()
+        finally:
+            self._lugares.release()
+
+    def stats(self) -> dict:
+        with self._lock:
+            completadas = self._completadas
+            return {
+                "workers": self.workers,
+                "max_cola": self.max_queue,
+                "en_cola": self._en_cola,
+                "en_ejecucion": self._en_ejecucion,
+                "completadas": completadas,
+                "rechazadas": self._rechazadas,
+                "espera_promedio_ms": round(self._espera_total / completadas * 1000, 3) if completadas else 0.0,
+                "espera_max_ms": round(self._espera_max * 1000, 3),
+                "duracion_promedio_ms": round(self._duracion_total / completadas * 1000, 3) if completadas else 0.0,
+                "duracion_max_ms": round(self._duracion_max * 1000, 3),
+            }
+
+
+hashing_pool = HashingPool(BCRYPT_WORKERS, BCRYPT_MAX_QUEUE)
+
+
+def _hash(password: str) -> str:
     salt = bcrypt.gensalt()
     hashed = bcrypt.hashpw(password.encode("utf-8"), salt)
     return hashed.decode("utf-8")
 
-def verify_password(password: str, hashed: str) -> bool:
+def _verify(password: str, hashed: str) -> bool:
     return bcrypt.checkpw(password.encode("utf-8"), hashed.encode("utf-8"))
+
+# El tiempo medido incluye la espera en la cola del pool: es lo que paga el request
+def hash_password(password: str) -> str:
+    with medir("bcrypt"):
+        return hashing_pool.run(_hash, password)
+
+def verify_password(password: str, hashed: str) -> bool:
+    with medir("bcrypt"):
+        return hashing_pool.run(_verify, password, hashed)
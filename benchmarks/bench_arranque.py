@@ -0,0 +1,74 @@
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import textwrap
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Arranque en frío de la app, cada medición en un proceso nuevo:
+#   importar: import main (módulos, modelos, rutas; no debe abrir conexiones)
+#   lifespan: arranque de la app hasta poder atender (motor, cola de correo, captcha, recordatorios)
+#   primera_respuesta: GET / ya arrancada
+#   primera_consulta: primer endpoint que usa la base (abre la primera conexión del pool)
+#   python benchmarks/bench_arranque.py --repeticiones 10
+
+SCRIPT = textwrap.dedent("""
+    import json, time
+    inicio = time.perf_counter()
+    import main
+    importar = time.perf_counter()
+    from fastapi.testclient import TestClient
+    import db
+    conexiones_al_importar = db.pool_stats.conexiones_creadas
+    cliente_listo = time.perf_counter()
+    with TestClient(main.app) as c:
+        lifespan = time.perf_counter()
+        assert c.get("/").status_code == 200
+        primera_respuesta = time.perf_counter()
+        assert c.get("/proyectos", headers={"x-user-mail": "nadie@test.com"}).status_code == 404
+        primera_consulta = time.perf_counter()
+    print(json.dumps({
+        "importar": (importar - inicio) * 1000,
+        "lifespan": (lifespan - cliente_listo) * 1000,
+        "primera_respuesta": (primera_respuesta - lifespan) * 1000,
+        "primera_consulta": (primera_consulta - primera_respuesta) * 1000,
+        "conexiones_al_importar": conexiones_al_importar,
+    }))
+""")
+
+ETAPAS = ["importar", "lifespan", "primera_respuesta", "primera_consulta"]
+
+
+def _medir(env) -> dict:
+    resultado = subprocess.run(
+        [sys.executable, "-c", SCRIPT], cwd=RAIZ, env=env, capture_output=True, text=True, timeout=120, check=True
+    )
+    return json.loads(resultado.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--repeticiones", type=int, default=10)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directorio:
+        env = dict(os.environ)
+        env["SUPABASE_DB_URL"] = f"sqlite:///{os.path.join(directorio, 'arranque.db')}"
+        env["RECORDATORIOS_ACTIVO"] = "false"
+        # El esquema se aplica una vez, fuera de la medición, como en un deploy
+        subprocess.run([sys.executable, "migraciones.py"], cwd=RAIZ, env=env, capture_output=True, check=True)
+        muestras = [_medir(env) for _ in range(args.repeticiones)]
+
+    assert all(m["conexiones_al_importar"] == 0 for m in muestras), "import main abrió conexiones a la base"
+    print(f"{'etapa':>18} {'min ms':>9} {'mediana ms':>11} {'max ms':>9}")
+    for etapa in ETAPAS:
+        valores = [m[etapa] for m in muestras]
+        print(f"{etapa:>18} {min(valores):>9.1f} {statistics.median(valores):>11.1f} {max(valores):>9.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("SUPABASE_DB_URL", "sqlite://")
+
+from typing import List
+from fastapi.responses import JSONResponse
+from fastapi.routing import serialize_response
+from fastapi.utils import create_model_field
+from schemas import TareaResponse, TareasAdapter
+from serializacion import RespuestaLista
+
+# Compara la serialización de listar_tareas_proyecto: camino de FastAPI (response_model + json.dumps)
+# contra RespuestaLista (TypeAdapter precompilado, JSON en Rust)
+#   python benchmarks/bench_serializacion.py --filas 1000 10000 100000
+
+
+def _filas(n: int) -> List[dict]:
+    base = datetime(2025, 1, 1)
+    return [{
+        "id": i,
+        "id_proyecto": 1,
+        "titulo": f"Tarea {i}",
+        "descripcion": "Descripción de la tarea número %d" % i,
+        "estado": "pendiente",
+        "fecha_creacion": base + timedelta(seconds=i),
+        "fecha_limite": base + timedelta(days=30),
+        "responsables": [{"id": i % 50, "nombre": f"Usuario {i % 50}"}],
+    } for i in range(n)]
+
+
+def _fastapi(campo, filas) -> bytes:
+    contenido = asyncio.run(serialize_response(field=campo, response_content=filas))
+    return JSONResponse(contenido).body
+
+def _rapida(filas) -> bytes:
+    return RespuestaLista(TareasAdapter, filas).body
+
+
+def _medir(fn, repeticiones: int) -> float:
+    mejor = float("inf")
+    for _ in range(repeticiones):
+        inicio = time.perf_counter()
+        fn()
+        mejor = min(mejor, time.perf_counter() - inicio)
+    return mejor
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--filas", type=int, nargs="+", default=[1000, 10000, 100000])
+    parser.add_argument("--repeticiones", type=int, default=5)
+    args = parser.parse_args()
+
+    campo = create_model_field(name="Response_listar_tareas", type_=List[TareaResponse], mode="serialization")
+    print(f"{'filas':>8} {'fastapi ms':>12} {'rapida ms':>12} {'speedup':>8}")
+    for n in args.filas:
+        filas = _filas(n)
+        assert json.loads(_fastapi(campo, filas)) == json.loads(_rapida(filas))
+        t_fastapi = _medir(lambda: _fastapi(campo, filas), args.repeticiones)
+        t_rapida = _medir(lambda: _rapida(filas), args.repeticiones)
+        print(f"{n:>8} {t_fastapi * 1000:>12.1f} {t_rapida * 1000:>12.1f} {t_fastapi / t_rapida:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
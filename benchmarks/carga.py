@@ -0,0 +1,297 @@
+import argparse
+import asyncio
+import json
+import os
+import random
+import socket
+import statistics
+import sys
+import tempfile
+import threading
+import time
+from collections import defaultdict
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Prueba de carga reproducible: levanta la app con uvicorn contra una base SQLite local sembrada,
+# genera tráfico mixto con clientes concurrentes y reporta latencias por endpoint
+#   python benchmarks/carga.py --usuarios 200 --proyectos 50 --tareas 200 --clientes 16 --solicitudes 5000 \
+#       --salida carga.json [--baseline carga-base.json --tolerancia 0.2]
+# Con la misma semilla y volúmenes, la base y la secuencia de operaciones son las mismas entre corridas
+
+CLAVE = "clave-de-carga"
+
+# Operación -> peso en la mezcla de tráfico
+MEZCLA = {
+    "login": 10,
+    "listar_proyectos": 20,
+    "listar_tareas": 40,
+    "crear_tarea": 15,
+    "cambiar_estado": 15,
+}
+ESTADOS = ["sin asignar", "pendiente", "en progreso", "completado"]
+PERCENTILES = (50, 95, 99)
+
+
+# ---------------------------
+# Datos sembrados
+# ---------------------------
+
+def correo_usuario(i: int) -> str:
+    return f"carga{i}@test.com"
+
+def sembrar(engine, usuarios: int, proyectos: int, integrantes: int, tareas: int, semilla: int) -> dict:
+    import bcrypt
+    from sqlalchemy import insert
+    from sqlalchemy.orm import Session
+    from models import Usuario, Proyecto, ProyectoIntegrante, Tarea, TareaResponsable, RolProyecto, EstadoTarea
+    from utils import en_lotes
+    import estadisticas
+
+    azar = random.Random(semilla)
+    # Un solo hash: bcrypt por usuario haría la siembra más lenta que la prueba
+    contrasena = bcrypt.hashpw(CLAVE.encode("utf-8"), bcrypt.gensalt()).decode("utf-8")
+    base = datetime(2025, 1, 1)
+    miembros = {}
+    with engine.begin() as conn:
+        for lote in en_lotes({"id": u, "correo": correo_usuario(u), "nombre": f"Usuario {u}", "contrasena": contrasena,
+                              "intentos_fallidos": 0, "bloqueado": False} for u in range(1, usuarios + 1)):
+            conn.execute(insert(Usuario), lote)
+
+        filas_proyectos, filas_integrantes = [], []
+        for p in range(1, proyectos + 1):
+            dueño = (p - 1) % usuarios + 1
+            otros = azar.sample([u for u in range(1, usuarios + 1) if u != dueño], min(integrantes, usuarios - 1))
+            miembros[p] = [dueño] + otros
+            filas_proyectos.append({"id": p, "nombre": f"Proyecto {p}", "id_dueño": dueño, "version": 0,
+                                    "fecha_creacion": base, "fecha_limite": base + timedelta(days=azar.randint(1, 365))})
+            filas_integrantes.append({"id_proyecto": p, "id_usuario": dueño, "rol": RolProyecto.dueño})
+            filas_integrantes.extend({"id_proyecto": p, "id_usuario": u, "rol": RolProyecto.editor} for u in otros)
+        for lote in en_lotes(filas_proyectos):
+            conn.execute(insert(Proyecto), lote)
+        for lote in en_lotes(filas_integrantes):
+            conn.execute(insert(ProyectoIntegrante), lote)
+
+        estados = list(EstadoTarea)
+        filas_tareas, filas_responsables = [], []
+        for p in range(1, proyectos + 1):
+            for i in range(tareas):
+                tid = (p - 1) * tareas + i + 1
+                filas_tareas.append({
+                    "id": tid, "id_proyecto": p, "titulo": f"Tarea {tid}", "descripcion": f"Descripción de la tarea {tid}",
+                    "estado": azar.choice(estados), "fecha_creacion": base + timedelta(minutes=tid),
+                    "fecha_limite": base + timedelta(days=azar.randint(1, 365)) if azar.random() < 0.7 else None,
+                })
+                filas_responsables.append({"id_tarea": tid, "id_usuario": azar.choice(miembros[p])})
+        for lote in en_lotes(filas_tareas):
+            conn.execute(insert(Tarea), lote)
+        for lote in en_lotes(filas_responsables):
+            conn.execute(insert(TareaResponsable), lote)
+
+    with Session(bind=engine) as db:
+        estadisticas.reconstruir(db)
+    return {"miembros": miembros, "tareas": tareas}
+
+
+# ---------------------------
+# Servidor
+# ---------------------------
+
+def _puerto_libre() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+def levantar_servidor(app, puerto: int):
+    import uvicorn
+
+    servidor = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=puerto, log_level="warning", lifespan="on"))
+    hilo = threading.Thread(target=servidor.run, name="uvicorn-carga", daemon=True)
+    hilo.start()
+    limite = time.monotonic() + 30
+    while not servidor.started:
+        if not hilo.is_alive() or time.monotonic() > limite:
+            raise RuntimeError("No arrancó el servidor de la prueba de carga")
+        time.sleep(0.01)
+    return servidor, hilo
+
+
+# ---------------------------
+# Tráfico
+# ---------------------------
+
+def plan_operaciones(datos: dict, usuarios: int, solicitudes: int, semilla: int) -> list:
+    azar = random.Random(semilla + 1)
+    nombres, pesos = list(MEZCLA), list(MEZCLA.values())
+    proyectos = list(datos["miembros"])
+    plan = []
+    for n in range(solicitudes):
+        operacion = azar.choices(nombres, pesos)[0]
+        p = azar.choice(proyectos)
+        correo = correo_usuario(azar.choice(datos["miembros"][p]))
+        if operacion == "login":
+            plan.append((operacion, "POST", "/login", {}, {"correo": correo_usuario(azar.randint(1, usuarios)), "contraseña": CLAVE}))
+        elif operacion == "listar_proyectos":
+            plan.append((operacion, "GET", "/proyectos", {"x-user-mail": correo}, None))
+        elif operacion == "listar_tareas":
+            plan.append((operacion, "GET", f"/proyectos/{p}/tareas?limite=100", {"x-user-mail": correo}, None))
+        elif operacion == "crear_tarea":
+            plan.append((operacion, "POST", f"/proyectos/{p}/tareas", {"x-user-email": correo}, {"titulo": f"Carga {n}"}))
+        else:
+            tid = (p - 1) * datos["tareas"] + azar.randint(1, datos["tareas"])
+            plan.append((operacion, "PUT", f"/proyectos/{p}/tareas/{tid}/estado", {"x-user-mail": correo},
+                         {"estado": azar.choice(ESTADOS)}))
+    return plan
+
+async def ejecutar(url: str, plan: list, clientes: int) -> tuple:
+    import httpx
+    from metricas import consultas_de_server_timing
+
+    muestras = defaultdict(list)
+    errores = defaultdict(int)
+    pendientes = iter(plan)
+
+    async def cliente(http):
+        for operacion, metodo, ruta, headers, cuerpo in pendientes:
+            inicio = time.perf_counter()
+            r = await http.request(metodo, ruta, headers=headers, json=cuerpo)
+            duracion = time.perf_counter() - inicio
+            if r.status_code >= 400:
+                errores[operacion] += 1
+            # Consultas del request según el header Server-Timing de metricas.py
+            muestras[operacion].append((duracion, consultas_de_server_timing(r.headers.get("server-timing"))))
+
+    limites = httpx.Limits(max_connections=clientes, max_keepalive_connections=clientes)
+    async with httpx.AsyncClient(base_url=url, limits=limites, timeout=60) as http:
+        inicio = time.perf_counter()
+        await asyncio.gather(*(cliente(http) for _ in range(clientes)))
+        total = time.perf_counter() - inicio
+    return muestras, errores, total
+
+
+# ---------------------------
+# Resultados
+# ---------------------------
+
+def percentil(valores: list, p: float) -> float:
+    ordenados = sorted(valores)
+    k = (len(ordenados) - 1) * p / 100
+    inferior = int(k)
+    superior = min(inferior + 1, len(ordenados) - 1)
+    return ordenados[inferior] + (ordenados[superior] - ordenados[inferior]) * (k - inferior)
+
+def resumir(muestras: dict, errores: dict, duracion: float) -> dict:
+    endpoints = {}
+    for operacion, filas in sorted(muestras.items()):
+        latencias = [d * 1000 for d, _ in filas]
+        consultas = [c for _, c in filas if c is not None]
+        endpoints[operacion] = {
+            "solicitudes": len(filas),
+            "errores": errores.get(operacion, 0),
+            "throughput_rps": round(len(filas) / duracion, 2),
+            "media_ms": round(statistics.fmean(latencias), 3),
+            **{f"p{p}_ms": round(percentil(latencias, p), 3) for p in PERCENTILES},
+            "consultas_por_request": round(statistics.fmean(consultas), 2) if consultas else None,
+        }
+    todas = [d * 1000 for filas in muestras.values() for d, _ in filas]
+    total = {
+        "solicitudes": len(todas),
+        "errores": sum(errores.values()),
+        "duracion_s": round(duracion, 3),
+        "throughput_rps": round(len(todas) / duracion, 2),
+        **{f"p{p}_ms": round(percentil(todas, p), 3) for p in PERCENTILES},
+    }
+    return {"endpoints": endpoints, "total": total}
+
+def comparar(actual: dict, base: dict, tolerancia: float) -> list:
+    # Regresiones: p95 más lento o throughput más bajo que la baseline, más allá de la tolerancia
+    regresiones = []
+    print(f"\n{'endpoint':>18} {'p95 base':>10} {'p95 actual':>11} {'Δ':>8} {'rps base':>10} {'rps actual':>11} {'Δ':>8}")
+    filas = {**actual["endpoints"], "total": actual["total"]}
+    filas_base = {**base["endpoints"], "total": base["total"]}
+    for nombre, datos in filas.items():
+        previo = filas_base.get(nombre)
+        if previo is None:
+            continue
+        d_p95 = datos["p95_ms"] / previo["p95_ms"] - 1 if previo["p95_ms"] else 0.0
+        d_rps = datos["throughput_rps"] / previo["throughput_rps"] - 1 if previo["throughput_rps"] else 0.0
+        print(f"{nombre:>18} {previo['p95_ms']:>10.1f} {datos['p95_ms']:>11.1f} {d_p95:>+8.1%} "
+              f"{previo['throughput_rps']:>10.1f} {datos['throughput_rps']:>11.1f} {d_rps:>+8.1%}")
+        if d_p95 > tolerancia or d_rps < -tolerancia:
+            regresiones.append(nombre)
+    return regresiones
+
+def imprimir(resultado: dict):
+    columnas = ["solicitudes", "errores", "throughput_rps", "p50_ms", "p95_ms", "p99_ms", "consultas_por_request"]
+    print(f"{'endpoint':>18} " + " ".join(f"{c:>{max(len(c), 9)}}" for c in columnas))
+    for nombre, datos in resultado["endpoints"].items():
+        valores = [datos[c] if datos[c] is not None else "-" for c in columnas]
+        print(f"{nombre:>18} " + " ".join(f"{v:>{max(len(c), 9)}}" for c, v in zip(columnas, valores)))
+    t = resultado["total"]
+    print(f"\nTotal: {t['solicitudes']} solicitudes en {t['duracion_s']} s, {t['throughput_rps']} req/s, "
+          f"p50 {t['p50_ms']} ms, p95 {t['p95_ms']} ms, p99 {t['p99_ms']} ms, errores {t['errores']}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Prueba de carga HTTP con datos sembrados")
+    parser.add_argument("--usuarios", type=int, default=200)
+    parser.add_argument("--proyectos", type=int, default=50)
+    parser.add_argument("--integrantes", type=int, default=4, help="integrantes por proyecto además del dueño")
+    parser.add_argument("--tareas", type=int, default=200, help="tareas por proyecto")
+    parser.add_argument("--clientes", type=int, default=16)
+    parser.add_argument("--solicitudes", type=int, default=2000)
+    parser.add_argument("--calentamiento", type=int, default=100, help="solicitudes previas que no se miden")
+    parser.add_argument("--semilla", type=int, default=1)
+    parser.add_argument("--salida", help="archivo JSON con los resultados")
+    parser.add_argument("--baseline", help="JSON de una corrida anterior para comparar")
+    parser.add_argument("--tolerancia", type=float, default=0.2)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directorio:
+        # La configuración se lee al importar: se fija antes de cargar la app
+        os.environ["SUPABASE_DB_URL"] = f"sqlite:///{os.path.join(directorio, 'carga.db')}"
+        os.environ["RATE_LIMIT_ACTIVO"] = "false"
+        os.environ["RECORDATORIOS_ACTIVO"] = "false"
+        import db
+        from main import app
+        from migraciones import migrar
+
+        engine = db.iniciar_engine()
+        migrar(engine)
+        inicio = time.perf_counter()
+        datos = sembrar(engine, args.usuarios, args.proyectos, args.integrantes, args.tareas, args.semilla)
+        print(f"Base sembrada en {time.perf_counter() - inicio:.1f} s")
+
+        puerto = _puerto_libre()
+        servidor, hilo = levantar_servidor(app, puerto)
+        try:
+            url = f"http://127.0.0.1:{puerto}"
+            plan = plan_operaciones(datos, args.usuarios, args.calentamiento + args.solicitudes, args.semilla)
+            asyncio.run(ejecutar(url, plan[:args.calentamiento], args.clientes))
+            muestras, errores, duracion = asyncio.run(ejecutar(url, plan[args.calentamiento:], args.clientes))
+        finally:
+            servidor.should_exit = True
+            hilo.join(30)
+            engine.dispose()
+
+    resultado = resumir(muestras, errores, duracion)
+    resultado["config"] = {k: getattr(args, k) for k in
+                           ("usuarios", "proyectos", "integrantes", "tareas", "clientes", "solicitudes", "semilla")}
+    resultado["config"]["db_async"] = db.DB_ASYNC
+    resultado["fecha"] = datetime.now().isoformat(timespec="seconds")
+    imprimir(resultado)
+
+    if args.salida:
+        with open(args.salida, "w", encoding="utf-8") as f:
+            json.dump(resultado, f, indent=2, ensure_ascii=False)
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            regresiones = comparar(resultado, json.load(f), args.tolerancia)
+        if regresiones:
+            print("\nRegresiones: " + ", ".join(regresiones))
+            raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
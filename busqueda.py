@@ -0,0 +1,101 @@
+import re
+from sqlalchemy import text
+
+# Búsqueda de texto completo sobre título y descripción de tareas.
+# PostgreSQL: columna generada tareas.busqueda (tsvector) con índice GIN.
+# SQLite: tabla FTS5 tareas_fts de contenido externo, mantenida con triggers.
+# Ambos índices se crean en la migración 6 (migraciones.py)
+
+BUSQUEDA_CONFIG_PG = "spanish"
+# Términos que se toman de la consulta del usuario
+BUSQUEDA_MAX_TERMINOS = 10
+
+_PALABRA = re.compile(r"\w+", re.UNICODE)
+
+
+def terminos(consulta: str) -> list:
+    # Solo palabras: la sintaxis de MATCH / to_tsquery nunca llega desde el cliente
+    return _PALABRA.findall(consulta or "")[:BUSQUEDA_MAX_TERMINOS]
+
+
+def crear_indice(conn):
+    dialecto = conn.dialect.name
+    if dialecto == "postgresql":
+        conn.execute(text(
+            "ALTER TABLE tareas ADD COLUMN IF NOT EXISTS busqueda tsvector GENERATED ALWAYS AS ("
+            f"to_tsvector('{BUSQUEDA_CONFIG_PG}', coalesce(titulo, '') || ' ' || coalesce(descripcion, ''))"
+            ") STORED"
+        ))
+        conn.execute(text("CREATE INDEX IF NOT EXISTS ix_tareas_busqueda ON tareas USING GIN (busqueda)"))
+    elif dialecto == "sqlite":
+        conn.execute(text(
+            "CREATE VIRTUAL TABLE IF NOT EXISTS tareas_fts USING fts5("
+            "titulo, descripcion, content='tareas', content_rowid='id', tokenize='unicode61 remove_diacritics 2')"
+        ))
+        conn.execute(text(
+            "CREATE TRIGGER IF NOT EXISTS tareas_fts_ai AFTER INSERT ON tareas BEGIN "
+            "INSERT INTO tareas_fts(rowid, titulo, descripcion) VALUES (new.id, new.titulo, new.descripcion); END"
+        ))
+        conn.execute(text(
+            "CREATE TRIGGER IF NOT EXISTS tareas_fts_ad AFTER DELETE ON tareas BEGIN "
+            "INSERT INTO tareas_fts(tareas_fts, rowid, titulo, descripcion) VALUES ('delete', old.id, old.titulo, old.descripcion); END"
+        ))
+        conn.execute(text(
+            "CREATE TRIGGER IF NOT EXISTS tareas_fts_au AFTER UPDATE OF titulo, descripcion ON tareas BEGIN "
+            "INSERT INTO tareas_fts(tareas_fts, rowid, titulo, descripcion) VALUES ('delete', old.id, old.titulo, old.descripcion); "
+            "INSERT INTO tareas_fts(rowid, titulo, descripcion) VALUES (new.id, new.titulo, new.descripcion); END"
+        ))
+        # Indexar las tareas existentes
+        conn.execute(text("INSERT INTO tareas_fts(tareas_fts) VALUES ('rebuild')"))
+    else:
+        raise NotImplementedError(f"Búsqueda no soportada para '{dialecto}'")
+
+
+def _consulta_sqlite(terminos_busqueda: list) -> tuple:
+    # "a" "b"* : todos los términos, el último como prefijo (búsqueda mientras se escribe)
+    expresion = " ".join(f'"{t}"' for t in terminos_busqueda) + "*"
+    coincidencias = (
+        "SELECT t.id, t.id_proyecto, p.nombre AS nombre_proyecto, t.titulo, t.descripcion, t.estado, "
+        "bm25(tareas_fts) AS puntaje "
+        "FROM tareas_fts JOIN tareas t ON t.id = tareas_fts.rowid "
+        "JOIN proyectos p ON p.id = t.id_proyecto "
+        'JOIN "ProyectoIntegrantes" pi ON pi.id_proyecto = t.id_proyecto '
+        "JOIN usuarios u ON u.id = pi.id_usuario "
+        "WHERE tareas_fts MATCH :expresion AND lower(u.correo) = :correo"
+    )
+    return coincidencias, expresion
+
+def _consulta_postgresql(terminos_busqueda: list) -> tuple:
+    expresion = " & ".join(terminos_busqueda) + ":*"
+    # ts_rank_cd crece con la relevancia: se niega para ordenar siempre de menor a mayor
+    coincidencias = (
+        "SELECT t.id, t.id_proyecto, p.nombre AS nombre_proyecto, t.titulo, t.descripcion, t.estado, "
+        "-ts_rank_cd(t.busqueda, q) AS puntaje "
+        f"FROM tareas t, to_tsquery('{BUSQUEDA_CONFIG_PG}', :expresion) q, proyectos p, \"ProyectoIntegrantes\" pi, usuarios u "
+        "WHERE t.busqueda @@ q AND p.id = t.id_proyecto AND pi.id_proyecto = t.id_proyecto "
+        "AND u.id = pi.id_usuario AND lower(u.correo) = :correo"
+    )
+    return coincidencias, expresion
+
+
+def buscar_tareas(db, correo: str, terminos_busqueda: list, limite: int, despues=None, proyecto_id: int = None) -> list:
+    # Devuelve hasta limite + 1 filas ordenadas por (puntaje, id); despues = (puntaje, id) del cursor
+    dialecto = db.get_bind().dialect.name
+    if dialecto == "postgresql":
+        coincidencias, expresion = _consulta_postgresql(terminos_busqueda)
+    elif dialecto == "sqlite":
+        coincidencias, expresion = _consulta_sqlite(terminos_busqueda)
+    else:
+        raise NotImplementedError(f"Búsqueda no soportada para '{dialecto}'")
+
+    parametros = {"expresion": expresion, "correo": correo.lower(), "limite": limite + 1}
+    condiciones = []
+    if proyecto_id is not None:
+        condiciones.append("r.id_proyecto = :proyecto_id")
+        parametros["proyecto_id"] = proyecto_id
+    if despues is not None:
+        condiciones.append("(r.puntaje > :puntaje OR (r.puntaje = :puntaje AND r.id > :id))")
+        parametros["puntaje"], parametros["id"] = despues
+    where = (" WHERE " + " AND ".join(condiciones)) if condiciones else ""
+    sql = f"SELECT * FROM ({coincidencias}) r{where} ORDER BY r.puntaje, r.id LIMIT :limite"
+    return db.execute(text(sql), parametros).all()
@@ -0,0 +1,119 @@
+import hashlib
+from datetime import datetime
+from typing import Iterable, Optional
+from sqlalchemy import select, update, insert
+from sqlalchemy.orm import selectinload
+from models import Proyecto, Cambio, Tarea, TareaResponsable, ProyectoIntegrante, Usuario
+from serializacion import tarea_a_fila
+from paginacion import codificar_cursor
+from eventos import encolar_evento
+from utils import en_lotes
+
+# Versión por proyecto: los endpoints que modifican tareas, responsables o integrantes la
+# incrementan dentro de su propia transacción. Los listados la usan para armar el ETag y
+# responder 304 con una sola consulta, sin cargar tareas ni integrantes.
+# Además cada cambio queda en la tabla append-only "cambios", que alimenta /proyectos/{id}/cambios
+
+
+def incrementar_version(db, proyecto_id: int):
+    db.execute(
+        update(Proyecto)
+        .where(Proyecto.id == proyecto_id)
+        .values(version=Proyecto.version + 1)
+        .execution_options(synchronize_session=False)
+    )
+
+def registrar_cambio(db, proyecto_id: int, entidad: str, ids: Iterable[int], operacion: str):
+    ids = list(dict.fromkeys(ids))
+    if not ids:
+        return
+    # Primero el UPDATE de la versión: bloquea la fila del proyecto hasta el commit, así los ids
+    # del registro quedan en el mismo orden en que se confirman las transacciones del proyecto
+    incrementar_version(db, proyecto_id)
+    ahora = datetime.now()
+    ids_cambio = db.execute(insert(Cambio).returning(Cambio.id), [
+        {"id_proyecto": proyecto_id, "entidad": entidad, "id_entidad": i, "operacion": operacion, "fecha": ahora}
+        for i in ids
+    ]).scalars().all()
+    # Se publica al confirmar la transacción (eventos.py)
+    encolar_evento(db, proyecto_id, {
+        "tipo": f"{entidad}.{operacion}", "entidad": entidad, "operacion": operacion,
+        "ids": ids, "cursor": codificar_cursor(max(ids_cambio)),
+    })
+
+def ultimo_cambio(db, proyecto_id: int) -> int:
+    return db.execute(
+        select(Cambio.id).where(Cambio.id_proyecto == proyecto_id).order_by(Cambio.id.desc()).limit(1)
+    ).scalar() or 0
+
+def cambios_desde(db, proyecto_id: int, desde: int, limite: int) -> dict:
+    filas = db.execute(
+        select(Cambio.id, Cambio.entidad, Cambio.id_entidad, Cambio.operacion)
+        .where(Cambio.id_proyecto == proyecto_id, Cambio.id > desde)
+        .order_by(Cambio.id)
+        .limit(limite + 1)
+    ).all()
+    hay_mas = len(filas) > limite
+    filas = filas[:limite]
+
+    # Varios cambios sobre la misma entidad se resumen en el último
+    ultima_operacion = {}
+    for fila in filas:
+        ultima_operacion[(fila.entidad, fila.id_entidad)] = fila.operacion
+    vivas = {"tarea": [], "integrante": []}
+    eliminadas = {"tarea": [], "integrante": []}
+    for (entidad, id_entidad), operacion in ultima_operacion.items():
+        (eliminadas if operacion == "baja" else vivas)[entidad].append(id_entidad)
+
+    tareas = []
+    for lote in en_lotes(sorted(vivas["tarea"])):
+        tareas += (
+            db.query(Tarea)
+            .options(selectinload(Tarea.responsables).joinedload(TareaResponsable.usuario))
+            .filter(Tarea.id_proyecto == proyecto_id, Tarea.id.in_(lote))
+            .order_by(Tarea.id)
+            .all()
+        )
+    integrantes = []
+    for lote in en_lotes(sorted(vivas["integrante"])):
+        integrantes += db.execute(
+            select(ProyectoIntegrante.rol, Usuario.id, Usuario.nombre, Usuario.correo)
+            .join(Usuario, Usuario.id == ProyectoIntegrante.id_usuario)
+            .where(ProyectoIntegrante.id_proyecto == proyecto_id, ProyectoIntegrante.id_usuario.in_(lote))
+            .order_by(Usuario.id)
+        ).all()
+
+    # Lo que ya no existe se borró después del último cambio leído: también es una baja
+    encontradas = {t.id for t in tareas}
+    encontrados = {i.id for i in integrantes}
+    return {
+        "cursor": filas[-1].id if filas else desde,
+        "hay_mas": hay_mas,
+        "tareas": [tarea_a_fila(t) for t in tareas],
+        "tareas_eliminadas": sorted(eliminadas["tarea"] + [i for i in vivas["tarea"] if i not in encontradas]),
+        "integrantes": [
+            {"id_usuario": i.id, "nombre": i.nombre, "correo": i.correo, "rol": i.rol.value if hasattr(i.rol, "value") else str(i.rol)}
+            for i in integrantes
+        ],
+        "integrantes_eliminados": sorted(eliminadas["integrante"] + [i for i in vivas["integrante"] if i not in encontrados]),
+    }
+
+
+def version_proyecto(db, proyecto_id: int) -> Optional[int]:
+    return db.execute(select(Proyecto.version).where(Proyecto.id == proyecto_id)).scalar()
+
+
+def etag(recurso: str, proyecto_id: int, version: int, query_params) -> str:
+    # Filtros, cursor y límite cambian el contenido: forman parte de la etiqueta
+    query = "&".join(f"{k}={v}" for k, v in sorted(query_params.multi_items()))
+    sufijo = hashlib.sha1(query.encode()).hexdigest()[:12] if query else "0"
+    return f'"{recurso}-{proyecto_id}-{version}-{sufijo}"'
+
+def coincide_etag(if_none_match: Optional[str], etiqueta: str) -> bool:
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    # If-None-Match usa comparación débil: se ignora el prefijo W/
+    candidatas = [e.strip().removeprefix("W/") for e in if_none_match.split(",")]
+    return etiqueta in candidatas
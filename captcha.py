@@ -0,0 +1,173 @@
+import asyncio
+import os
+import threading
+import time
+import httpx
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# Verificación de reCAPTCHA con un cliente HTTP compartido (keep-alive), timeouts y circuit breaker
+RECAPTCHA_SECRET_KEY = os.getenv("RECAPTCHA_SECRET_KEY")
+RECAPTCHA_VERIFY_URL = os.getenv("RECAPTCHA_VERIFY_URL", "https://www.google.com/recaptcha/api/siteverify")
+CAPTCHA_CONNECT_TIMEOUT = float(os.getenv("CAPTCHA_CONNECT_TIMEOUT", "2"))
+CAPTCHA_READ_TIMEOUT = float(os.getenv("CAPTCHA_READ_TIMEOUT", "5"))
+CAPTCHA_MAX_CONCURRENCIA = int(os.getenv("CAPTCHA_MAX_CONCURRENCIA", "20"))
+# Errores seguidos que abren el circuito y segundos que permanece abierto
+CAPTCHA_UMBRAL_FALLOS = int(os.getenv("CAPTCHA_UMBRAL_FALLOS", "5"))
+CAPTCHA_ENFRIAMIENTO = float(os.getenv("CAPTCHA_ENFRIAMIENTO", "30"))
+
+
+class CaptchaNoDisponible(Exception):
+    pass
+
+
+class CircuitoAbierto(CaptchaNoDisponible):
+    pass
+
+
+async def _cerrar_al_cancelar(cliente: httpx.AsyncClient):
+    # Guardia del cliente en su event loop: asyncio.run y los portales del TestClient cancelan las tareas
+    # pendientes antes de cerrar el loop, así el cliente se cierra allí y no deja sockets abiertos
+    try:
+        await asyncio.Future()
+    finally:
+        await cliente.aclose()
+
+
+class VerificadorCaptcha:
+    def __init__(self, url=RECAPTCHA_VERIFY_URL, secret=RECAPTCHA_SECRET_KEY,
+                 connect_timeout=CAPTCHA_CONNECT_TIMEOUT, read_timeout=CAPTCHA_READ_TIMEOUT,
+                 max_concurrencia=CAPTCHA_MAX_CONCURRENCIA, umbral_fallos=CAPTCHA_UMBRAL_FALLOS,
+                 enfriamiento=CAPTCHA_ENFRIAMIENTO):
+        self.url = url
+        self.secret = secret
+        self.timeout = httpx.Timeout(read_timeout, connect=connect_timeout)
+        self.max_concurrencia = max_concurrencia
+        self.umbral_fallos = umbral_fallos
+        self.enfriamiento = enfriamiento
+        self._client = None
+        self._semaforo = None
+        self._loop = None
+        self._guardia = None
+        self._lock = threading.Lock()
+        self._fallos_seguidos = 0
+        self._abierto_hasta = 0.0
+        self._prueba_en_curso = False
+        self.solicitudes = 0
+        self.errores = 0
+        self.rechazadas = 0
+        self.en_curso = 0
+        self.latencia_total = 0.0
+        self.latencia_max = 0.0
+
+    async def iniciar(self):
+        loop = asyncio.get_running_loop()
+        if self._client is not None and self._loop is not loop:
+            # Cliente creado en otro event loop (p. ej. TestClient sin lifespan): sus conexiones no sirven aquí.
+            # Se cierra en su propio loop; si ese loop ya terminó, la guardia lo cerró al cancelarse
+            if not self._loop.is_closed():
+                self._loop.call_soon_threadsafe(self._guardia.cancel)
+            self._client = None
+        if self._client is None:
+            self._loop = loop
+            self._client = httpx.AsyncClient(
+                timeout=self.timeout,
+                limits=httpx.Limits(max_connections=self.max_concurrencia, max_keepalive_connections=self.max_concurrencia),
+            )
+            self._semaforo = asyncio.Semaphore(self.max_concurrencia)
+            self._guardia = loop.create_task(_cerrar_al_cancelar(self._client))
+
+    async def cerrar(self):
+        if self._client is not None:
+            self._guardia.cancel()
+            try:
+                await self._guardia
+            except asyncio.CancelledError:
+                pass
+            self._client = None
+            self._guardia = None
+            self._semaforo = None
+            self._loop = None
+
+    def estado_circuito(self) -> str:
+        if self._abierto_hasta == 0.0:
+            return "cerrado"
+        return "abierto" if time.monotonic() < self._abierto_hasta else "semi-abierto"
+
+    def _permitir(self):
+        with self._lock:
+            estado = self.estado_circuito()
+            if estado == "abierto" or (estado == "semi-abierto" and self._prueba_en_curso):
+                self.rechazadas += 1
+                raise CircuitoAbierto("Servicio de captcha no disponible")
+            if estado == "semi-abierto":
+                # Una sola solicitud de prueba mientras el circuito está semi-abierto
+                self._prueba_en_curso = True
+
+    def _registrar(self, ok: bool, latencia: float):
+        with self._lock:
+            self.solicitudes += 1
+            self.latencia_total += latencia
+            self.latencia_max = max(self.latencia_max, latencia)
+            self._prueba_en_curso = False
+            if ok:
+                self._fallos_seguidos = 0
+                self._abierto_hasta = 0.0
+                return
+            self.errores += 1
+            self._fallos_seguidos += 1
+            if self._fallos_seguidos >= self.umbral_fallos or self._abierto_hasta:
+                self._abierto_hasta = time.monotonic() + self.enfriamiento
+
+    async def verificar(self, token: str) -> bool:
+        await self.iniciar()
+        self._permitir()
+        if self._semaforo.locked():
+            with self._lock:
+                self.rechazadas += 1
+                self._prueba_en_curso = False
+            raise CaptchaNoDisponible("Demasiadas verificaciones en curso")
+
+        async with self._semaforo:
+            self.en_curso += 1
+            inicio = time.perf_counter()
+            registrado = False
+            try:
+                r = await self._client.post(self.url, data={"secret": self.secret, "response": token})
+                r.raise_for_status()
+                resultado = r.json()
+                if not isinstance(resultado, dict):
+                    raise ValueError("respuesta inesperada")
+            except (httpx.HTTPError, ValueError) as e:
+                self._registrar(False, time.perf_counter() - inicio)
+                registrado = True
+                raise CaptchaNoDisponible("Error al verificar captcha: " + str(e))
+            except Exception:
+                self._registrar(False, time.perf_counter() - inicio)
+                registrado = True
+                raise
+            finally:
+                self.en_curso -= 1
+                if not registrado:
+                    # Cancelada (cliente desconectado) o exitosa: la solicitud de prueba del
+                    # circuito semi-abierto no puede quedar tomada, o el circuito no vuelve a cerrarse
+                    with self._lock:
+                        self._prueba_en_curso = False
+            self._registrar(True, time.perf_counter() - inicio)
+            return bool(resultado.get("success"))
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "circuito": self.estado_circuito(),
+                "solicitudes": self.solicitudes,
+                "errores": self.errores,
+                "rechazadas": self.rechazadas,
+                "en_curso": self.en_curso,
+                "latencia_promedio_ms": round(self.latencia_total / self.solicitudes * 1000, 3) if self.solicitudes else 0.0,
+                "latencia_max_ms": round(self.latencia_max * 1000, 3),
+            }
+
+
+verificador_captcha = VerificadorCaptcha()
@@ -0,0 +1,232 @@
+import heapq
+import itertools
+import logging
+import os
+import queue
+import smtplib
+import threading
+import time
+from email.mime.text import MIMEText
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# Cola de correo saliente: los endpoints encolan y un worker en segundo plano envía
+SMTP_HOST = os.getenv("SMTP_HOST", "smtp.gmail.com")
+SMTP_PORT = int(os.getenv("SMTP_PORT", "465"))
+SMTP_SSL = os.getenv("SMTP_SSL", "true").lower() in ("1", "true", "si")
+SMTP_TIMEOUT = float(os.getenv("SMTP_TIMEOUT", "10"))
+EMAIL_USER = os.getenv("EMAIL_USER")
+EMAIL_PASS = os.getenv("EMAIL_PASS")
+
+MAIL_MAX_COLA = int(os.getenv("MAIL_MAX_COLA", "10000"))
+MAIL_LOTE = int(os.getenv("MAIL_LOTE", "50"))
+MAIL_MAX_INTENTOS = int(os.getenv("MAIL_MAX_INTENTOS", "5"))
+MAIL_BACKOFF_BASE = float(os.getenv("MAIL_BACKOFF_BASE", "2"))
+# Segundos sin mensajes tras los que se cierra la conexión SMTP
+MAIL_INACTIVIDAD = float(os.getenv("MAIL_INACTIVIDAD", "60"))
+
+logger = logging.getLogger("correo")
+
+
+class ColaCorreoLlena(Exception):
+    pass
+
+
+def conectar_smtp() -> smtplib.SMTP:
+    if SMTP_SSL:
+        servidor = smtplib.SMTP_SSL(SMTP_HOST, SMTP_PORT, timeout=SMTP_TIMEOUT)
+    else:
+        servidor = smtplib.SMTP(SMTP_HOST, SMTP_PORT, timeout=SMTP_TIMEOUT)
+    if EMAIL_USER:
+        servidor.login(EMAIL_USER, EMAIL_PASS)
+    return servidor
+
+
+def crear_mensaje(to, subject, body, remitente=None) -> MIMEText:
+    msg = MIMEText(body)
+    msg["Subject"] = subject
+    if remitente:
+        msg["From"] = remitente
+    msg["To"] = to
+    return msg
+
+
+class EnvioDirecto:
+    # Envío sincrónico sobre una conexión reutilizada, para procesos que necesitan saber si el
+    # servidor aceptó el mensaje antes de seguir (recordatorios.py). Los errores se propagan
+    def __init__(self, conectar=conectar_smtp, remitente=EMAIL_USER):
+        self._conectar = conectar
+        self.remitente = remitente
+        self._servidor = None
+
+    def __call__(self, to, subject, body):
+        msg = crear_mensaje(to, subject, body, self.remitente)
+        try:
+            if self._servidor is None:
+                self._servidor = self._conectar()
+            self._servidor.send_message(msg, from_addr=self.remitente or "", to_addrs=[to])
+        except (smtplib.SMTPException, OSError):
+            # Conexión rota o rechazo: la próxima llamada reconecta
+            self.cerrar()
+            raise
+
+    def cerrar(self):
+        if self._servidor is None:
+            return
+        try:
+            self._servidor.quit()
+        except (smtplib.SMTPException, OSError):
+            pass
+        self._servidor = None
+
+
+class ColaCorreo:
+    def __init__(self, conectar=conectar_smtp, remitente=None, max_cola=MAIL_MAX_COLA, lote=MAIL_LOTE,
+                 max_intentos=MAIL_MAX_INTENTOS, backoff_base=MAIL_BACKOFF_BASE, inactividad=MAIL_INACTIVIDAD):
+        self._conectar = conectar
+        self.remitente = remitente
+        self.lote = lote
+        self.max_intentos = max_intentos
+        self.backoff_base = backoff_base
+        self.inactividad = inactividad
+        self._cola = queue.Queue(maxsize=max_cola)
+        # Reintentos pendientes: (momento, secuencia, intentos, mensaje)
+        self._reintentos = []
+        self._secuencia = itertools.count()
+        self._servidor = None
+        self._hilo = None
+        self._detener = threading.Event()
+        self._lock = threading.Lock()
+        self.enviados = 0
+        self.fallidos = 0
+        self.reintentos = 0
+        self.conexiones = 0
+
+    # --- API para los endpoints ---
+
+    def enviar(self, to, subject, body):
+        msg = crear_mensaje(to, subject, body, self.remitente)
+        try:
+            self._cola.put_nowait(msg)
+        except queue.Full:
+            raise ColaCorreoLlena("Cola de correo llena")
+        self.iniciar()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "en_cola": self._cola.qsize(),
+                "en_reintento": len(self._reintentos),
+                "enviados": self.enviados,
+                "fallidos": self.fallidos,
+                "reintentos": self.reintentos,
+                "conexiones": self.conexiones,
+                "conectado": self._servidor is not None,
+            }
+
+    def iniciar(self):
+        with self._lock:
+            if self._hilo is not None and self._hilo.is_alive():
+                return
+            self._detener.clear()
+            self._hilo = threading.Thread(target=self._worker, name="cola-correo", daemon=True)
+            self._hilo.start()
+
+    def detener(self, timeout: float = 10):
+        # Intenta vaciar la cola antes de cerrar la conexión
+        self._detener.set()
+        try:
+            # Despierta al worker si está esperando mensajes
+            self._cola.put_nowait(None)
+        except queue.Full:
+            pass
+        if self._hilo is not None:
+            self._hilo.join(timeout)
+
+    # --- Worker ---
+
+    def _worker(self):
+        while True:
+            lote = self._tomar_lote()
+            if lote:
+                self._enviar_lote(lote)
+            elif self._detener.is_set() and self._cola.empty():
+                break
+            elif self._servidor is not None and lote is None:
+                # Sin actividad: liberar la conexión
+                self._cerrar()
+        if self._reintentos:
+            logger.warning("Se descartan %d correos pendientes de reintento al detener la cola", len(self._reintentos))
+        self._cerrar()
+
+    def _tomar_lote(self):
+        ahora = time.monotonic()
+        lote = []
+        while self._reintentos and self._reintentos[0][0] <= ahora and len(lote) < self.lote:
+            _, _, intentos, msg = heapq.heappop(self._reintentos)
+            lote.append((intentos, msg))
+
+        if not lote:
+            espera = self.inactividad
+            if self._reintentos:
+                espera = min(espera, self._reintentos[0][0] - ahora)
+            if self._detener.is_set():
+                espera = min(espera, 0.1)
+            try:
+                msg = self._cola.get(timeout=max(espera, 0))
+            except queue.Empty:
+                return [] if self._reintentos or self._detener.is_set() else None
+            if msg is not None:
+                lote.append((0, msg))
+
+        while len(lote) < self.lote:
+            try:
+                msg = self._cola.get_nowait()
+            except queue.Empty:
+                break
+            if msg is not None:
+                lote.append((0, msg))
+        return lote
+
+    def _enviar_lote(self, lote):
+        for intentos, msg in lote:
+            try:
+                if self._servidor is None:
+                    self._servidor = self._conectar()
+                    with self._lock:
+                        self.conexiones += 1
+                self._servidor.send_message(msg, from_addr=self.remitente or "", to_addrs=[msg["To"]])
+                with self._lock:
+                    self.enviados += 1
+            except (smtplib.SMTPException, OSError) as e:
+                # Conexión rota o rechazo: se reconecta en el próximo envío
+                self._cerrar()
+                self._reintentar(intentos + 1, msg, e)
+            except Exception:
+                # Mensaje inválido: no tiene sentido reintentarlo, y el worker no debe morir
+                with self._lock:
+                    self.fallidos += 1
+                logger.exception("Correo descartado para %s", msg["To"])
+
+    def _reintentar(self, intentos, msg, error):
+        with self._lock:
+            if intentos >= self.max_intentos:
+                self.fallidos += 1
+                logger.error("No se pudo enviar correo a %s tras %d intentos: %s", msg["To"], intentos, error)
+                return
+            self.reintentos += 1
+            momento = time.monotonic() + self.backoff_base * (2 ** (intentos - 1))
+            heapq.heappush(self._reintentos, (momento, next(self._secuencia), intentos, msg))
+
+    def _cerrar(self):
+        if self._servidor is None:
+            return
+        try:
+            self._servidor.quit()
+        except (smtplib.SMTPException, OSError):
+            pass
+        self._servidor = None
+
+
+cola_correo = ColaCorreo(remitente=EMAIL_USER)
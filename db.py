@@ -1,19 +1,206 @@
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
 from sqlalchemy.orm import sessionmaker, declarative_base
+from sqlalchemy.pool import QueuePool, AsyncAdaptedQueuePool
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
 from dotenv import load_dotenv
+import logging
 import os
+import random
+import threading
+import time
 
 
-# URL de conexión 
+# URL de conexión
 
 load_dotenv()
 DATABASE_URL = os.getenv("SUPABASE_DB_URL")
 
-# Motor de conexión
-engine = create_engine(DATABASE_URL, echo=True)
+# Modo async: los endpoints usan AsyncSession en lugar del threadpool
+DB_ASYNC = os.getenv("DB_ASYNC", "false").lower() in ("1", "true", "si")
+
+# Configuración del pool de conexiones
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "5"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "30"))
+DB_POOL_PRE_PING = os.getenv("DB_POOL_PRE_PING", "true").lower() in ("1", "true", "si")
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "1800"))
+
+# Log de sentencias: siempre las lentas, y una muestra del resto
+DB_SLOW_QUERY_MS = float(os.getenv("DB_SLOW_QUERY_MS", "200"))
+DB_LOG_SAMPLE_RATE = float(os.getenv("DB_LOG_SAMPLE_RATE", "0"))
+
+logger = logging.getLogger("db")
+
+# Driver async equivalente para cada backend
+ASYNC_DRIVERS = {
+    "postgresql": "postgresql+asyncpg",
+    "sqlite": "sqlite+aiosqlite",
+}
+
+def async_url(url: str):
+    u = make_url(url)
+    backend = u.get_backend_name()
+    if backend not in ASYNC_DRIVERS:
+        raise ValueError(f"No hay driver async configurado para '{backend}'")
+    query = dict(u.query)
+    # asyncpg no entiende sslmode, usa ssl
+    if "sslmode" in query:
+        query["ssl"] = query.pop("sslmode")
+    return u.set(drivername=ASYNC_DRIVERS[backend], query=query)
+
+
+class EstadisticasPool:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.engine = None
+        self.en_uso = 0
+        self.checkouts = 0
+        self.conexiones_creadas = 0
+        self.timeouts = 0
+        self.espera_total = 0.0
+        self.espera_max = 0.0
+
+    def escuchar(self, engine):
+        self.engine = engine
+        event.listen(engine, "connect", self._on_connect)
+        event.listen(engine, "checkout", self._on_checkout)
+        event.listen(engine, "checkin", self._on_checkin)
+
+    def _on_connect(self, dbapi_connection, connection_record):
+        with self._lock:
+            self.conexiones_creadas += 1
+
+    def _on_checkout(self, dbapi_connection, connection_record, connection_proxy):
+        with self._lock:
+            self.en_uso += 1
+            self.checkouts += 1
+
+    def _on_checkin(self, dbapi_connection, connection_record):
+        with self._lock:
+            self.en_uso -= 1
+
+    def registrar_espera(self, segundos: float, timeout: bool = False):
+        with self._lock:
+            self.espera_total += segundos
+            self.espera_max = max(self.espera_max, segundos)
+            if timeout:
+                self.timeouts += 1
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            datos = {
+                "en_uso": self.en_uso,
+                "checkouts": self.checkouts,
+                "conexiones_creadas": self.conexiones_creadas,
+                "timeouts": self.timeouts,
+                "espera_promedio_ms": round(self.espera_total / self.checkouts * 1000, 3) if self.checkouts else 0.0,
+                "espera_max_ms": round(self.espera_max * 1000, 3),
+            }
+        pool = self.engine.pool if self.engine is not None else None
+        if isinstance(pool, QueuePool):
+            datos.update({
+                "tamaño": pool.size(),
+                "max_overflow": DB_MAX_OVERFLOW,
+                "inactivas": pool.checkedin(),
+                "overflow": max(pool.overflow(), 0),
+            })
+        return datos
+
+
+def pool_medido(base, estadisticas: EstadisticasPool):
+    # Subclase del pool que mide cuánto espera cada checkout por una conexión libre
+    class PoolMedido(base):
+        def _do_get(self):
+            inicio = time.perf_counter()
+            try:
+                conexion = super()._do_get()
+            except PoolTimeoutError:
+                estadisticas.registrar_espera(time.perf_counter() - inicio, timeout=True)
+                raise
+            estadisticas.registrar_espera(time.perf_counter() - inicio)
+            return conexion
+
+    return PoolMedido
+
+
+def pool_kwargs(url, base, estadisticas: EstadisticasPool) -> dict:
+    u = make_url(url)
+    # SQLite en memoria usa un pool de una sola conexión, no admite estos parámetros
+    if u.get_backend_name() == "sqlite" and u.database in (None, "", ":memory:"):
+        return {}
+    return {
+        "poolclass": pool_medido(base, estadisticas),
+        "pool_size": DB_POOL_SIZE,
+        "max_overflow": DB_MAX_OVERFLOW,
+        "pool_timeout": DB_POOL_TIMEOUT,
+        "pool_pre_ping": DB_POOL_PRE_PING,
+        "pool_recycle": DB_POOL_RECYCLE,
+    }
+
+
+def _antes_de_ejecutar(conn, cursor, statement, parameters, context, executemany):
+    # En el contexto de ejecución y no en conn.info: si la sentencia falla, after_cursor_execute
+    # no se dispara y el inicio se descarta con el contexto en lugar de quedar en la conexión
+    context._inicio_sentencia = time.perf_counter()
+
+def _despues_de_ejecutar(conn, cursor, statement, parameters, context, executemany):
+    inicio = getattr(context, "_inicio_sentencia", None)
+    if inicio is None:
+        return
+    duracion_ms = (time.perf_counter() - inicio) * 1000
+    if duracion_ms >= DB_SLOW_QUERY_MS:
+        logger.warning("Consulta lenta (%.1f ms): %s", duracion_ms, statement)
+    elif DB_LOG_SAMPLE_RATE and random.random() < DB_LOG_SAMPLE_RATE:
+        logger.info("Consulta (%.1f ms): %s", duracion_ms, statement)
+
+def log_sentencias(engine):
+    event.listen(engine, "before_cursor_execute", _antes_de_ejecutar)
+    event.listen(engine, "after_cursor_execute", _despues_de_ejecutar)
+
 
 # Base para heredar en modelos
 Base = declarative_base()
 
-# Sesión
-SessionLocal = sessionmaker(bind=engine, autoflush=False, autocommit=False)
+# Motores y sesiones. Importar este módulo no abre conexiones: iniciar_engine() crea los motores
+# en el arranque de la app (lifespan) o en el primer uso, y enlaza las fábricas de sesión
+pool_stats = EstadisticasPool()
+async_pool_stats = EstadisticasPool()
+engine = None
+async_engine = None
+SessionLocal = sessionmaker(autoflush=False, autocommit=False)
+AsyncSessionLocal = async_sessionmaker(autoflush=False) if DB_ASYNC else None
+_lock_engine = threading.Lock()
+
+
+def iniciar_engine():
+    global engine, async_engine
+    if engine is not None:
+        return engine
+    with _lock_engine:
+        if engine is not None:
+            return engine
+        if not DATABASE_URL:
+            raise RuntimeError("Falta la variable de entorno SUPABASE_DB_URL")
+        # create_engine no conecta: la primera conexión se abre con la primera consulta
+        nuevo = create_engine(DATABASE_URL, **pool_kwargs(DATABASE_URL, QueuePool, pool_stats))
+        pool_stats.escuchar(nuevo)
+        log_sentencias(nuevo)
+        SessionLocal.configure(bind=nuevo)
+        if DB_ASYNC:
+            async_engine = create_async_engine(
+                async_url(DATABASE_URL), **pool_kwargs(DATABASE_URL, AsyncAdaptedQueuePool, async_pool_stats)
+            )
+            async_pool_stats.escuchar(async_engine.sync_engine)
+            log_sentencias(async_engine.sync_engine)
+            AsyncSessionLocal.configure(bind=async_engine)
+        engine = nuevo
+        return engine
+
+async def cerrar_engine():
+    # Cierra las conexiones del pool; los motores siguen usables y reconectan si hace falta
+    if async_engine is not None:
+        await async_engine.dispose()
+    if engine is not None:
+        engine.dispose()
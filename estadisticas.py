@@ -0,0 +1,227 @@
+import argparse
+from datetime import datetime
+from sqlalchemy import select, update, delete, insert, func, case, or_
+from sqlalchemy.dialects import postgresql, sqlite
+from models import Proyecto, Tarea, TareaResponsable, Usuario, EstadoTarea, EstadisticaProyecto, EstadisticaResponsable
+
+# Estadísticas por proyecto mantenidas de forma incremental: los endpoints de tareas y responsables
+# ajustan project_stats / project_stats_responsables en la misma transacción que sus escrituras,
+# también las masivas, con los deltas de las filas que efectivamente cambiaron. Las filas que faltan
+# se crean con INSERT ... ON CONFLICT DO UPDATE. Uso para detectar y corregir deriva:
+#   python estadisticas.py verificar [--reparar] [--proyecto ID]
+#   python estadisticas.py reconstruir [--proyecto ID]
+
+
+def _columna(estado: EstadoTarea):
+    return getattr(EstadisticaProyecto, estado.name)
+
+def abierta(estado) -> bool:
+    return estado != EstadoTarea.completado
+
+def _insert(db):
+    # INSERT con ON CONFLICT del dialecto (PostgreSQL y SQLite)
+    dialecto = db.get_bind().dialect.name
+    if dialecto == "postgresql":
+        return postgresql.insert
+    if dialecto == "sqlite":
+        return sqlite.insert
+    raise NotImplementedError(f"Estadísticas no soportadas para '{dialecto}'")
+
+
+def crear(db, proyecto_id: int):
+    db.execute(insert(EstadisticaProyecto).values(
+        id_proyecto=proyecto_id, total=0, **{e.name: 0 for e in EstadoTarea}
+    ))
+
+def sumar_tareas(db, proyecto_id: int, deltas: dict):
+    # deltas: {EstadoTarea: cantidad}, negativos para bajas o cambios de estado
+    deltas = {estado: n for estado, n in deltas.items() if n}
+    if not deltas:
+        return
+    valores = {estado.name: _columna(estado) + n for estado, n in deltas.items()}
+    valores["total"] = EstadisticaProyecto.total + sum(deltas.values())
+    resultado = db.execute(
+        update(EstadisticaProyecto).where(EstadisticaProyecto.id_proyecto == proyecto_id).values(**valores)
+    )
+    if resultado.rowcount == 0:
+        # Proyecto sin fila de estadísticas: se crea desde las tablas base, que ya incluyen esta escritura.
+        # Si otra transacción la creó entre medio, solo se le suma el delta
+        por_estado = _contar_por_estado(db, proyecto_id)
+        stmt = _insert(db)(EstadisticaProyecto).values(
+            id_proyecto=proyecto_id, total=sum(por_estado.values()), **{e.name: por_estado.get(e, 0) for e in EstadoTarea}
+        )
+        db.execute(stmt.on_conflict_do_update(index_elements=["id_proyecto"], set_=valores))
+
+def sumar_responsables(db, proyecto_id: int, deltas: dict):
+    # deltas: {id_usuario: (asignadas, abiertas)}. Un solo upsert para todos los usuarios
+    filas = [
+        {"id_proyecto": proyecto_id, "id_usuario": id_usuario, "asignadas": asignadas, "abiertas": abiertas}
+        for id_usuario, (asignadas, abiertas) in sorted(deltas.items()) if asignadas or abiertas
+    ]
+    if not filas:
+        return
+    stmt = _insert(db)(EstadisticaResponsable).values(filas)
+    db.execute(stmt.on_conflict_do_update(
+        index_elements=["id_proyecto", "id_usuario"],
+        set_={
+            "asignadas": EstadisticaResponsable.asignadas + stmt.excluded.asignadas,
+            "abiertas": EstadisticaResponsable.abiertas + stmt.excluded.abiertas,
+        },
+    ))
+
+
+def _contar_por_estado(db, proyecto_id: int) -> dict:
+    return dict(db.execute(
+        select(Tarea.estado, func.count()).where(Tarea.id_proyecto == proyecto_id).group_by(Tarea.estado)
+    ).all())
+
+def calcular(db, proyecto_id: int) -> dict:
+    # Agregación sobre las tablas base (índices ix_tareas_proyecto_estado y ux_tarea_responsable)
+    db.flush()
+    por_estado = _contar_por_estado(db, proyecto_id)
+    responsables = {
+        fila.id_usuario: (fila.asignadas, fila.abiertas)
+        for fila in db.execute(
+            select(
+                TareaResponsable.id_usuario,
+                func.count().label("asignadas"),
+                func.count(case((Tarea.estado != EstadoTarea.completado, 1))).label("abiertas"),
+            )
+            .join(Tarea, Tarea.id == TareaResponsable.id_tarea)
+            .where(Tarea.id_proyecto == proyecto_id)
+            .group_by(TareaResponsable.id_usuario)
+        )
+    }
+    return {
+        "tareas_por_estado": {e: por_estado.get(e, 0) for e in EstadoTarea},
+        "responsables": responsables,
+    }
+
+def leer(db, proyecto_id: int):
+    fila = db.execute(select(EstadisticaProyecto).where(EstadisticaProyecto.id_proyecto == proyecto_id)).scalar()
+    if fila is None:
+        return None
+    responsables = {
+        id_usuario: (asignadas, abiertas)
+        for id_usuario, asignadas, abiertas in db.execute(
+            select(EstadisticaResponsable.id_usuario, EstadisticaResponsable.asignadas, EstadisticaResponsable.abiertas)
+            .where(EstadisticaResponsable.id_proyecto == proyecto_id,
+                   or_(EstadisticaResponsable.asignadas != 0, EstadisticaResponsable.abiertas != 0))
+        )
+    }
+    return {
+        "tareas_por_estado": {e: getattr(fila, e.name) for e in EstadoTarea},
+        "responsables": responsables,
+    }
+
+def recalcular_proyecto(db, proyecto_id: int):
+    # Reemplaza los valores por los de las tablas base con upserts: no borra filas, así una escritura
+    # simultánea sobre el proyecto no choca con la clave primaria
+    calculado = calcular(db, proyecto_id)
+    por_estado = calculado["tareas_por_estado"]
+    valores = {e.name: n for e, n in por_estado.items()}
+    valores["total"] = sum(por_estado.values())
+    stmt = _insert(db)(EstadisticaProyecto).values(id_proyecto=proyecto_id, **valores)
+    db.execute(stmt.on_conflict_do_update(index_elements=["id_proyecto"], set_=valores))
+    # Los responsables que ya no tienen tareas quedan en cero (leer() los ignora)
+    db.execute(
+        update(EstadisticaResponsable)
+        .where(EstadisticaResponsable.id_proyecto == proyecto_id,
+               EstadisticaResponsable.id_usuario.not_in(list(calculado["responsables"])))
+        .values(asignadas=0, abiertas=0)
+    )
+    if calculado["responsables"]:
+        stmt = _insert(db)(EstadisticaResponsable).values([
+            {"id_proyecto": proyecto_id, "id_usuario": id_usuario, "asignadas": asignadas, "abiertas": abiertas}
+            for id_usuario, (asignadas, abiertas) in sorted(calculado["responsables"].items())
+        ])
+        db.execute(stmt.on_conflict_do_update(
+            index_elements=["id_proyecto", "id_usuario"],
+            set_={"asignadas": stmt.excluded.asignadas, "abiertas": stmt.excluded.abiertas},
+        ))
+
+def eliminar(db, proyecto_id: int):
+    db.execute(delete(EstadisticaResponsable).where(EstadisticaResponsable.id_proyecto == proyecto_id))
+    db.execute(delete(EstadisticaProyecto).where(EstadisticaProyecto.id_proyecto == proyecto_id))
+
+
+def resumen(db, proyecto_id: int, ahora: datetime = None) -> dict:
+    # Lectura para el dashboard: filas del resumen más las vencidas por el índice de fecha límite
+    # (dependen de la hora actual, no se pueden mantener incrementalmente)
+    datos = leer(db, proyecto_id)
+    if datos is None:
+        # Sin fila de estadísticas se calcula en memoria: un GET no escribe. La fila la crea la próxima
+        # escritura sobre el proyecto o "python estadisticas.py reconstruir"
+        datos = calcular(db, proyecto_id)
+    vencidas = db.execute(
+        select(func.count()).select_from(Tarea).where(
+            Tarea.id_proyecto == proyecto_id,
+            Tarea.fecha_limite < (ahora or datetime.now()),
+            Tarea.estado != EstadoTarea.completado,
+        )
+    ).scalar()
+    nombres = dict(db.execute(
+        select(Usuario.id, Usuario.nombre).where(Usuario.id.in_(list(datos["responsables"])))
+    ).all()) if datos["responsables"] else {}
+    por_estado = {e.value: n for e, n in datos["tareas_por_estado"].items()}
+    return {
+        "id_proyecto": proyecto_id,
+        "tareas_por_estado": por_estado,
+        "total_tareas": sum(por_estado.values()),
+        "vencidas": vencidas,
+        "responsables": [
+            {"id_usuario": id_usuario, "nombre": nombres.get(id_usuario), "asignadas": asignadas, "abiertas": abiertas}
+            for id_usuario, (asignadas, abiertas) in sorted(datos["responsables"].items())
+        ],
+    }
+
+
+def verificar(db, reparar: bool = False, proyecto_id: int = None) -> list:
+    # Devuelve los ids de proyecto cuyas estadísticas no coinciden con las tablas base
+    consulta = select(Proyecto.id).order_by(Proyecto.id)
+    if proyecto_id is not None:
+        consulta = consulta.where(Proyecto.id == proyecto_id)
+    con_deriva = []
+    for (pid,) in db.execute(consulta).all():
+        if leer(db, pid) != calcular(db, pid):
+            con_deriva.append(pid)
+            if reparar:
+                recalcular_proyecto(db, pid)
+                db.commit()
+    return con_deriva
+
+def reconstruir(db, proyecto_id: int = None) -> int:
+    consulta = select(Proyecto.id).order_by(Proyecto.id)
+    if proyecto_id is not None:
+        consulta = consulta.where(Proyecto.id == proyecto_id)
+    ids = db.execute(consulta).scalars().all()
+    for pid in ids:
+        recalcular_proyecto(db, pid)
+        db.commit()
+    return len(ids)
+
+
+if __name__ == "__main__":
+    from db import SessionLocal, iniciar_engine
+
+    parser = argparse.ArgumentParser(description="Estadísticas por proyecto (project_stats)")
+    parser.add_argument("accion", choices=["verificar", "reconstruir"])
+    parser.add_argument("--reparar", action="store_true", help="recalcular los proyectos con deriva")
+    parser.add_argument("--proyecto", type=int)
+    args = parser.parse_args()
+
+    iniciar_engine()
+    db = SessionLocal()
+    try:
+        if args.accion == "reconstruir":
+            print(f"Proyectos recalculados: {reconstruir(db, args.proyecto)}")
+        else:
+            con_deriva = verificar(db, args.reparar, args.proyecto)
+            if con_deriva:
+                estado = "corregidos" if args.reparar else "con deriva"
+                print(f"Proyectos {estado}: " + ", ".join(str(p) for p in con_deriva))
+            else:
+                print("Sin deriva")
+            raise SystemExit(1 if con_deriva and not args.reparar else 0)
+    finally:
+        db.close()
@@ -0,0 +1,124 @@
+import asyncio
+import json
+import os
+import threading
+from collections import defaultdict
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# Eventos en vivo por proyecto (SSE). Los endpoints dejan los eventos pendientes en la sesión
+# y se publican recién cuando la transacción se confirma
+EVENTOS_BUFFER = int(os.getenv("EVENTOS_BUFFER", "100"))
+# Segundos entre comentarios de keep-alive en el stream
+EVENTOS_KEEPALIVE = float(os.getenv("EVENTOS_KEEPALIVE", "15"))
+
+
+class BackendMemoria:
+    # Entrega dentro del mismo proceso. Un backend compartido (Redis pub/sub, LISTEN/NOTIFY)
+    # publicaría hacia afuera y llamaría a entregar() con lo que reciba de cualquier worker
+    def conectar(self, entregar):
+        self._entregar = entregar
+
+    def publicar(self, proyecto_id: int, evento: dict):
+        self._entregar(proyecto_id, evento)
+
+
+class Suscripcion:
+    def __init__(self, proyecto_id: int, id_usuario, loop, tamaño: int):
+        self.proyecto_id = proyecto_id
+        self.id_usuario = id_usuario
+        self.loop = loop
+        self.tamaño = tamaño
+        # Un lugar extra para la marca de resincronizar: con buffer 1 entran la marca y el evento
+        self.cola = asyncio.Queue(maxsize=tamaño + 1)
+        self.descartados = 0
+
+    def _poner(self, evento: dict):
+        # Corre en el event loop del suscriptor
+        if self.cola.qsize() >= self.tamaño:
+            # Cliente lento: se vacía el buffer y se le pide resincronizar con /cambios;
+            # el evento actual se conserva para que tenga el cursor más reciente
+            while not self.cola.empty():
+                self.cola.get_nowait()
+                self.descartados += 1
+            self.cola.put_nowait({"tipo": "resincronizar"})
+        self.cola.put_nowait(evento)
+
+
+class Broker:
+    def __init__(self, backend=None, tamaño_buffer: int = EVENTOS_BUFFER):
+        self.backend = backend if backend is not None else BackendMemoria()
+        self.backend.conectar(self.entregar)
+        self.tamaño_buffer = tamaño_buffer
+        self._suscripciones = defaultdict(set)
+        self._lock = threading.Lock()
+        self.publicados = 0
+
+    def suscribir(self, proyecto_id: int, id_usuario: int = None) -> Suscripcion:
+        sub = Suscripcion(proyecto_id, id_usuario, asyncio.get_running_loop(), self.tamaño_buffer)
+        with self._lock:
+            self._suscripciones[proyecto_id].add(sub)
+        return sub
+
+    def cancelar(self, sub: Suscripcion):
+        with self._lock:
+            subs = self._suscripciones.get(sub.proyecto_id)
+            if subs is not None:
+                subs.discard(sub)
+                if not subs:
+                    del self._suscripciones[sub.proyecto_id]
+
+    def publicar(self, proyecto_id: int, evento: dict):
+        with self._lock:
+            self.publicados += 1
+        self.backend.publicar(proyecto_id, evento)
+
+    def entregar(self, proyecto_id: int, evento: dict):
+        # Puede llamarse desde cualquier hilo (threadpool de los endpoints síncronos)
+        with self._lock:
+            subs = list(self._suscripciones.get(proyecto_id, ()))
+        for sub in subs:
+            try:
+                sub.loop.call_soon_threadsafe(sub._poner, evento)
+            except RuntimeError:
+                # Loop cerrado: la suscripción quedó huérfana
+                self.cancelar(sub)
+
+    def stats(self) -> dict:
+        with self._lock:
+            subs = [s for grupo in self._suscripciones.values() for s in grupo]
+            return {
+                "proyectos": len(self._suscripciones),
+                "suscriptores": len(subs),
+                "publicados": self.publicados,
+                "descartados": sum(s.descartados for s in subs),
+            }
+
+
+broker = Broker()
+
+
+def encolar_evento(db, proyecto_id: int, evento: dict):
+    db.info.setdefault("eventos_pendientes", []).append((proyecto_id, evento))
+
+@event.listens_for(Session, "after_commit")
+def _publicar_pendientes(session):
+    for proyecto_id, evento in session.info.pop("eventos_pendientes", []):
+        broker.publicar(proyecto_id, evento)
+
+@event.listens_for(Session, "after_soft_rollback")
+def _descartar_pendientes(session, transaccion_anterior):
+    session.info.pop("eventos_pendientes", None)
+
+
+def formatear_sse(evento: dict) -> str:
+    lineas = []
+    if "cursor" in evento:
+        # El id sirve para retomar con /proyectos/{id}/cambios?since=
+        lineas.append(f"id: {evento['cursor']}")
+    lineas.append(f"event: {evento['tipo']}")
+    lineas.append("data: " + json.dumps(evento, ensure_ascii=False))
+    return "\n".join(lineas) + "\n\n"
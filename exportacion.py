@@ -0,0 +1,85 @@
+import csv
+import io
+import json
+from sqlalchemy import select
+from db import SessionLocal
+from models import Tarea, TareaResponsable, Usuario
+
+# Exportación de tareas en streaming: cursor del lado del servidor y responsables en la misma pasada
+
+EXPORT_YIELD_PER = 1000
+# Tareas que se acumulan antes de escribir un chunk de la respuesta
+EXPORT_TAREAS_POR_CHUNK = 200
+
+COLUMNAS_CSV = ["id", "id_proyecto", "titulo", "descripcion", "estado", "fecha_creacion", "fecha_limite", "responsables"]
+
+
+def _consulta(proyecto_id: int):
+    return (
+        select(
+            Tarea.id, Tarea.id_proyecto, Tarea.titulo, Tarea.descripcion, Tarea.estado,
+            Tarea.fecha_creacion, Tarea.fecha_limite,
+            Usuario.id.label("id_responsable"), Usuario.nombre.label("nombre_responsable"),
+        )
+        .select_from(Tarea)
+        .outerjoin(TareaResponsable, TareaResponsable.id_tarea == Tarea.id)
+        .outerjoin(Usuario, Usuario.id == TareaResponsable.id_usuario)
+        .where(Tarea.id_proyecto == proyecto_id)
+        # Las filas de una misma tarea quedan contiguas
+        .order_by(Tarea.fecha_creacion, Tarea.id)
+        .execution_options(stream_results=True, yield_per=EXPORT_YIELD_PER)
+    )
+
+
+def _tareas(db, proyecto_id: int):
+    actual = None
+    for fila in db.execute(_consulta(proyecto_id)):
+        if actual is None or actual["id"] != fila.id:
+            if actual is not None:
+                yield actual
+            actual = {
+                "id": fila.id,
+                "id_proyecto": fila.id_proyecto,
+                "titulo": fila.titulo,
+                "descripcion": fila.descripcion,
+                "estado": fila.estado.value if hasattr(fila.estado, "value") else str(fila.estado),
+                "fecha_creacion": fila.fecha_creacion.isoformat() if fila.fecha_creacion else None,
+                "fecha_limite": fila.fecha_limite.isoformat() if fila.fecha_limite else None,
+                "responsables": [],
+            }
+        if fila.id_responsable is not None:
+            actual["responsables"].append({"id": fila.id_responsable, "nombre": fila.nombre_responsable})
+    if actual is not None:
+        yield actual
+
+
+def _ndjson(tarea: dict) -> str:
+    return json.dumps(tarea, ensure_ascii=False) + "\n"
+
+def _csv(tarea: dict) -> str:
+    buffer = io.StringIO()
+    fila = dict(tarea)
+    fila["responsables"] = "; ".join(f'{r["id"]}:{r["nombre"]}' for r in tarea["responsables"])
+    csv.DictWriter(buffer, fieldnames=COLUMNAS_CSV).writerow(fila)
+    return buffer.getvalue()
+
+
+def exportar_tareas(proyecto_id: int, formato: str):
+    # Generador síncrono: Starlette lo recorre en el threadpool. Usa su propia sesión,
+    # que vive mientras dure la respuesta y se cierra aunque el cliente corte la descarga
+    serializar = _csv if formato == "csv" else _ndjson
+    if formato == "csv":
+        yield ",".join(COLUMNAS_CSV) + "\r\n"
+
+    db = SessionLocal()
+    try:
+        chunk = []
+        for tarea in _tareas(db, proyecto_id):
+            chunk.append(serializar(tarea))
+            if len(chunk) >= EXPORT_TAREAS_POR_CHUNK:
+                yield "".join(chunk)
+                chunk = []
+        if chunk:
+            yield "".join(chunk)
+    finally:
+        db.close()
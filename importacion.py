@@ -0,0 +1,90 @@
+import csv
+from collections import Counter
+import json
+from datetime import datetime
+from typing import AsyncIterator
+from pydantic import ValidationError
+from sqlalchemy import insert
+from models import Tarea, EstadoTarea
+from schemas import TareaImport
+from cambios import registrar_cambio
+import estadisticas
+
+# Importación masiva de tareas leyendo el body como stream, por lotes
+
+IMPORT_TAMAÑO_LOTE = 500
+IMPORT_MAX_ERRORES = 1000
+
+
+async def lineas(stream: AsyncIterator[bytes]) -> AsyncIterator[str]:
+    pendiente = b""
+    async for chunk in stream:
+        pendiente += chunk
+        *completas, pendiente = pendiente.split(b"\n")
+        for linea in completas:
+            yield linea.decode("utf-8").rstrip("\r")
+    if pendiente:
+        yield pendiente.decode("utf-8").rstrip("\r")
+
+
+async def registros_ndjson(stream):
+    numero = 0
+    async for linea in lineas(stream):
+        if not linea.strip():
+            continue
+        numero += 1
+        try:
+            yield numero, json.loads(linea)
+        except ValueError:
+            yield numero, None
+
+
+async def registros_csv(stream):
+    columnas = None
+    pendiente = ""
+    numero = 0
+    async for linea in lineas(stream):
+        pendiente = pendiente + "\n" + linea if pendiente else linea
+        # Un campo entre comillas puede ocupar varias líneas
+        if pendiente.count('"') % 2:
+            continue
+        registro, pendiente = pendiente, ""
+        if not registro.strip():
+            continue
+        valores = next(csv.reader([registro]))
+        if columnas is None:
+            columnas = [c.strip() for c in valores]
+            continue
+        numero += 1
+        # En CSV las celdas vacías son campos sin valor
+        yield numero, {c: v for c, v in zip(columnas, valores) if v != ""}
+
+
+def validar_registro(registro):
+    if not isinstance(registro, dict):
+        return None, [{"campo": "", "mensaje": "Registro con formato inválido"}]
+    try:
+        return TareaImport.model_validate(registro), None
+    except ValidationError as e:
+        return None, [{"campo": ".".join(str(l) for l in err["loc"]), "mensaje": err["msg"]} for err in e.errors()]
+
+
+def fila_tarea(proyecto_id: int, tarea: TareaImport) -> dict:
+    return {
+        "id_proyecto": proyecto_id,
+        "titulo": tarea.titulo,
+        "descripcion": tarea.descripcion,
+        "estado": tarea.estado or EstadoTarea.pendiente,
+        "fecha_creacion": datetime.now(),
+        "fecha_limite": tarea.fecha_limite,
+    }
+
+
+def insertar_lote(db, filas: list) -> int:
+    # Un INSERT multi-fila y un commit por lote
+    insertadas = db.execute(insert(Tarea).values(filas).returning(Tarea.id, Tarea.estado)).all()
+    proyecto_id = filas[0]["id_proyecto"]
+    registrar_cambio(db, proyecto_id, "tarea", [fila.id for fila in insertadas], "alta")
+    estadisticas.sumar_tareas(db, proyecto_id, Counter(fila.estado for fila in insertadas))
+    db.commit()
+    return len(insertadas)
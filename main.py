@@ -1,27 +1,68 @@
-from fastapi import FastAPI, Depends, Header, Body
+from fastapi import FastAPI, Depends, Header, Body, Query, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
-from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
+from contextlib import asynccontextmanager
+from fastapi.responses import StreamingResponse
+from sqlalchemy.orm import Session, selectinload, joinedload
+from sqlalchemy import select, update, delete, tuple_, func, case
 from sqlalchemy.exc import IntegrityError, SQLAlchemyError
+import asyncio
 import os
-import requests
 import secrets
-from typing import Dict, Annotated, List
-from db import Base, engine
+from collections import Counter
+from typing import Dict, Annotated, List, Literal, Optional
+from db import iniciar_engine, cerrar_engine, pool_stats, async_pool_stats, DB_ASYNC
 from models import *
 from schemas import *
 from dotenv import load_dotenv
-from auth import hash_password, verify_password
-from utils import get_db, send_email
+from auth import hash_password, verify_password, hashing_pool, HashingPoolBusy
+from correo import cola_correo
+from rate_limit import limitador, limite_intentos
+from captcha import verificador_captcha, CaptchaNoDisponible, CircuitoAbierto
+from utils import get_db, db_endpoint, run_db, send_email, en_lotes, insert_ignorando_conflictos
+from serializacion import RespuestaLista, JSONResponse, tarea_a_fila
+from metricas import MiddlewareMetricas, registro_metricas
+from cambios import registrar_cambio, ultimo_cambio, cambios_desde, version_proyecto, etag, coincide_etag
+from paginacion import codificar_cursor, decodificar_cursor
+import importacion
+import estadisticas
+import busqueda
+from recordatorios import programador_recordatorios
+from eventos import broker, encolar_evento, formatear_sse, EVENTOS_KEEPALIVE
+import exportacion
+from permisos import ErrorAPI, Membresia, membresia_proyecto, membresia_proyecto_email, cache_membresias
 
 load_dotenv()
-SECRET_KEY = os.getenv("RECAPTCHA_SECRET_KEY")
 
 LOCK_TIME_MINUTES = 5
 MAX_ATTEMPTS = 4
-Base.metadata.create_all(bind=engine)
-
-app = FastAPI()
+TAREAS_LIMITE_DEFAULT = 100
+TAREAS_LIMITE_MAX = 500
+PROYECTOS_LIMITE_DEFAULT = 50
+PROYECTOS_LIMITE_MAX = 200
+# Proyectos sin fecha límite se ordenan al final
+FECHA_LIMITE_MAX = datetime(9999, 12, 31)
+BUSQUEDA_LIMITE_DEFAULT = 20
+BUSQUEDA_LIMITE_MAX = 100
+CAMBIOS_LIMITE_DEFAULT = 1000
+CAMBIOS_LIMITE_MAX = 5000
+# Intentos del compare-and-set de estado ante cambios simultáneos sobre la misma tarea
+ESTADO_REINTENTOS = 3
+# El esquema no se crea al importar: se aplica con python migraciones.py antes de arrancar
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    iniciar_engine()
+    cola_correo.iniciar()
+    await verificador_captcha.iniciar()
+    programador_recordatorios.iniciar()
+    yield
+    await run_in_threadpool(programador_recordatorios.detener)
+    await verificador_captcha.cerrar()
+    await run_in_threadpool(cola_correo.detener)
+    await cerrar_engine()
+
+app = FastAPI(lifespan=lifespan, default_response_class=JSONResponse)
 
 origins = ["*"]
 
@@ -31,17 +72,26 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],            # Métodos permitidos (GET, POST, etc.)
     allow_headers=["*"],            # Headers permitidos
+    expose_headers=["X-Next-Cursor", "ETag", "Server-Timing"],  # Headers legibles desde el front
 )
 
+# Consultas y tiempos por request: header Server-Timing y /metrics
+app.add_middleware(MiddlewareMetricas)
+
+@app.exception_handler(ErrorAPI)
+def manejar_error_api(request, exc: ErrorAPI):
+    return JSONResponse(status_code=exc.status_code, content={"error": exc.error}, headers=exc.headers)
+
 # ---------------------------
 # Endpoint: Registrar usuario
 # ---------------------------
-@app.post("/register")
+@app.post("/register", dependencies=[Depends(limite_intentos("registro"))])
+@db_endpoint
 def register(user:UserCreate, db: Session = Depends(get_db)):
     try:
         correo = user.correo.lower()
         # Revisar si el correo ya existe
-        if db.query(Usuario).filter_by(correo=correo).first():
+        if db.query(Usuario).filter(func.lower(Usuario.correo) == correo).first():
             return JSONResponse(status_code=400, content={"error": "Correo ya registrado"})
         # Crear usuario con contraseña hasheada
         nuevo_usuario = Usuario(
@@ -55,6 +105,10 @@ def register(user:UserCreate, db: Session = Depends(get_db)):
         
         
         return JSONResponse(status_code=201, content={"message": "Usuario registrado exitosamente", "usuario": nuevo_usuario.nombre})
+    except HashingPoolBusy:
+        db.rollback()
+        return JSONResponse(status_code=503, content={"error": "Servidor ocupado, intente nuevamente"}, headers={"Retry-After": "1"})
+
     except IntegrityError as e:
         db.rollback()  # revertir cambios en caso de error
         return JSONResponse(status_code=400, content={"error": "Error de integridad: " + str(e.orig)})
@@ -69,12 +123,13 @@ def register(user:UserCreate, db: Session = Depends(get_db)):
 # ---------------------------
 # Endpoint: Iniciar sesión
 # ---------------------------
-@app.post("/login")
+@app.post("/login", dependencies=[Depends(limite_intentos("login"))])
+@db_endpoint
 def login(user:UserLogin, db: Session = Depends(get_db)):
     try:
         correo = user.correo.lower()
         
-        usuario = db.query(Usuario).filter_by(correo=correo).first()
+        usuario = db.query(Usuario).filter(func.lower(Usuario.correo) == correo).first()
         
         if not usuario:
             return JSONResponse(status_code=404, content={"error": "Usuario no encontrado"})
@@ -87,14 +142,12 @@ def login(user:UserLogin, db: Session = Depends(get_db)):
                 usuario.bloqueado = False
                 usuario.intentos_fallidos = 0
             
-        contraseñas = db.query(Usuario.contrasena)
-        for con in contraseñas:
-            if verify_password(user.contraseña, con[0]):
-                usuario.bloqueado = False
-                usuario.intentos_fallidos = 0
-                db.commit()
-                return JSONResponse(status_code=200, content={"message": "Inicio de sesión exitoso", "usuario": usuario.nombre, "id": usuario.id,"nombre": usuario.nombre,"correo": usuario.correo})
-        
+        if verify_password(user.contraseña, usuario.contrasena):
+            usuario.bloqueado = False
+            usuario.intentos_fallidos = 0
+            db.commit()
+            return JSONResponse(status_code=200, content={"message": "Inicio de sesión exitoso", "usuario": usuario.nombre, "id": usuario.id,"nombre": usuario.nombre,"correo": usuario.correo})
+
         usuario.intentos_fallidos += 1
         usuario.ultimo_intento_fallido = datetime.now()
         
@@ -106,6 +159,10 @@ def login(user:UserLogin, db: Session = Depends(get_db)):
         db.commit()
         return JSONResponse(status_code=401, content={"error": "Contraseña incorrecta"})
     
+    except HashingPoolBusy:
+        db.rollback()
+        return JSONResponse(status_code=503, content={"error": "Servidor ocupado, intente nuevamente"}, headers={"Retry-After": "1"})
+
     except SQLAlchemyError as e:
         db.rollback()
         return JSONResponse(status_code=500, content={"error": "Error de base de datos: " + str(e)})
@@ -118,30 +175,31 @@ def login(user:UserLogin, db: Session = Depends(get_db)):
 # Endpoint: verificar Captcha
 # ---------------------------    
 @app.post("/api/verify-captcha")
-def verify_captcha(req: CaptchaRequest):
+async def verify_captcha(req: CaptchaRequest):
     try:
-        url = "https://www.google.com/recaptcha/api/siteverify"
-        data = {"secret": SECRET_KEY, "response": req.token}
-        r = requests.post(url, data=data)
-        result = r.json()
-        # print("----")
-        # print(result)
-        if not result.get("success"):
-            return JSONResponse(status_code=400, content={"error": "Captcha inválido"})
-        return {"success": True}
+        valido = await verificador_captcha.verificar(req.token)
+    except CircuitoAbierto:
+        return JSONResponse(status_code=503, content={"error": "Servicio de captcha no disponible"},
+                            headers={"Retry-After": str(int(verificador_captcha.enfriamiento))})
+    except CaptchaNoDisponible as e:
+        return JSONResponse(status_code=503, content={"error": str(e)}, headers={"Retry-After": "1"})
     except Exception as e:
         return JSONResponse(status_code=500, content={"error": "Error inesperado: " + str(e)})
+    if not valido:
+        return JSONResponse(status_code=400, content={"error": "Captcha inválido"})
+    return {"success": True}
     
 # ---------------------------
 # Endpoint: resetear contraseña
 # ---------------------------
-@app.post("/reset-password")
+@app.post("/reset-password", dependencies=[Depends(limite_intentos("reset_password"))])
+@db_endpoint
 def reset_password(credentials:ResetPasswordRequest, db: Session = Depends(get_db)):
     try:
-        email = credentials.correo
+        email = credentials.correo.lower()
         new_password = credentials.nueva_contraseña
         
-        user = db.query(Usuario).filter(Usuario.correo == email).first()
+        user = db.query(Usuario).filter(func.lower(Usuario.correo) == email).first()
         if not user:
             return JSONResponse(status_code=404, content={"error":"Usuario no encontrado"})
 
@@ -156,6 +214,9 @@ def reset_password(credentials:ResetPasswordRequest, db: Session = Depends(get_d
 
         return {"message": "Contraseña actualizada correctamente"}
     
+    except HashingPoolBusy:
+        db.rollback()
+        return JSONResponse(status_code=503, content={"error": "Servidor ocupado, intente nuevamente"}, headers={"Retry-After": "1"})
     except SQLAlchemyError as e:
         db.rollback()
         return JSONResponse(status_code=500, content={"error": "Error de base de datos: " + str(e)})   
@@ -167,10 +228,11 @@ def reset_password(credentials:ResetPasswordRequest, db: Session = Depends(get_d
 # Endpoint: crear proyecto
 # ---------------------------
 @app.post("/proyectos")
+@db_endpoint
 def crear_proyecto(proyecto: ProyectoCreate, x_user_mail: Annotated[str, Header(...)], db: Session = Depends(get_db)):
     try:
         correo = x_user_mail.lower()
-        dueño = db.query(Usuario).filter(Usuario.correo == correo).first()
+        dueño = db.query(Usuario).filter(func.lower(Usuario.correo) == correo).first()
         if not dueño:
             return JSONResponse(status_code=404, content={"error": "Correo de usuario no encontrado"})
 
@@ -188,6 +250,7 @@ def crear_proyecto(proyecto: ProyectoCreate, x_user_mail: Annotated[str, Header(
             rol = RolProyecto.dueño
         )
         db.add(integrante_dueño)
+        estadisticas.crear(db, nuevo_proyecto.id)
         db.commit()
         db.refresh(nuevo_proyecto)
 
@@ -207,30 +270,72 @@ def crear_proyecto(proyecto: ProyectoCreate, x_user_mail: Annotated[str, Header(
 # Endpoint: listar proyectos de un usuario por correo
 # ---------------------------
 @app.get("/proyectos", response_model=List[ProyectoUsuarioInfo])
-def listar_proyectos_usuario(x_user_mail: Annotated[str, Header(...)], db: Session = Depends(get_db)):
+@db_endpoint
+def listar_proyectos_usuario(
+    x_user_mail: Annotated[str, Header(...)],
+    orden: Literal["id", "fecha_limite"] = "id",
+    cursor: Optional[str] = None,
+    limite: int = Query(PROYECTOS_LIMITE_DEFAULT, ge=1, le=PROYECTOS_LIMITE_MAX),
+    db: Session = Depends(get_db)
+):
     try:
         correo = x_user_mail.lower()
-        usuario = db.query(Usuario).filter(Usuario.correo == correo).first()
-        if not usuario:
-            raise JSONResponse(status_code=404, content={"error":"Correo de usuario no encontrado"})
 
-        resultado: List[dict] = []
+        # Proyectos, rol del usuario y cantidad de tareas por estado en una sola consulta
+        conteos = [func.count(case((Tarea.estado == estado, 1))).label(estado.name) for estado in EstadoTarea]
+        consulta = (
+            select(Proyecto.id, Proyecto.nombre, Proyecto.descripcion, Proyecto.fecha_limite, ProyectoIntegrante.rol, *conteos)
+            .select_from(ProyectoIntegrante)
+            .join(Usuario, Usuario.id == ProyectoIntegrante.id_usuario)
+            .join(Proyecto, Proyecto.id == ProyectoIntegrante.id_proyecto)
+            .outerjoin(Tarea, Tarea.id_proyecto == Proyecto.id)
+            .where(func.lower(Usuario.correo) == correo)
+            .group_by(Proyecto.id, Proyecto.nombre, Proyecto.descripcion, Proyecto.fecha_limite, ProyectoIntegrante.rol)
+        )
 
-        # Proyectos donde es integrante (puede solaparse con dueño, se sobreescribe si es dueño)
-        for integrante in usuario.proyectos_integrante:
-            proj = getattr(integrante, "proyecto", None)
-            if proj:
-                rol = getattr(integrante, "rol", None)
-                rol_str = rol.value if hasattr(rol, "value") else str(rol) if rol else ""
-                resultado.append({
-                    "id": proj.id,
-                    "nombre_proyecto": proj.nombre,
-                    "descripcion": proj.descripcion,
-                    "fecha_finalizacion": proj.fecha_limite,
-                    "rol_usuario": rol_str
-                })
+        # Paginación keyset; sin fecha límite van al final
+        if orden == "fecha_limite":
+            claves = [func.coalesce(Proyecto.fecha_limite, FECHA_LIMITE_MAX), Proyecto.id]
+            tipos = (datetime, int)
+        else:
+            claves = [Proyecto.id]
+            tipos = (int,)
+        if cursor:
+            try:
+                valores = decodificar_cursor(cursor, len(claves), tipos)
+            except ValueError as e:
+                return JSONResponse(status_code=400, content={"error": str(e)})
+            consulta = consulta.where(tuple_(*claves) > tuple_(*valores))
+
+        filas = db.execute(consulta.order_by(*claves).limit(limite + 1)).all()
+        if not filas and not cursor:
+            # Sin proyectos: distinguir usuario inexistente
+            if not db.query(Usuario.id).filter(func.lower(Usuario.correo) == correo).first():
+                return JSONResponse(status_code=404, content={"error": "Correo de usuario no encontrado"})
+
+        headers = {}
+        if len(filas) > limite:
+            filas = filas[:limite]
+            ultima = filas[-1]
+            if orden == "fecha_limite":
+                headers["X-Next-Cursor"] = codificar_cursor(ultima.fecha_limite or FECHA_LIMITE_MAX, ultima.id)
+            else:
+                headers["X-Next-Cursor"] = codificar_cursor(ultima.id)
+
+        resultado: List[dict] = []
+        for fila in filas:
+            por_estado = {estado.value: getattr(fila, estado.name) for estado in EstadoTarea}
+            resultado.append({
+                "id": fila.id,
+                "nombre_proyecto": fila.nombre,
+                "descripcion": fila.descripcion,
+                "fecha_finalizacion": fila.fecha_limite,
+                "rol_usuario": fila.rol.value if hasattr(fila.rol, "value") else str(fila.rol),
+                "tareas_por_estado": por_estado,
+                "total_tareas": sum(por_estado.values()),
+            })
 
-        return resultado
+        return RespuestaLista(ProyectosUsuarioAdapter, resultado, headers=headers)
 
     except SQLAlchemyError as e:
         return JSONResponse(status_code=500, content={"error": "Error de base de datos: " + str(e)})
@@ -241,22 +346,22 @@ def listar_proyectos_usuario(x_user_mail: Annotated[str, Header(...)], db: Sessi
 # Endpoint: eliminar proyecto 
 # ---------------------------
 @app.delete("/proyectos/{proyecto_id}")
-def eliminar_proyecto(proyecto_id: int, x_user_mail: Annotated[str, Header(...)], db: Session = Depends(get_db)):
+@db_endpoint
+def eliminar_proyecto(proyecto_id: int, membresia: Membresia = Depends(membresia_proyecto), db: Session = Depends(get_db)):
     try:
-        correo = x_user_mail.lower()
-        dueño = db.query(Usuario).filter(Usuario.correo == correo).first()
-        if not dueño:
-            return JSONResponse(status_code=404, content={"error": "Usuario no encontrado"})
+        if not membresia.es_dueño:
+            return JSONResponse(status_code=403, content={"error": "No autorizado: no sos el dueño del proyecto"})
 
-        proyecto = db.query(Proyecto).filter(Proyecto.id == proyecto_id).first()
+        proyecto = db.get(Proyecto, proyecto_id)
         if not proyecto:
             return JSONResponse(status_code=404, content={"error": "Proyecto no encontrado"})
 
-        if proyecto.id_dueño != dueño.id:
-            return JSONResponse(status_code=403, content={"error": "No autorizado: no sos el dueño del proyecto"})
-
         db.delete(proyecto)
+        db.execute(delete(Cambio).where(Cambio.id_proyecto == proyecto_id))
+        estadisticas.eliminar(db, proyecto_id)
+        encolar_evento(db, proyecto_id, {"tipo": "proyecto.baja"})
         db.commit()
+        cache_membresias.invalidar_proyecto(proyecto_id)
 
         return JSONResponse(status_code=200, content={"message": "Proyecto eliminado correctamente", "id_proyecto": proyecto_id})
 
@@ -271,49 +376,38 @@ def eliminar_proyecto(proyecto_id: int, x_user_mail: Annotated[str, Header(...)]
 # Endpoint: agregar integrantes
 # ---------------------------
 @app.post("/proyectos/{proyecto_id}/integrantes")
+@db_endpoint
 def agregar_integrantes(
     proyecto_id: int,
-    x_user_mail: Annotated[str, Header(...)],
+    membresia: Membresia = Depends(membresia_proyecto),
     integrantes_req: IntegrantesAddRequest = Body(...),
     db: Session = Depends(get_db)
 ):
     try:
-        correo = x_user_mail.lower()
-        dueño = db.query(Usuario).filter(Usuario.correo == correo).first()
-        if not dueño:
-            return JSONResponse(status_code=404, content={"error": "Usuario no encontrado"})
-
-        proyecto = db.query(Proyecto).filter(Proyecto.id == proyecto_id).first()
-        if not proyecto:
-            return JSONResponse(status_code=404, content={"error": "Proyecto no encontrado"})
-
-        if proyecto.id_dueño != dueño.id:
+        if not membresia.es_dueño:
             return JSONResponse(status_code=403, content={"error": "No autorizado: no sos el dueño del proyecto"})
 
-        mapping: Dict[str, str] = integrantes_req.root
+        mapping: Dict[str, str] = {email.lower(): rol for email, rol in integrantes_req.root.items()}
 
         # Validar roles y usuarios
-        roles_invalid = []
-        usuarios_no_existentes = []
-        ya_integrantes = []
-
-        for email_raw, rol in mapping.items():
-            email = email_raw.lower()
-            if rol not in ("editor", "lector"):
-                roles_invalid.append({email: rol})
-                continue
-
-            usuario = db.query(Usuario).filter(Usuario.correo == email).first()
-            if not usuario:
-                usuarios_no_existentes.append(email)
-                continue
-
-            existe = db.query(ProyectoIntegrante).filter(
+        roles_invalid = [{email: rol} for email, rol in mapping.items() if rol not in ("editor", "lector")]
+        correos_validos = [email for email, rol in mapping.items() if rol in ("editor", "lector")]
+
+        # Usuarios existentes: una consulta IN por lote de correos
+        ids_por_correo: Dict[str, int] = {}
+        for lote in en_lotes(correos_validos):
+            filas = db.query(func.lower(Usuario.correo), Usuario.id).filter(func.lower(Usuario.correo).in_(lote))
+            ids_por_correo.update(filas)
+        usuarios_no_existentes = [email for email in correos_validos if email not in ids_por_correo]
+
+        # Integrantes actuales entre esos usuarios
+        ids_integrantes = set()
+        for lote in en_lotes(ids_por_correo.values()):
+            ids_integrantes.update(id_usuario for (id_usuario,) in db.query(ProyectoIntegrante.id_usuario).filter(
                 ProyectoIntegrante.id_proyecto == proyecto_id,
-                ProyectoIntegrante.id_usuario == usuario.id
-            ).first()
-            if existe:
-                ya_integrantes.append(email)
+                ProyectoIntegrante.id_usuario.in_(lote)
+            ))
+        ya_integrantes = [email for email, id_usuario in ids_por_correo.items() if id_usuario in ids_integrantes]
 
         if roles_invalid or usuarios_no_existentes or ya_integrantes:
             return JSONResponse(status_code=400, content={
@@ -323,24 +417,24 @@ def agregar_integrantes(
                 "ya_integrantes": ya_integrantes
             })
 
-        # Agregar integrantes
-        creados = []
-        for email_raw, rol in mapping.items():
-            email = email_raw.lower()
-            usuario = db.query(Usuario).filter(Usuario.correo == email).first()
-            # usuario y rol ya validados
-            role_enum = RolProyecto(rol)  # crear a partir del valor
-            nuevo = ProyectoIntegrante(
-                id_proyecto=proyecto_id,
-                id_usuario=usuario.id,
-                rol=role_enum
-            )
-            db.add(nuevo)
-            creados.append({"email": email, "rol": rol})
-
+        # Agregar integrantes en un único insert; los que otro pedido agregó en el medio quedan como conflicto
+        filas = [
+            {"id_proyecto": proyecto_id, "id_usuario": ids_por_correo[email], "rol": RolProyecto(mapping[email])}
+            for email in correos_validos
+        ]
+        insertados = {fila.id_usuario for fila in insert_ignorando_conflictos(
+            db, ProyectoIntegrante, filas,
+            columnas_conflicto=["id_proyecto", "id_usuario"],
+            returning=[ProyectoIntegrante.id_usuario]
+        )}
+        creados = [{"email": email, "rol": mapping[email]} for email in correos_validos if ids_por_correo[email] in insertados]
+        conflictos = [email for email in correos_validos if ids_por_correo[email] not in insertados]
+
+        registrar_cambio(db, proyecto_id, "integrante", insertados, "alta")
         db.commit()
+        cache_membresias.invalidar_proyecto(proyecto_id)
 
-        return JSONResponse(status_code=201, content={"message": "Integrantes agregados exitosamente", "integrantes": creados})
+        return JSONResponse(status_code=201, content={"message": "Integrantes agregados exitosamente", "integrantes": creados, "conflictos": conflictos})
 
     except SQLAlchemyError as e:
         db.rollback()
@@ -353,32 +447,24 @@ def agregar_integrantes(
 # Endpoint: eliminar integrante
 # ---------------------------
 @app.delete("/proyectos/{proyecto_id}/integrantes")
+@db_endpoint
 def eliminar_integrante(
     proyecto_id: int,
-    x_user_mail: Annotated[str, Header(...)],
+    membresia: Membresia = Depends(membresia_proyecto),
     payload: IntegranteRemoveRequest = Body(...),
     db: Session = Depends(get_db)
 ):
     try:
-        correo_dueño = x_user_mail.lower()
-        dueño = db.query(Usuario).filter(Usuario.correo == correo_dueño).first()
-        if not dueño:
-            return JSONResponse(status_code=404, content={"error": "Usuario no encontrado"})
-
-        proyecto = db.query(Proyecto).filter(Proyecto.id == proyecto_id).first()
-        if not proyecto:
-            return JSONResponse(status_code=404, content={"error": "Proyecto no encontrado"})
-
-        if proyecto.id_dueño != dueño.id:
+        if not membresia.es_dueño:
             return JSONResponse(status_code=403, content={"error": "No autorizado: no sos el dueño del proyecto"})
 
         correo_objetivo = payload.correo.lower()
-        usuario = db.query(Usuario).filter(Usuario.correo == correo_objetivo).first()
+        usuario = db.query(Usuario).filter(func.lower(Usuario.correo) == correo_objetivo).first()
         if not usuario:
             return JSONResponse(status_code=404, content={"error": "Usuario a eliminar no existe"})
 
         # Evitar eliminar al dueño por este endpoint
-        if usuario.id == proyecto.id_dueño:
+        if usuario.id == membresia.id_dueño:
             return JSONResponse(status_code=400, content={"error": "No se puede eliminar al dueño del proyecto"})
 
         integrante = db.query(ProyectoIntegrante).filter(
@@ -389,7 +475,9 @@ def eliminar_integrante(
             return JSONResponse(status_code=404, content={"error": "El usuario no es integrante del proyecto"})
 
         db.delete(integrante)
+        registrar_cambio(db, proyecto_id, "integrante", [usuario.id], "baja")
         db.commit()
+        cache_membresias.invalidar_proyecto(proyecto_id)
         return JSONResponse(status_code=200, content={"message": "Integrante eliminado correctamente", "correo": correo_objetivo, "id_proyecto": proyecto_id})
 
     except SQLAlchemyError as e:
@@ -403,35 +491,16 @@ def eliminar_integrante(
 # Endpoint: crear tarea en proyecto
 # ---------------------------
 @app.post("/proyectos/{proyecto_id}/tareas")
+@db_endpoint
 def crear_tarea_en_proyecto(
     proyecto_id: int,
-    x_user_email: Annotated[str, Header(...)],
+    membresia: Membresia = Depends(membresia_proyecto_email),
     payload: TareaCreate = Body(...),
     db: Session = Depends(get_db)
 ):
     try:
-        correo = x_user_email.lower()
-        usuario = db.query(Usuario).filter(Usuario.correo == correo).first()
-        if not usuario:
-            return JSONResponse(status_code=404, content={"error": "Usuario no encontrado"})
-
-        proyecto = db.query(Proyecto).filter(Proyecto.id == proyecto_id).first()
-        if not proyecto:
-            return JSONResponse(status_code=404, content={"error": "Proyecto no encontrado"})
-
         # verificar rol: dueño del proyecto o integrante con rol editor
-        autorizado = False
-        if proyecto.id_dueño == usuario.id:
-            autorizado = True
-        else:
-            integrante = db.query(ProyectoIntegrante).filter(
-                ProyectoIntegrante.id_proyecto == proyecto_id,
-                ProyectoIntegrante.id_usuario == usuario.id
-            ).first()
-            if integrante and integrante.rol in (RolProyecto.editor, RolProyecto.dueño):
-                autorizado = True
-
-        if not autorizado:
+        if not membresia.puede_editar:
             return JSONResponse(status_code=403, content={"error": "No autorizado: se requiere rol 'editor' o ser dueño del proyecto"})
 
         nueva_tarea = Tarea(
@@ -441,6 +510,9 @@ def crear_tarea_en_proyecto(
             fecha_limite=payload.fecha_limite
         )
         db.add(nueva_tarea)
+        db.flush()
+        registrar_cambio(db, proyecto_id, "tarea", [nueva_tarea.id], "alta")
+        estadisticas.sumar_tareas(db, proyecto_id, {nueva_tarea.estado or EstadoTarea.pendiente: 1})
         db.commit()
         db.refresh(nueva_tarea)
 
@@ -453,94 +525,323 @@ def crear_tarea_en_proyecto(
         db.rollback()
         return JSONResponse(status_code=500, content={"error": "Error inesperado: " + str(e)})
 
+# ---------------------------
+# Endpoint: importar tareas en proyecto (NDJSON / CSV)
+# ---------------------------
+@app.post("/proyectos/{proyecto_id}/tareas/importar")
+async def importar_tareas(
+    proyecto_id: int,
+    request: Request,
+    membresia: Membresia = Depends(membresia_proyecto),
+    db: Session = Depends(get_db)
+):
+    insertadas = 0
+    try:
+        if not membresia.puede_editar:
+            return JSONResponse(status_code=403, content={"error": "No autorizado: se requiere rol 'editor' o ser dueño del proyecto"})
+
+        content_type = request.headers.get("content-type", "").split(";")[0].strip().lower()
+        if content_type in ("text/csv", "application/csv"):
+            registros = importacion.registros_csv(request.stream())
+        elif content_type in ("application/x-ndjson", "application/jsonl", "application/json-seq", ""):
+            registros = importacion.registros_ndjson(request.stream())
+        else:
+            return JSONResponse(status_code=415, content={"error": "Formato no soportado, usar application/x-ndjson o text/csv"})
+
+        errores = []
+        total_errores = 0
+        lote = []
+        async for numero, registro in registros:
+            tarea, error = importacion.validar_registro(registro)
+            if error:
+                total_errores += 1
+                if len(errores) < importacion.IMPORT_MAX_ERRORES:
+                    errores.append({"fila": numero, "errores": error})
+                continue
+            lote.append(importacion.fila_tarea(proyecto_id, tarea))
+            if len(lote) >= importacion.IMPORT_TAMAÑO_LOTE:
+                insertadas += await run_db(db, importacion.insertar_lote, lote)
+                lote = []
+        if lote:
+            insertadas += await run_db(db, importacion.insertar_lote, lote)
+
+        return JSONResponse(status_code=201 if insertadas else 400, content={
+            "message": "Importación finalizada",
+            "insertadas": insertadas,
+            "filas_con_error": total_errores,
+            "errores": errores
+        })
+
+    except SQLAlchemyError as e:
+        await run_db(db, Session.rollback)
+        return JSONResponse(status_code=500, content={"error": "Error de base de datos: " + str(e), "insertadas": insertadas})
+    except Exception as e:
+        await run_db(db, Session.rollback)
+        return JSONResponse(status_code=500, content={"error": "Error inesperado: " + str(e), "insertadas": insertadas})
+
 # ---------------------------
 # Endpoint: listar tareas en proyecto
 # ---------------------------
 @app.get("/proyectos/{proyecto_id}/tareas", response_model=List[TareaResponse])
+@db_endpoint
 def listar_tareas_proyecto(
     proyecto_id: int,
+    request: Request,
+    membresia: Membresia = Depends(membresia_proyecto),
+    estado: Optional[EstadoTarea] = None,
+    fecha_limite_desde: Optional[datetime] = None,
+    fecha_limite_hasta: Optional[datetime] = None,
+    responsable: Optional[int] = Query(None, description="id de usuario responsable"),
+    cursor: Optional[str] = None,
+    limite: int = Query(TAREAS_LIMITE_DEFAULT, ge=1, le=TAREAS_LIMITE_MAX),
+    if_none_match: Annotated[Optional[str], Header()] = None,
+    db: Session = Depends(get_db)
+):
+    try:
+        # Verificar que el usuario sea dueño o integrante del proyecto
+        if not membresia.es_integrante:
+            return JSONResponse(status_code=403, content={"error": "No autorizado: no sos integrante del proyecto"})
+
+        # Sin cambios desde la última consulta del cliente: 304 sin cargar tareas
+        headers = {"ETag": etag("tareas", proyecto_id, version_proyecto(db, proyecto_id), request.query_params), "Cache-Control": "no-cache"}
+        if coincide_etag(if_none_match, headers["ETag"]):
+            return Response(status_code=304, headers=headers)
+
+        # Responsables y sus usuarios se cargan en una segunda consulta para toda la página
+        consulta = (
+            db.query(Tarea)
+            .options(selectinload(Tarea.responsables).joinedload(TareaResponsable.usuario))
+            .filter(Tarea.id_proyecto == proyecto_id)
+        )
+        if estado:
+            consulta = consulta.filter(Tarea.estado == estado)
+        if fecha_limite_desde:
+            consulta = consulta.filter(Tarea.fecha_limite >= fecha_limite_desde)
+        if fecha_limite_hasta:
+            consulta = consulta.filter(Tarea.fecha_limite <= fecha_limite_hasta)
+        if responsable:
+            consulta = consulta.filter(Tarea.id.in_(
+                select(TareaResponsable.id_tarea).where(TareaResponsable.id_usuario == responsable)
+            ))
+        if cursor:
+            try:
+                fecha_cursor, id_cursor = decodificar_cursor(cursor, 2, (datetime, int))
+            except ValueError as e:
+                return JSONResponse(status_code=400, content={"error": str(e)})
+            consulta = consulta.filter(tuple_(Tarea.fecha_creacion, Tarea.id) > tuple_(fecha_cursor, id_cursor))
+
+        # Paginación keyset sobre (fecha_creacion, id); se pide una fila de más para saber si hay otra página
+        tareas = consulta.order_by(Tarea.fecha_creacion, Tarea.id).limit(limite + 1).all()
+        if len(tareas) > limite:
+            tareas = tareas[:limite]
+            ultima = tareas[-1]
+            headers["X-Next-Cursor"] = codificar_cursor(ultima.fecha_creacion, ultima.id)
+
+        resultado = [tarea_a_fila(tarea) for tarea in tareas]
+        return RespuestaLista(TareasAdapter, resultado, headers=headers)
+
+    except SQLAlchemyError as e:
+        return JSONResponse(status_code=500, content={"error": "Error de base de datos: " + str(e)})
+    except Exception as e:
+        return JSONResponse(status_code=500, content={"error": "Error inesperado: " + str(e)})
+    
+# ---------------------------
+# Endpoint: exportar tareas del proyecto (NDJSON / CSV en streaming)
+# ---------------------------
+@app.get("/proyectos/{proyecto_id}/tareas/exportar")
+def exportar_tareas_proyecto(
+    proyecto_id: int,
+    formato: Literal["ndjson", "csv"] = "ndjson",
+    membresia: Membresia = Depends(membresia_proyecto)
+):
+    if not membresia.es_integrante:
+        return JSONResponse(status_code=403, content={"error": "No autorizado: no sos integrante del proyecto"})
+
+    media_type = "text/csv; charset=utf-8" if formato == "csv" else "application/x-ndjson"
+    return StreamingResponse(
+        exportacion.exportar_tareas(proyecto_id, formato),
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="proyecto-{proyecto_id}-tareas.{formato}"'}
+    )
+
+# ---------------------------
+# Endpoint: buscar tareas por texto en los proyectos del usuario
+# ---------------------------
+@app.get("/tareas/buscar", response_model=List[TareaBusquedaResponse])
+@db_endpoint
+def buscar_tareas(
     x_user_mail: Annotated[str, Header(...)],
+    q: str = Query(..., min_length=1, max_length=200),
+    proyecto_id: Optional[int] = None,
+    cursor: Optional[str] = None,
+    limite: int = Query(BUSQUEDA_LIMITE_DEFAULT, ge=1, le=BUSQUEDA_LIMITE_MAX),
     db: Session = Depends(get_db)
 ):
     try:
-        correo = x_user_mail.lower()
-        usuario = db.query(Usuario).filter(Usuario.correo == correo).first()
-        if not usuario:
-            return JSONResponse(status_code=404, content={"error": "Usuario no encontrado"})
+        terminos = busqueda.terminos(q)
+        if not terminos:
+            return JSONResponse(status_code=400, content={"error": "La búsqueda no contiene palabras"})
+        despues = None
+        if cursor:
+            try:
+                despues = decodificar_cursor(cursor, 2, (float, int))
+            except ValueError as e:
+                return JSONResponse(status_code=400, content={"error": str(e)})
+
+        # Ordenadas por relevancia; solo proyectos donde el usuario es integrante
+        filas = busqueda.buscar_tareas(db, x_user_mail, terminos, limite, despues, proyecto_id)
+        headers = {}
+        if len(filas) > limite:
+            filas = filas[:limite]
+            headers["X-Next-Cursor"] = codificar_cursor(filas[-1].puntaje, filas[-1].id)
+
+        resultado = [{
+            "id": fila.id,
+            "id_proyecto": fila.id_proyecto,
+            "nombre_proyecto": fila.nombre_proyecto,
+            "titulo": fila.titulo,
+            "descripcion": fila.descripcion,
+            "estado": EstadoTarea[fila.estado].value if fila.estado else EstadoTarea.pendiente.value,
+        } for fila in filas]
+        return RespuestaLista(BusquedaAdapter, resultado, headers=headers)
 
-        proyecto = db.query(Proyecto).filter(Proyecto.id == proyecto_id).first()
-        if not proyecto:
-            return JSONResponse(status_code=404, content={"error": "Proyecto no encontrado"})
+    except SQLAlchemyError as e:
+        return JSONResponse(status_code=500, content={"error": "Error de base de datos: " + str(e)})
+    except Exception as e:
+        return JSONResponse(status_code=500, content={"error": "Error inesperado: " + str(e)})
 
-        # Verificar que el usuario sea dueño o integrante del proyecto
-        if proyecto.id_dueño != usuario.id:
-            integrante = db.query(ProyectoIntegrante).filter(
-                ProyectoIntegrante.id_proyecto == proyecto_id,
-                ProyectoIntegrante.id_usuario == usuario.id
-            ).first()
-            if not integrante:
-                return JSONResponse(status_code=403, content={"error": "No autorizado: no sos integrante del proyecto"})
+# ---------------------------
+# Endpoint: estadísticas del proyecto (dashboard)
+# ---------------------------
+@app.get("/proyectos/{proyecto_id}/estadisticas")
+@db_endpoint
+def estadisticas_proyecto(
+    proyecto_id: int,
+    membresia: Membresia = Depends(membresia_proyecto),
+    db: Session = Depends(get_db)
+):
+    try:
+        if not membresia.es_integrante:
+            return JSONResponse(status_code=403, content={"error": "No autorizado: no sos integrante del proyecto"})
+        return estadisticas.resumen(db, proyecto_id)
 
-        tareas = db.query(Tarea).filter(Tarea.id_proyecto == proyecto_id).all()
-        resultado: List[dict] = []
-        for tarea in tareas:
-            responsables_list = []
-            for tr in getattr(tarea, "responsables", []):
-                if getattr(tr, "usuario", None):
-                    responsables_list.append({
-                        "id": tr.usuario.id,
-                        "nombre": tr.usuario.nombre
-                    })
+    except SQLAlchemyError as e:
+        return JSONResponse(status_code=500, content={"error": "Error de base de datos: " + str(e)})
+    except Exception as e:
+        return JSONResponse(status_code=500, content={"error": "Error inesperado: " + str(e)})
 
-            resultado.append({
-                "id": tarea.id,
-                "id_proyecto": tarea.id_proyecto,
-                "titulo": tarea.titulo,
-                "descripcion": tarea.descripcion,
-                "estado": tarea.estado.value if hasattr(tarea.estado, "value") else str(tarea.estado),
-                "fecha_creacion": tarea.fecha_creacion,
-                "fecha_limite": tarea.fecha_limite,
-                "responsables": responsables_list
-            })
+# ---------------------------
+# Endpoint: cambios del proyecto desde un cursor (sincronización incremental)
+# ---------------------------
+@app.get("/proyectos/{proyecto_id}/cambios")
+@db_endpoint
+def listar_cambios_proyecto(
+    proyecto_id: int,
+    membresia: Membresia = Depends(membresia_proyecto),
+    since: Optional[str] = Query(None, description="cursor devuelto por la consulta anterior"),
+    limite: int = Query(CAMBIOS_LIMITE_DEFAULT, ge=1, le=CAMBIOS_LIMITE_MAX),
+    db: Session = Depends(get_db)
+):
+    try:
+        if not membresia.es_integrante:
+            return JSONResponse(status_code=403, content={"error": "No autorizado: no sos integrante del proyecto"})
+
+        # Sin cursor se devuelve solo el punto de partida: el cliente lo pide antes de la carga completa
+        # de /tareas e /integrantes y desde ahí sincroniza con since
+        if not since:
+            vacio = {"cursor": codificar_cursor(ultimo_cambio(db, proyecto_id)), "hay_mas": False,
+                     "tareas": [], "tareas_eliminadas": [], "integrantes": [], "integrantes_eliminados": []}
+            return RespuestaLista(CambiosAdapter, vacio)
+        try:
+            (desde,) = decodificar_cursor(since, 1)
+            if not isinstance(desde, int):
+                raise ValueError("Cursor inválido")
+        except ValueError as e:
+            return JSONResponse(status_code=400, content={"error": str(e)})
 
-        return resultado
+        resultado = cambios_desde(db, proyecto_id, desde, limite)
+        resultado["cursor"] = codificar_cursor(resultado["cursor"])
+        return RespuestaLista(CambiosAdapter, resultado)
 
     except SQLAlchemyError as e:
         return JSONResponse(status_code=500, content={"error": "Error de base de datos: " + str(e)})
     except Exception as e:
         return JSONResponse(status_code=500, content={"error": "Error inesperado: " + str(e)})
-    
+
+# ---------------------------
+# Endpoint: eventos en vivo del proyecto (Server-Sent Events)
+# ---------------------------
+@app.get("/proyectos/{proyecto_id}/eventos")
+async def eventos_proyecto(
+    proyecto_id: int,
+    request: Request,
+    membresia: Membresia = Depends(membresia_proyecto),
+    db: Session = Depends(get_db)
+):
+    if not membresia.es_integrante:
+        return JSONResponse(status_code=403, content={"error": "No autorizado: no sos integrante del proyecto"})
+    # La membresía ya está resuelta: no retener una conexión del pool mientras dure el stream
+    await run_db(db, Session.close)
+
+    suscripcion = broker.suscribir(proyecto_id, membresia.id_usuario)
+
+    async def flujo():
+        try:
+            yield f"retry: 3000\n: suscripto al proyecto {proyecto_id}\n\n"
+            while not await request.is_disconnected():
+                try:
+                    evento = await asyncio.wait_for(suscripcion.cola.get(), timeout=EVENTOS_KEEPALIVE)
+                except asyncio.TimeoutError:
+                    yield ": ping\n\n"
+                    continue
+                yield formatear_sse(evento)
+                # Proyecto eliminado o el usuario dejó de ser integrante: se corta el stream
+                if evento["tipo"] == "proyecto.baja" or (
+                    evento["tipo"] == "integrante.baja" and membresia.id_usuario in evento["ids"]
+                ):
+                    break
+        finally:
+            broker.cancelar(suscripcion)
+
+    return StreamingResponse(flujo(), media_type="text/event-stream",
+                             headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
 @app.delete("/proyectos/{proyecto_id}/tareas/{tarea_id}")
+@db_endpoint
 def eliminar_tarea(
     proyecto_id: int,
     tarea_id: int,
-    x_user_mail: Annotated[str, Header(...)],
+    membresia: Membresia = Depends(membresia_proyecto),
     db: Session = Depends(get_db)
 ):
     try:
-        correo = x_user_mail.lower()
-        usuario = db.query(Usuario).filter(Usuario.correo == correo).first()
-        if not usuario:
-            return JSONResponse(status_code=404, content={"error": "Usuario no encontrado"})
-
-        proyecto = db.query(Proyecto).filter(Proyecto.id == proyecto_id).first()
-        if not proyecto:
-            return JSONResponse(status_code=404, content={"error": "Proyecto no encontrado"})
-
         # Verificar permiso: dueño o integrante con rol editor
-        if proyecto.id_dueño != usuario.id:
-            integrante = db.query(ProyectoIntegrante).filter(
-                ProyectoIntegrante.id_proyecto == proyecto_id,
-                ProyectoIntegrante.id_usuario == usuario.id
-            ).first()
-            if not integrante or integrante.rol != RolProyecto.editor:
-                return JSONResponse(status_code=403, content={"error": "No autorizado: se requiere rol 'editor' o ser dueño del proyecto"})
+        if not membresia.puede_editar:
+            return JSONResponse(status_code=403, content={"error": "No autorizado: se requiere rol 'editor' o ser dueño del proyecto"})
 
-        tarea = db.query(Tarea).filter(Tarea.id == tarea_id, Tarea.id_proyecto == proyecto_id).first()
-        if not tarea:
+        # Los DELETE ... RETURNING devuelven lo que efectivamente se borró: si otro request cambió el
+        # estado o borró la tarea entre medio, los deltas de project_stats siguen siendo exactos
+        de_la_tarea = select(Tarea.id).where(Tarea.id == tarea_id, Tarea.id_proyecto == proyecto_id)
+        responsables = db.execute(
+            delete(TareaResponsable)
+            .where(TareaResponsable.id_tarea.in_(de_la_tarea))
+            .returning(TareaResponsable.id_usuario)
+            .execution_options(synchronize_session=False)
+        ).scalars().all()
+        fila = db.execute(
+            delete(Tarea)
+            .where(Tarea.id == tarea_id, Tarea.id_proyecto == proyecto_id)
+            .returning(Tarea.estado)
+            .execution_options(synchronize_session=False)
+        ).first()
+        if fila is None:
+            db.rollback()
             return JSONResponse(status_code=404, content={"error": "Tarea no encontrada en el proyecto"})
 
-        db.delete(tarea)
+        abierta = estadisticas.abierta(fila.estado)
+        registrar_cambio(db, proyecto_id, "tarea", [tarea_id], "baja")
+        estadisticas.sumar_tareas(db, proyecto_id, {fila.estado: -1})
+        estadisticas.sumar_responsables(db, proyecto_id, {id_usuario: (-1, -int(abierta)) for id_usuario in responsables})
         db.commit()
         return JSONResponse(status_code=200, content={"message": "Tarea eliminada correctamente", "id_tarea": tarea_id})
 
@@ -555,40 +856,21 @@ def eliminar_tarea(
 # Endpoint: agregar responsables a una tarea
 # ---------------------------
 @app.post("/proyectos/{proyecto_id}/tareas/{tarea_id}/responsables")
+@db_endpoint
 def agregar_responsables_tarea(
     proyecto_id: int,
     tarea_id: int,
-    x_user_mail: Annotated[str, Header(...)],
+    membresia: Membresia = Depends(membresia_proyecto),
     payload: ResponsablesAddRequest = Body(...),
     db: Session = Depends(get_db)
 ):
     try:
-        correo = x_user_mail.lower()
-        usuario = db.query(Usuario).filter(Usuario.correo == correo).first()
-        if not usuario:
-            return JSONResponse(status_code=404, content={"error": "Usuario (usuario) no encontrado"})
-
-        proyecto = db.query(Proyecto).filter(Proyecto.id == proyecto_id).first()
-        if not proyecto:
-            return JSONResponse(status_code=404, content={"error": "Proyecto no encontrado"})
-
         tarea = db.query(Tarea).filter(Tarea.id == tarea_id, Tarea.id_proyecto == proyecto_id).first()
         if not tarea:
             return JSONResponse(status_code=404, content={"error": "Tarea no encontrada en el proyecto"})
 
         # verificar permiso: dueño o integrante con rol editor
-        autorizado = False
-        if proyecto.id_dueño == usuario.id:
-            autorizado = True
-        else:
-            integrante = db.query(ProyectoIntegrante).filter(
-                ProyectoIntegrante.id_proyecto == proyecto_id,
-                ProyectoIntegrante.id_usuario == usuario.id
-            ).first()
-            if integrante and integrante.rol == RolProyecto.editor:
-                autorizado = True
-
-        if not autorizado:
+        if not membresia.puede_editar:
             return JSONResponse(status_code=403, content={"error": "No autorizado: se requiere rol 'editor' o ser dueño del proyecto"})
 
         correos_raw = list(set(payload.correos))
@@ -599,7 +881,7 @@ def agregar_responsables_tarea(
 
         for mail in correos_raw:
             m = mail.lower()
-            usuario = db.query(Usuario).filter(Usuario.correo == m).first()
+            usuario = db.query(Usuario).filter(func.lower(Usuario.correo) == m).first()
             if not usuario:
                 no_existentes.append(m)
                 continue
@@ -637,6 +919,9 @@ def agregar_responsables_tarea(
                 "validos": agregados
             })
 
+        registrar_cambio(db, proyecto_id, "tarea", [tarea_id], "modificacion")
+        abierta = estadisticas.abierta(tarea.estado)
+        estadisticas.sumar_responsables(db, proyecto_id, {a["id_usuario"]: (1, int(abierta)) for a in agregados})
         db.commit()
         return JSONResponse(status_code=201, content={"message": "Responsables agregados", "agregados": agregados})
 
@@ -648,63 +933,274 @@ def agregar_responsables_tarea(
         return JSONResponse(status_code=500, content={"error": "Error inesperado: " + str(e)})
 
 # ---------------------------
-# Endpoint: cambiar estado de una tarea
+# Endpoint: agregar responsables a varias tareas del proyecto
 # ---------------------------
-@app.put("/proyectos/{proyecto_id}/tareas/{tarea_id}/estado")
-def cambiar_estado_tarea(
+@app.post("/proyectos/{proyecto_id}/tareas/responsables")
+@db_endpoint
+def agregar_responsables_masivo(
     proyecto_id: int,
-    tarea_id: int,
-    x_user_mail: Annotated[str, Header(...)],
-    payload: TareaEstadoUpdate = Body(...),
+    membresia: Membresia = Depends(membresia_proyecto),
+    payload: ResponsablesBulkRequest = Body(...),
     db: Session = Depends(get_db)
 ):
     try:
-        correo = x_user_mail.lower()
-        actor = db.query(Usuario).filter(Usuario.correo == correo).first()
-        if not actor:
-            return JSONResponse(status_code=404, content={"error": "Usuario no encontrado"})
+        # verificar permiso: dueño o integrante con rol editor
+        if not membresia.puede_editar:
+            return JSONResponse(status_code=403, content={"error": "No autorizado: se requiere rol 'editor' o ser dueño del proyecto"})
 
-        proyecto = db.query(Proyecto).filter(Proyecto.id == proyecto_id).first()
-        if not proyecto:
-            return JSONResponse(status_code=404, content={"error": "Proyecto no encontrado"})
+        asignaciones = {tarea_id: sorted({c.lower() for c in correos}) for tarea_id, correos in payload.root.items()}
+        todos_los_correos = sorted({c for correos in asignaciones.values() for c in correos})
+
+        # Tareas del proyecto
+        tareas_existentes = set()
+        for lote in en_lotes(asignaciones.keys()):
+            tareas_existentes.update(id_tarea for (id_tarea,) in db.query(Tarea.id).filter(
+                Tarea.id_proyecto == proyecto_id, Tarea.id.in_(lote)
+            ))
+
+        # Usuarios por correo
+        usuarios: Dict[str, tuple] = {}
+        for lote in en_lotes(todos_los_correos):
+            for correo, id_usuario, nombre in db.query(func.lower(Usuario.correo), Usuario.id, Usuario.nombre).filter(
+                func.lower(Usuario.correo).in_(lote)
+            ):
+                usuarios[correo] = (id_usuario, nombre)
+
+        # Cuáles de esos usuarios integran el proyecto
+        integrantes = set()
+        for lote in en_lotes([u[0] for u in usuarios.values()]):
+            integrantes.update(id_usuario for (id_usuario,) in db.query(ProyectoIntegrante.id_usuario).filter(
+                ProyectoIntegrante.id_proyecto == proyecto_id, ProyectoIntegrante.id_usuario.in_(lote)
+            ))
+
+        # Responsables ya asignados (tarea, usuario)
+        existentes = set()
+        for lote_tareas in en_lotes(tareas_existentes):
+            for lote_usuarios in en_lotes(integrantes):
+                existentes.update((id_tarea, id_usuario) for id_tarea, id_usuario in db.query(
+                    TareaResponsable.id_tarea, TareaResponsable.id_usuario
+                ).filter(
+                    TareaResponsable.id_tarea.in_(lote_tareas), TareaResponsable.id_usuario.in_(lote_usuarios)
+                ))
+
+        tareas_no_encontradas = [t for t in asignaciones if t not in tareas_existentes]
+        resultado = {}
+        filas = []
+        hay_errores = bool(tareas_no_encontradas)
+        for tarea_id, correos in asignaciones.items():
+            if tarea_id not in tareas_existentes:
+                continue
+            detalle = {"agregados": [], "usuarios_no_existentes": [], "usuarios_no_existentes_en_proyecto": [], "ya_responsables": []}
+            for correo in correos:
+                if correo not in usuarios:
+                    detalle["usuarios_no_existentes"].append(correo)
+                    continue
+                id_usuario, nombre = usuarios[correo]
+                if id_usuario not in integrantes:
+                    detalle["usuarios_no_existentes_en_proyecto"].append(correo)
+                elif (tarea_id, id_usuario) in existentes:
+                    detalle["ya_responsables"].append(correo)
+                else:
+                    detalle["agregados"].append({"correo": correo, "id_usuario": id_usuario, "nombre": nombre})
+                    filas.append({"id_tarea": tarea_id, "id_usuario": id_usuario})
+            if detalle["usuarios_no_existentes"] or detalle["usuarios_no_existentes_en_proyecto"] or detalle["ya_responsables"]:
+                hay_errores = True
+            resultado[str(tarea_id)] = detalle
+
+        if hay_errores:
+            return JSONResponse(status_code=400, content={
+                "error": "Validación fallida",
+                "tareas_no_encontradas": tareas_no_encontradas,
+                "tareas": resultado
+            })
 
-        # verificar permiso: dueño o integrante con rol editor
-        autorizado = False
-        if proyecto.id_dueño == actor.id:
-            autorizado = True
-        else:
-            integrante = db.query(ProyectoIntegrante).filter(
-                ProyectoIntegrante.id_proyecto == proyecto_id,
-                ProyectoIntegrante.id_usuario == actor.id
-            ).first()
-            if integrante and integrante.rol == RolProyecto.editor:
-                autorizado = True
+        # Todas las asignaciones en un único insert y una única transacción
+        insertados = {(fila.id_tarea, fila.id_usuario) for fila in insert_ignorando_conflictos(
+            db, TareaResponsable, filas,
+            columnas_conflicto=["id_tarea", "id_usuario"],
+            returning=[TareaResponsable.id_tarea, TareaResponsable.id_usuario]
+        )}
+        for tarea_id_str, detalle in resultado.items():
+            agregados = [a for a in detalle["agregados"] if (int(tarea_id_str), a["id_usuario"]) in insertados]
+            resultado[tarea_id_str] = {
+                "agregados": agregados,
+                "conflictos": [a["correo"] for a in detalle["agregados"] if a not in agregados]
+            }
+
+        registrar_cambio(db, proyecto_id, "tarea", [id_tarea for id_tarea, _ in insertados], "modificacion")
+        if insertados:
+            # Deltas de los pares efectivamente insertados. El estado se lee después del INSERT y con
+            # FOR UPDATE, así un cambio de estado simultáneo ve a estos responsables o espera a que se confirmen
+            estados = {}
+            for lote in en_lotes(sorted({id_tarea for id_tarea, _ in insertados})):
+                estados.update(db.execute(
+                    select(Tarea.id, Tarea.estado).where(Tarea.id.in_(lote)).order_by(Tarea.id).with_for_update()
+                ).all())
+            deltas = {}
+            for id_tarea, id_usuario in insertados:
+                if id_tarea in estados:
+                    asignadas, abiertas = deltas.get(id_usuario, (0, 0))
+                    deltas[id_usuario] = (asignadas + 1, abiertas + int(estadisticas.abierta(estados[id_tarea])))
+            estadisticas.sumar_responsables(db, proyecto_id, deltas)
+        db.commit()
+        return JSONResponse(status_code=201, content={"message": "Responsables agregados", "tareas": resultado})
 
-        if not autorizado:
-            return JSONResponse(status_code=403, content={"error": "No autorizado: se requiere rol 'editor' o ser dueño del proyecto"})
+    except SQLAlchemyError as e:
+        db.rollback()
+        return JSONResponse(status_code=500, content={"error": "Error de base de datos: " + str(e)})
+    except Exception as e:
+        db.rollback()
+        return JSONResponse(status_code=500, content={"error": "Error inesperado: " + str(e)})
 
-        tarea = db.query(Tarea).filter(Tarea.id == tarea_id, Tarea.id_proyecto == proyecto_id).first()
-        if not tarea:
-            return JSONResponse(status_code=404, content={"error": "Tarea no encontrada en el proyecto"})
+# ---------------------------
+# Endpoint: cambiar estado de varias tareas
+# ---------------------------
+@app.put("/proyectos/{proyecto_id}/tareas/estado")
+@db_endpoint
+def cambiar_estado_tareas_masivo(
+    proyecto_id: int,
+    membresia: Membresia = Depends(membresia_proyecto),
+    payload: TareasEstadoBulkUpdate = Body(...),
+    db: Session = Depends(get_db)
+):
+    try:
+        # verificar permiso: dueño o integrante con rol editor
+        if not membresia.puede_editar:
+            return JSONResponse(status_code=403, content={"error": "No autorizado: se requiere rol 'editor' o ser dueño del proyecto"})
 
-        nuevo_estado = payload.estado
+        if payload.ids is None and (payload.filtro is None or not payload.filtro.tiene_criterio):
+            return JSONResponse(status_code=400, content={"error": "Se requiere 'ids' o un 'filtro' con 'estado' o 'responsable'"})
+
+        condiciones = [Tarea.id_proyecto == proyecto_id]
+        if payload.ids is not None:
+            condiciones.append(Tarea.id.in_(payload.ids))
+        if payload.filtro is not None and payload.filtro.estado is not None:
+            condiciones.append(Tarea.estado == payload.filtro.estado)
+        if payload.filtro is not None and payload.filtro.responsable is not None:
+            condiciones.append(Tarea.id.in_(
+                select(TareaResponsable.id_tarea).where(TareaResponsable.id_usuario == payload.filtro.responsable)
+            ))
+
+        # Compare-and-set por estado anterior, como en el cambio individual: se leen las tareas (bloqueadas
+        # en PostgreSQL) y un UPDATE por estado solo toma las que siguen en ese estado. Los deltas de
+        # project_stats salen de las filas que efectivamente cambiaron, sin recalcular el proyecto
+        actualizadas, cambiadas = [], {}
+        pendientes = None
+        for _ in range(ESTADO_REINTENTOS):
+            consulta = select(Tarea.id, Tarea.estado).where(*condiciones)
+            if pendientes is not None:
+                consulta = consulta.where(Tarea.id.in_(pendientes))
+            por_estado = {}
+            # Orden fijo de bloqueo: dos requests masivos sobre las mismas tareas no se bloquean en cruz
+            for id_tarea, estado in db.execute(consulta.order_by(Tarea.id).with_for_update()):
+                por_estado.setdefault(estado, []).append(id_tarea)
+            actualizadas += por_estado.pop(payload.estado, [])
+            pendientes = []
+            for estado_anterior, ids in por_estado.items():
+                tomadas = db.execute(
+                    update(Tarea)
+                    .where(Tarea.id.in_(ids), Tarea.estado == estado_anterior)
+                    .values(estado=payload.estado)
+                    .returning(Tarea.id)
+                    .execution_options(synchronize_session=False)
+                ).scalars().all()
+                actualizadas += tomadas
+                cambiadas.update((id_tarea, estado_anterior) for id_tarea in tomadas)
+                pendientes += set(ids) - set(tomadas)
+            if not pendientes:
+                break
+        else:
+            db.rollback()
+            return JSONResponse(status_code=409, content={"error": "Las tareas se modificaron en simultáneo, intente nuevamente"})
+
+        actualizadas.sort()
+        registrar_cambio(db, proyecto_id, "tarea", actualizadas, "modificacion")
+        if cambiadas:
+            deltas = Counter()
+            for estado_anterior in cambiadas.values():
+                deltas[estado_anterior] -= 1
+                deltas[payload.estado] += 1
+            estadisticas.sumar_tareas(db, proyecto_id, deltas)
+            # Responsables de las tareas cuyo estado pasó de abierta a cerrada o al revés
+            abiertas = Counter()
+            for lote in en_lotes([t for t, anterior in cambiadas.items()
+                                  if estadisticas.abierta(anterior) != estadisticas.abierta(payload.estado)]):
+                for id_tarea, id_usuario in db.execute(
+                    select(TareaResponsable.id_tarea, TareaResponsable.id_usuario).where(TareaResponsable.id_tarea.in_(lote))
+                ):
+                    abiertas[id_usuario] += int(estadisticas.abierta(payload.estado)) - int(estadisticas.abierta(cambiadas[id_tarea]))
+            estadisticas.sumar_responsables(db, proyecto_id, {id_usuario: (0, n) for id_usuario, n in abiertas.items()})
+        db.commit()
 
+        no_encontradas = sorted(set(payload.ids or []) - set(actualizadas))
+        return JSONResponse(status_code=200, content={
+            "message": "Estado de las tareas actualizado",
+            "estado": payload.estado.value,
+            "actualizadas": actualizadas,
+            "no_encontradas": no_encontradas
+        })
 
-        try:
-            # intentar por nombre de miembro
-            tarea.estado = EstadoTarea[nuevo_estado]
-        except Exception:
-            # intentar por valor
-            tarea.estado = EstadoTarea(nuevo_estado)
+    except SQLAlchemyError as e:
+        db.rollback()
+        return JSONResponse(status_code=500, content={"error": "Error de base de datos: " + str(e)})
+    except Exception as e:
+        db.rollback()
+        return JSONResponse(status_code=500, content={"error": "Error inesperado: " + str(e)})
 
+# ---------------------------
+# Endpoint: cambiar estado de una tarea
+# ---------------------------
+@app.put("/proyectos/{proyecto_id}/tareas/{tarea_id}/estado")
+@db_endpoint
+def cambiar_estado_tarea(
+    proyecto_id: int,
+    tarea_id: int,
+    membresia: Membresia = Depends(membresia_proyecto),
+    payload: TareaEstadoUpdate = Body(...),
+    db: Session = Depends(get_db)
+):
+    try:
+        # verificar permiso: dueño o integrante con rol editor
+        if not membresia.puede_editar:
+            return JSONResponse(status_code=403, content={"error": "No autorizado: se requiere rol 'editor' o ser dueño del proyecto"})
 
+        nuevo_estado = payload.estado
+        # Compare-and-set: el UPDATE solo aplica si el estado sigue siendo el leído, así dos cambios
+        # simultáneos no descuentan dos veces el mismo estado anterior en project_stats
+        for _ in range(ESTADO_REINTENTOS):
+            fila = db.execute(
+                select(Tarea.estado).where(Tarea.id == tarea_id, Tarea.id_proyecto == proyecto_id)
+            ).first()
+            if fila is None:
+                return JSONResponse(status_code=404, content={"error": "Tarea no encontrada en el proyecto"})
+            estado_anterior = fila.estado
+            if estado_anterior == nuevo_estado:
+                break
+            actualizada = db.execute(
+                update(Tarea)
+                .where(Tarea.id == tarea_id, Tarea.estado == estado_anterior)
+                .values(estado=nuevo_estado)
+                .execution_options(synchronize_session=False)
+            ).rowcount
+            if actualizada:
+                break
+        else:
+            db.rollback()
+            return JSONResponse(status_code=409, content={"error": "La tarea se modificó en simultáneo, intente nuevamente"})
+
+        registrar_cambio(db, proyecto_id, "tarea", [tarea_id], "modificacion")
+        if nuevo_estado != estado_anterior:
+            estadisticas.sumar_tareas(db, proyecto_id, {estado_anterior: -1, nuevo_estado: 1})
+            cambio_abiertas = int(estadisticas.abierta(nuevo_estado)) - int(estadisticas.abierta(estado_anterior))
+            if cambio_abiertas:
+                responsables = db.execute(select(TareaResponsable.id_usuario).where(TareaResponsable.id_tarea == tarea_id)).scalars()
+                estadisticas.sumar_responsables(db, proyecto_id, {id_usuario: (0, cambio_abiertas) for id_usuario in responsables})
         db.commit()
-        db.refresh(tarea)
 
         return JSONResponse(status_code=200, content={
             "message": "Estado de la tarea actualizado",
-            "id_tarea": tarea.id,
-            "estado": tarea.estado.value if hasattr(tarea.estado, "value") else str(tarea.estado)
+            "id_tarea": tarea_id,
+            "estado": nuevo_estado.value
         })
 
     except SQLAlchemyError as e:
@@ -715,47 +1211,43 @@ def cambiar_estado_tarea(
         return JSONResponse(status_code=500, content={"error": "Error inesperado: " + str(e)})
     
 @app.get("/proyectos/{proyecto_id}/integrantes", response_model=List[IntegranteResponse])
+@db_endpoint
 def listar_integrantes_proyecto(
     proyecto_id: int,
-    x_user_mail: Annotated[str, Header(...)],
+    request: Request,
+    membresia: Membresia = Depends(membresia_proyecto),
+    if_none_match: Annotated[Optional[str], Header()] = None,
     db: Session = Depends(get_db)
 ):
     try:
-        correo = x_user_mail.lower()
-        actor = db.query(Usuario).filter(Usuario.correo == correo).first()
-        if not actor:
-            return JSONResponse(status_code=404, content={"error": "Usuario no encontrado"})
-
-        proyecto = db.query(Proyecto).filter(Proyecto.id == proyecto_id).first()
-        if not proyecto:
-            return JSONResponse(status_code=404, content={"error": "Proyecto no encontrado"})
-
         # Verificar que el actor sea dueño o integrante del proyecto
-        if proyecto.id_dueño != actor.id:
-            integrante_actor = db.query(ProyectoIntegrante).filter(
-                ProyectoIntegrante.id_proyecto == proyecto_id,
-                ProyectoIntegrante.id_usuario == actor.id
-            ).first()
-            if not integrante_actor:
-                return JSONResponse(status_code=403, content={"error": "No autorizado: no sos integrante del proyecto"})
-
-        integrantes = db.query(ProyectoIntegrante).filter(ProyectoIntegrante.id_proyecto == proyecto_id).all()
+        if not membresia.es_integrante:
+            return JSONResponse(status_code=403, content={"error": "No autorizado: no sos integrante del proyecto"})
+
+        headers = {"ETag": etag("integrantes", proyecto_id, version_proyecto(db, proyecto_id), request.query_params), "Cache-Control": "no-cache"}
+        if coincide_etag(if_none_match, headers["ETag"]):
+            return Response(status_code=304, headers=headers)
+
+        # Integrantes y sus usuarios en una sola consulta
+        integrantes = (
+            db.query(ProyectoIntegrante.rol, Usuario.id, Usuario.nombre, Usuario.correo)
+            .join(Usuario, Usuario.id == ProyectoIntegrante.id_usuario)
+            .filter(ProyectoIntegrante.id_proyecto == proyecto_id)
+            .all()
+        )
 
         resultado = []
-        for ing in integrantes:
-            usu = getattr(ing, "usuario", None)
-            if not usu:
-                continue
+        for rol, id_usuario, nombre, correo in integrantes:
             resultado.append({
-                "id_usuario": usu.id,
-                "nombre": usu.nombre,
-                "correo": usu.correo,
-                "rol": ing.rol.value if hasattr(ing.rol, "value") else str(ing.rol)
+                "id_usuario": id_usuario,
+                "nombre": nombre,
+                "correo": correo,
+                "rol": rol.value if hasattr(rol, "value") else str(rol)
             })
 
         # Asegurar que el dueño aparece (por si por alguna razón no está en la tabla integrantes)
-        if not any(r["id_usuario"] == proyecto.id_dueño for r in resultado):
-            dueño = db.query(Usuario).filter(Usuario.id == proyecto.id_dueño).first()
+        if not any(r["id_usuario"] == membresia.id_dueño for r in resultado):
+            dueño = db.query(Usuario).filter(Usuario.id == membresia.id_dueño).first()
             if dueño:
                 resultado.append({
                     "id_usuario": dueño.id,
@@ -764,13 +1256,72 @@ def listar_integrantes_proyecto(
                     "rol": "dueño"
                 })
 
-        return resultado
+        return RespuestaLista(IntegrantesAdapter, resultado, headers=headers)
 
     except SQLAlchemyError as e:
         return JSONResponse(status_code=500, content={"error": "Error de base de datos: " + str(e)})
     except Exception as e:
         return JSONResponse(status_code=500, content={"error": "Error inesperado: " + str(e)})
     
+# ---------------------------
+# Endpoint: estado del pool de hashing
+# ---------------------------
+@app.get("/internal/hashing")
+def estado_hashing():
+    return hashing_pool.stats()
+
+# ---------------------------
+# Endpoint: estado del pool de conexiones
+# ---------------------------
+@app.get("/internal/db-pool")
+def estado_pool_db():
+    resultado = {"sync": pool_stats.snapshot()}
+    if DB_ASYNC:
+        resultado["async"] = async_pool_stats.snapshot()
+    return resultado
+
+# ---------------------------
+# Endpoint: estado de la cola de correo
+# ---------------------------
+@app.get("/internal/correo")
+def estado_correo():
+    return cola_correo.stats()
+
+# ---------------------------
+# Endpoint: estado del verificador de captcha
+# ---------------------------
+@app.get("/internal/captcha")
+def estado_captcha():
+    return verificador_captcha.stats()
+
+# ---------------------------
+# Endpoint: estado del límite de intentos
+# ---------------------------
+@app.get("/internal/rate-limit")
+def estado_rate_limit():
+    return limitador.stats()
+
+# ---------------------------
+# Endpoint: estado del broker de eventos
+# ---------------------------
+@app.get("/internal/eventos")
+def estado_eventos():
+    return broker.stats()
+
+# ---------------------------
+# Endpoint: estado del programador de recordatorios
+# ---------------------------
+@app.get("/internal/recordatorios")
+def estado_recordatorios():
+    return programador_recordatorios.stats()
+
+# ---------------------------
+# Endpoint: métricas por ruta (formato Prometheus)
+# ---------------------------
+@app.get("/metrics")
+def exportar_metricas():
+    return Response(registro_metricas.exportar(), media_type="text/plain; version=0.0.4; charset=utf-8")
+
 # ---------------------------
 # Endpoint: Root, check api status
 # ---------------------------
@@ -0,0 +1,249 @@
+import logging
+import os
+import re
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# Métricas por request: cantidad de consultas y tiempo en la base, en bcrypt y serializando.
+# Se devuelven en el header Server-Timing y se agregan por ruta en /metrics (formato Prometheus)
+METRICAS_ACTIVO = os.getenv("METRICAS_ACTIVO", "true").lower() in ("1", "true", "si")
+# Consultas por request a partir de las cuales se loguea una advertencia (posible N+1)
+METRICAS_PRESUPUESTO_CONSULTAS = int(os.getenv("METRICAS_PRESUPUESTO_CONSULTAS", "25"))
+# Presupuestos por ruta: "GET /proyectos=3;PUT /proyectos/{proyecto_id}/tareas/{tarea_id}/estado=8"
+METRICAS_PRESUPUESTOS = os.getenv("METRICAS_PRESUPUESTOS", "")
+
+BUCKETS_SEGUNDOS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+BUCKETS_CONSULTAS = (1, 2, 3, 5, 10, 20, 50, 100)
+# Requests que no coinciden con ninguna ruta: una sola etiqueta para no multiplicar series
+RUTA_DESCONOCIDA = "desconocida"
+
+logger = logging.getLogger("metricas")
+
+
+class Medicion:
+    __slots__ = ("consultas", "db", "bcrypt", "serializacion")
+
+    def __init__(self):
+        self.consultas = 0
+        self.db = 0.0
+        self.bcrypt = 0.0
+        self.serializacion = 0.0
+
+
+# El objeto es el mismo en el event loop y en el threadpool: Starlette copia el contexto
+# al correr endpoints síncronos, y run_sync de la AsyncSession corre en el mismo task
+_medicion: ContextVar = ContextVar("medicion", default=None)
+
+def medicion_actual():
+    return _medicion.get()
+
+@contextmanager
+def medir(campo: str):
+    # Suma la duración del bloque al campo de la medición del request en curso, si la hay
+    medicion = _medicion.get()
+    if medicion is None:
+        yield
+        return
+    inicio = time.perf_counter()
+    try:
+        yield
+    finally:
+        setattr(medicion, campo, getattr(medicion, campo) + time.perf_counter() - inicio)
+
+
+# Listeners sobre la clase Engine: cubren el motor sync y el sync_engine del async, que se crean después.
+# El inicio se guarda en el contexto de ejecución: si la sentencia falla no queda nada en la conexión
+@event.listens_for(Engine, "before_cursor_execute")
+def _antes_de_ejecutar(conn, cursor, statement, parameters, context, executemany):
+    if _medicion.get() is not None:
+        context._metricas_inicio = time.perf_counter()
+
+@event.listens_for(Engine, "after_cursor_execute")
+def _despues_de_ejecutar(conn, cursor, statement, parameters, context, executemany):
+    medicion = _medicion.get()
+    inicio = getattr(context, "_metricas_inicio", None)
+    if medicion is None or inicio is None:
+        return
+    medicion.consultas += 1
+    medicion.db += time.perf_counter() - inicio
+
+
+def server_timing(medicion: Medicion, total: float) -> str:
+    return ", ".join([
+        f'db;dur={medicion.db * 1000:.3f};desc="{medicion.consultas} consultas"',
+        f"bcrypt;dur={medicion.bcrypt * 1000:.3f}",
+        f"serializacion;dur={medicion.serializacion * 1000:.3f}",
+        f"total;dur={total * 1000:.3f}",
+    ])
+
+_CONSULTAS_SERVER_TIMING = re.compile(r'db;dur=[\d.]+;desc="(\d+) consultas"')
+
+def consultas_de_server_timing(valor: str):
+    coincidencia = _CONSULTAS_SERVER_TIMING.search(valor or "")
+    return int(coincidencia.group(1)) if coincidencia else None
+
+
+# ---------------------------
+# Agregación por ruta
+# ---------------------------
+
+class Histograma:
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.conteos = [0] * len(buckets)
+        self.suma = 0.0
+        self.total = 0
+
+    def observar(self, valor: float):
+        for i, limite in enumerate(self.buckets):
+            if valor <= limite:
+                self.conteos[i] += 1
+                break
+        self.suma += valor
+        self.total += 1
+
+    def lineas(self, nombre: str, etiquetas: str) -> list:
+        lineas = []
+        acumulado = 0
+        for limite, conteo in zip(self.buckets, self.conteos):
+            acumulado += conteo
+            lineas.append(f'{nombre}_bucket{{{etiquetas},le="{limite}"}} {acumulado}')
+        lineas.append(f'{nombre}_bucket{{{etiquetas},le="+Inf"}} {self.total}')
+        lineas.append(f"{nombre}_sum{{{etiquetas}}} {self.suma}")
+        lineas.append(f"{nombre}_count{{{etiquetas}}} {self.total}")
+        return lineas
+
+
+HISTOGRAMAS = [
+    # (nombre, ayuda, buckets, campo de la observación)
+    ("http_request_duration_seconds", "Duración del request hasta el inicio de la respuesta", BUCKETS_SEGUNDOS, "total"),
+    ("http_request_db_seconds", "Tiempo en consultas a la base por request", BUCKETS_SEGUNDOS, "db"),
+    ("http_request_db_queries", "Consultas a la base por request", BUCKETS_CONSULTAS, "consultas"),
+    ("http_request_bcrypt_seconds", "Tiempo en bcrypt por request, incluida la espera en el pool", BUCKETS_SEGUNDOS, "bcrypt"),
+    ("http_request_serialization_seconds", "Tiempo serializando la respuesta", BUCKETS_SEGUNDOS, "serializacion"),
+]
+
+
+def _escapar(valor: str) -> str:
+    return valor.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+def _parsear_presupuestos(texto: str) -> dict:
+    presupuestos = {}
+    for parte in texto.split(";"):
+        if "=" in parte:
+            ruta, limite = parte.rsplit("=", 1)
+            metodo, _, camino = ruta.strip().partition(" ")
+            presupuestos[(metodo.upper(), camino.strip())] = int(limite)
+    return presupuestos
+
+
+class RegistroMetricas:
+    def __init__(self, presupuesto: int = METRICAS_PRESUPUESTO_CONSULTAS, presupuestos: dict = None):
+        self.presupuesto = presupuesto
+        self.presupuestos = presupuestos if presupuestos is not None else _parsear_presupuestos(METRICAS_PRESUPUESTOS)
+        self._lock = threading.Lock()
+        self._histogramas = {}
+        self._requests = {}
+        self._excedidos = {}
+
+    def presupuesto_de(self, metodo: str, ruta: str) -> int:
+        return self.presupuestos.get((metodo, ruta), self.presupuesto)
+
+    def observar(self, metodo: str, ruta: str, estado: int, medicion: Medicion, total: float):
+        clave = (metodo, ruta)
+        valores = {"total": total, "db": medicion.db, "consultas": medicion.consultas,
+                   "bcrypt": medicion.bcrypt, "serializacion": medicion.serializacion}
+        presupuesto = self.presupuesto_de(metodo, ruta)
+        with self._lock:
+            histogramas = self._histogramas.get(clave)
+            if histogramas is None:
+                histogramas = self._histogramas[clave] = [Histograma(b) for _, _, b, _ in HISTOGRAMAS]
+            for histograma, (_, _, _, campo) in zip(histogramas, HISTOGRAMAS):
+                histograma.observar(valores[campo])
+            self._requests[(metodo, ruta, estado)] = self._requests.get((metodo, ruta, estado), 0) + 1
+            if medicion.consultas > presupuesto:
+                self._excedidos[clave] = self._excedidos.get(clave, 0) + 1
+        if medicion.consultas > presupuesto:
+            logger.warning("Presupuesto de consultas excedido en %s %s: %d consultas (presupuesto %d)",
+                           metodo, ruta, medicion.consultas, presupuesto)
+
+    def exportar(self) -> str:
+        with self._lock:
+            lineas = [
+                "# HELP http_requests_total Requests atendidos por ruta y código de estado",
+                "# TYPE http_requests_total counter",
+            ]
+            for (metodo, ruta, estado), n in sorted(self._requests.items()):
+                lineas.append(f'http_requests_total{{method="{metodo}",route="{_escapar(ruta)}",status="{estado}"}} {n}')
+            for i, (nombre, ayuda, _, _) in enumerate(HISTOGRAMAS):
+                lineas.append(f"# HELP {nombre} {ayuda}")
+                lineas.append(f"# TYPE {nombre} histogram")
+                for (metodo, ruta), histogramas in sorted(self._histogramas.items()):
+                    lineas.extend(histogramas[i].lineas(nombre, f'method="{metodo}",route="{_escapar(ruta)}"'))
+            lineas.append("# HELP http_request_query_budget_exceeded_total Requests que superaron el presupuesto de consultas")
+            lineas.append("# TYPE http_request_query_budget_exceeded_total counter")
+            for (metodo, ruta), n in sorted(self._excedidos.items()):
+                lineas.append(f'http_request_query_budget_exceeded_total{{method="{metodo}",route="{_escapar(ruta)}"}} {n}')
+        return "\n".join(lineas) + "\n"
+
+    def limpiar(self):
+        with self._lock:
+            self._histogramas.clear()
+            self._requests.clear()
+            self._excedidos.clear()
+
+
+registro_metricas = RegistroMetricas()
+
+
+class MiddlewareMetricas:
+    # Middleware ASGI puro: no envuelve el cuerpo de la respuesta y no afecta al streaming (SSE, exportación)
+    def __init__(self, app, registro: RegistroMetricas = None, activo: bool = None):
+        self.app = app
+        self.registro = registro if registro is not None else registro_metricas
+        self.activo = METRICAS_ACTIVO if activo is None else activo
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not self.activo:
+            await self.app(scope, receive, send)
+            return
+
+        medicion = Medicion()
+        token = _medicion.set(medicion)
+        inicio = time.perf_counter()
+        observado = False
+
+        def observar(estado: int) -> float:
+            nonlocal observado
+            observado = True
+            total = time.perf_counter() - inicio
+            # El router de FastAPI deja la ruta en el scope: se agrupa por plantilla, no por URL
+            ruta = scope.get("route")
+            self.registro.observar(scope["method"], getattr(ruta, "path", RUTA_DESCONOCIDA), estado, medicion, total)
+            return total
+
+        async def enviar(mensaje):
+            if mensaje["type"] == "http.response.start":
+                total = observar(mensaje["status"])
+                mensaje["headers"] = list(mensaje.get("headers", [])) + [
+                    (b"server-timing", server_timing(medicion, total).encode("latin-1")),
+                    (b"timing-allow-origin", b"*"),
+                ]
+            await send(mensaje)
+
+        try:
+            await self.app(scope, receive, enviar)
+        except Exception:
+            # El 500 lo envía ServerErrorMiddleware, por fuera de este middleware: se registra acá
+            if not observado:
+                observar(500)
+            raise
+        finally:
+            _medicion.reset(token)
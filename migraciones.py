@@ -0,0 +1,186 @@
+from datetime import datetime
+from sqlalchemy import (
+    Table, Column, Integer, String, DateTime, Boolean, Text, Enum, ForeignKey, MetaData, select, delete, func, insert, inspect, text,
+)
+from db import iniciar_engine
+from sqlalchemy.orm import Session
+from models import (
+    Usuario, Proyecto, Tarea, TareaResponsable, ProyectoIntegrante, Cambio, EstadisticaProyecto, EstadisticaResponsable,
+    RecordatorioEnviado, EstadoTarea, RolProyecto,
+)
+import estadisticas
+import busqueda
+
+# Migraciones versionadas del esquema. La app no crea tablas al arrancar: correr antes de cada deploy
+#   python migraciones.py
+
+metadata_versiones = MetaData()
+schema_version = Table(
+    "schema_version", metadata_versiones,
+    Column("version", Integer, primary_key=True),
+    Column("descripcion", String(200), nullable=False),
+    Column("aplicada", DateTime, nullable=False),
+)
+
+
+def _existe_indice(conn, nombre) -> bool:
+    # El inspector no lista los índices por expresión en todos los dialectos
+    dialecto = conn.dialect.name
+    if dialecto == "postgresql":
+        return conn.execute(text("SELECT 1 FROM pg_indexes WHERE indexname = :n"), {"n": nombre}).first() is not None
+    if dialecto == "sqlite":
+        return conn.execute(text("SELECT 1 FROM sqlite_master WHERE type = 'index' AND name = :n"), {"n": nombre}).first() is not None
+    inspector = inspect(conn)
+    return any(i["name"] == nombre for t in inspector.get_table_names() for i in inspector.get_indexes(t))
+
+def _crear_indices(conn, modelo, nombres):
+    for indice in modelo.__table__.indexes:
+        if indice.name in nombres and not _existe_indice(conn, indice.name):
+            indice.create(conn)
+
+def _agregar_columna(conn, modelo, nombre, ddl):
+    tabla = modelo.__tablename__
+    if nombre not in {c["name"] for c in inspect(conn).get_columns(tabla)}:
+        conn.execute(text(f"ALTER TABLE {tabla} ADD COLUMN {nombre} {ddl}"))
+
+def _eliminar_duplicados(conn, tabla, columnas):
+    # Deja la fila de menor id por cada combinación repetida
+    conservar = select(func.min(tabla.c.id)).group_by(*[tabla.c[c] for c in columnas])
+    conn.execute(delete(tabla).where(tabla.c.id.not_in(conservar)))
+
+
+# Esquema inicial congelado: las tablas tal como las creaba la app antes de las migraciones.
+# No usar los modelos actuales: v1 tiene que describir siempre el mismo estado y lo posterior
+# (índices, columnas, tablas nuevas) lo agregan v2..vN
+metadata_v1 = MetaData()
+Table(
+    "usuarios", metadata_v1,
+    Column("id", Integer, primary_key=True, autoincrement=True),
+    Column("correo", String(120), unique=True, nullable=False, index=True),
+    Column("nombre", String(100), nullable=False),
+    Column("contrasena", String(200), nullable=False),
+    Column("intentos_fallidos", Integer),
+    Column("bloqueado", Boolean),
+    Column("ultimo_intento_fallido", DateTime),
+)
+Table(
+    "recuperarcontrasenatokens", metadata_v1,
+    Column("id", Integer, primary_key=True),
+    Column("usuario_id", Integer, ForeignKey("usuarios.id")),
+    Column("token", String, index=True),
+    Column("expiracion", DateTime),
+    Column("utilizado", Boolean),
+)
+Table(
+    "proyectos", metadata_v1,
+    Column("id", Integer, primary_key=True),
+    Column("nombre", String(100), nullable=False),
+    Column("descripcion", Text),
+    Column("fecha_creacion", DateTime),
+    Column("fecha_limite", DateTime),
+    Column("id_dueño", Integer, ForeignKey("usuarios.id")),
+)
+Table(
+    "tareas", metadata_v1,
+    Column("id", Integer, primary_key=True, index=True),
+    Column("id_proyecto", Integer, ForeignKey("proyectos.id", ondelete="CASCADE"), nullable=False),
+    Column("titulo", String(100), nullable=False),
+    Column("descripcion", Text),
+    Column("estado", Enum(EstadoTarea)),
+    Column("fecha_creacion", DateTime),
+    Column("fecha_limite", DateTime),
+)
+Table(
+    "TareaResponsables", metadata_v1,
+    Column("id", Integer, primary_key=True, index=True),
+    Column("id_tarea", Integer, ForeignKey("tareas.id", ondelete="CASCADE")),
+    Column("id_usuario", Integer, ForeignKey("usuarios.id", ondelete="CASCADE")),
+)
+Table(
+    "ProyectoIntegrantes", metadata_v1,
+    Column("id", Integer, primary_key=True, index=True),
+    Column("id_proyecto", Integer, ForeignKey("proyectos.id", ondelete="CASCADE")),
+    Column("id_usuario", Integer, ForeignKey("usuarios.id", ondelete="CASCADE")),
+    Column("rol", Enum(RolProyecto), nullable=False),
+)
+
+
+def v1_esquema_inicial(conn):
+    metadata_v1.create_all(bind=conn)
+
+def v2_indices_membresias_y_tareas(conn):
+    _eliminar_duplicados(conn, ProyectoIntegrante.__table__, ["id_proyecto", "id_usuario"])
+    _eliminar_duplicados(conn, TareaResponsable.__table__, ["id_tarea", "id_usuario"])
+    _crear_indices(conn, ProyectoIntegrante, {"ux_proyecto_integrante", "ix_proyecto_integrante_usuario"})
+    _crear_indices(conn, TareaResponsable, {"ux_tarea_responsable", "ix_tarea_responsable_usuario"})
+    _crear_indices(conn, Tarea, {"ix_tareas_proyecto_estado", "ix_tareas_proyecto_fecha_limite", "ix_tareas_proyecto_creacion"})
+    _crear_indices(conn, Usuario, {"ix_usuarios_correo_lower"})
+
+def v3_version_proyecto(conn):
+    _agregar_columna(conn, Proyecto, "version", "INTEGER NOT NULL DEFAULT 0")
+
+def v4_registro_cambios(conn):
+    Cambio.__table__.create(bind=conn, checkfirst=True)
+    _crear_indices(conn, Cambio, {"ix_cambios_proyecto_id"})
+
+def v5_estadisticas_proyecto(conn):
+    EstadisticaProyecto.__table__.create(bind=conn, checkfirst=True)
+    EstadisticaResponsable.__table__.create(bind=conn, checkfirst=True)
+    # Poblar el resumen de los proyectos existentes
+    db = Session(bind=conn)
+    for (proyecto_id,) in db.execute(select(Proyecto.id)).all():
+        estadisticas.recalcular_proyecto(db, proyecto_id)
+    db.flush()
+
+def v6_busqueda_tareas(conn):
+    if conn.dialect.name in ("postgresql", "sqlite"):
+        busqueda.crear_indice(conn)
+
+def v7_recordatorios(conn):
+    _crear_indices(conn, Tarea, {"ix_tareas_fecha_limite"})
+    RecordatorioEnviado.__table__.create(bind=conn, checkfirst=True)
+    _crear_indices(conn, RecordatorioEnviado, {"ux_recordatorio_enviado"})
+
+def v8_reclamos_recordatorios(conn):
+    # Los registros existentes corresponden a avisos ya entregados
+    _agregar_columna(conn, RecordatorioEnviado, "enviado", "BOOLEAN NOT NULL DEFAULT TRUE")
+
+
+MIGRACIONES = [
+    (1, "Esquema inicial", v1_esquema_inicial),
+    (2, "Índices de integrantes, responsables, tareas y correo", v2_indices_membresias_y_tareas),
+    (3, "Versión por proyecto para ETag", v3_version_proyecto),
+    (4, "Registro de cambios por proyecto", v4_registro_cambios),
+    (5, "Estadísticas por proyecto", v5_estadisticas_proyecto),
+    (6, "Índice de texto completo de tareas", v6_busqueda_tareas),
+    (7, "Recordatorios de vencimiento", v7_recordatorios),
+    (8, "Reclamo de recordatorios antes del envío", v8_reclamos_recordatorios),
+]
+
+
+def version_actual(conn) -> int:
+    metadata_versiones.create_all(bind=conn)
+    return conn.execute(select(func.coalesce(func.max(schema_version.c.version), 0))).scalar()
+
+def migrar(bind=None) -> list:
+    bind = bind if bind is not None else iniciar_engine()
+    aplicadas = []
+    with bind.begin() as conn:
+        actual = version_actual(conn)
+    for version, descripcion, aplicar in MIGRACIONES:
+        if version <= actual:
+            continue
+        # Cada versión en su propia transacción
+        with bind.begin() as conn:
+            aplicar(conn)
+            conn.execute(insert(schema_version).values(version=version, descripcion=descripcion, aplicada=datetime.now()))
+        aplicadas.append(version)
+    return aplicadas
+
+
+if __name__ == "__main__":
+    aplicadas = migrar()
+    if aplicadas:
+        print("Migraciones aplicadas: " + ", ".join(str(v) for v in aplicadas))
+    else:
+        print("El esquema ya está actualizado")
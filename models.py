@@ -1,5 +1,5 @@
 from datetime import datetime, timedelta
-from sqlalchemy import Column, Integer, String, DateTime, Boolean, ForeignKey, Text, Enum
+from sqlalchemy import Column, Integer, String, DateTime, Boolean, ForeignKey, Text, Enum, Index, func, true
 from sqlalchemy.orm import relationship
 from db import Base
 import enum
@@ -21,6 +21,9 @@ class Usuario(Base):
     
     def __repr__(self):
         return f"<Usuario(id={self.id}, correo='{self.correo}', nombre='{self.nombre}')>"
+
+# Búsqueda de usuarios por correo sin distinguir mayúsculas
+Index("ix_usuarios_correo_lower", func.lower(Usuario.correo))
     
 class RecuperarContrasenaToken(Base):
     __tablename__ = "recuperarcontrasenatokens"
@@ -40,6 +43,8 @@ class Proyecto(Base):
     descripcion = Column(Text)
     fecha_creacion = Column(DateTime, default=datetime.now)
     fecha_limite = Column(DateTime)
+    # Se incrementa con cada cambio en tareas o integrantes (ETag de los listados)
+    version = Column(Integer, nullable=False, default=0, server_default="0")
     
     id_dueño = Column(Integer, ForeignKey("usuarios.id"))
     dueño = relationship("Usuario", back_populates="proyectos_propios")
@@ -57,6 +62,13 @@ class EstadoTarea(enum.Enum):
 
 class Tarea(Base):
     __tablename__ = "tareas"
+    __table_args__ = (
+        Index("ix_tareas_proyecto_estado", "id_proyecto", "estado"),
+        Index("ix_tareas_proyecto_fecha_limite", "id_proyecto", "fecha_limite"),
+        Index("ix_tareas_proyecto_creacion", "id_proyecto", "fecha_creacion", "id"),
+        # Barrido global de vencimientos (recordatorios.py)
+        Index("ix_tareas_fecha_limite", "fecha_limite", "id"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     id_proyecto = Column(Integer, ForeignKey("proyectos.id", ondelete="CASCADE"), nullable=False)
@@ -73,6 +85,10 @@ class Tarea(Base):
     
 class TareaResponsable(Base):
     __tablename__ = "TareaResponsables"
+    __table_args__ = (
+        Index("ux_tarea_responsable", "id_tarea", "id_usuario", unique=True),
+        Index("ix_tarea_responsable_usuario", "id_usuario"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     id_tarea = Column(Integer, ForeignKey("tareas.id", ondelete="CASCADE"))
@@ -90,6 +106,10 @@ class RolProyecto(enum.Enum):
 
 class ProyectoIntegrante(Base):
     __tablename__ = "ProyectoIntegrantes"
+    __table_args__ = (
+        Index("ux_proyecto_integrante", "id_proyecto", "id_usuario", unique=True),
+        Index("ix_proyecto_integrante_usuario", "id_usuario"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     id_proyecto = Column(Integer, ForeignKey("proyectos.id", ondelete="CASCADE"))
@@ -97,4 +117,62 @@ class ProyectoIntegrante(Base):
     rol = Column(Enum(RolProyecto), nullable=False)
 
     proyecto = relationship("Proyecto", back_populates="integrantes")
-    usuario = relationship("Usuario", back_populates="proyectos_integrante")
\ No newline at end of file
+    usuario = relationship("Usuario", back_populates="proyectos_integrante")
+
+# ------
+
+# Registro append-only de cambios por proyecto (sincronización incremental). Sin FK a las
+# entidades: las bajas quedan registradas después de borrar la fila
+class Cambio(Base):
+    __tablename__ = "cambios"
+    __table_args__ = (
+        Index("ix_cambios_proyecto_id", "id_proyecto", "id"),
+    )
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    id_proyecto = Column(Integer, nullable=False)
+    entidad = Column(String(20), nullable=False)      # "tarea" | "integrante"
+    id_entidad = Column(Integer, nullable=False)      # id de la tarea o id_usuario del integrante
+    operacion = Column(String(20), nullable=False)    # "alta" | "modificacion" | "baja"
+    fecha = Column(DateTime, default=datetime.now, nullable=False)
+
+# ------
+
+# Resumen por proyecto mantenido en la misma transacción que las escrituras de tareas (estadisticas.py)
+class EstadisticaProyecto(Base):
+    __tablename__ = "project_stats"
+
+    id_proyecto = Column(Integer, ForeignKey("proyectos.id", ondelete="CASCADE"), primary_key=True)
+    sin_asignar = Column(Integer, nullable=False, default=0)
+    pendiente = Column(Integer, nullable=False, default=0)
+    en_progreso = Column(Integer, nullable=False, default=0)
+    completado = Column(Integer, nullable=False, default=0)
+    total = Column(Integer, nullable=False, default=0)
+
+class EstadisticaResponsable(Base):
+    __tablename__ = "project_stats_responsables"
+
+    id_proyecto = Column(Integer, ForeignKey("proyectos.id", ondelete="CASCADE"), primary_key=True)
+    id_usuario = Column(Integer, ForeignKey("usuarios.id", ondelete="CASCADE"), primary_key=True)
+    asignadas = Column(Integer, nullable=False, default=0)
+    # Asignadas que no están completadas
+    abiertas = Column(Integer, nullable=False, default=0)
+
+# ------
+
+# Recordatorios de vencimiento ya enviados (recordatorios.py). Uno por tarea, responsable, tipo y
+# fecha límite: si la fecha cambia corresponde un recordatorio nuevo
+class RecordatorioEnviado(Base):
+    __tablename__ = "recordatorios_enviados"
+    __table_args__ = (
+        Index("ux_recordatorio_enviado", "id_tarea", "id_usuario", "tipo", "fecha_limite", unique=True),
+    )
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    id_tarea = Column(Integer, ForeignKey("tareas.id", ondelete="CASCADE"), nullable=False)
+    id_usuario = Column(Integer, ForeignKey("usuarios.id", ondelete="CASCADE"), nullable=False)
+    tipo = Column(String(20), nullable=False)     # "proxima" | "vencida"
+    fecha_limite = Column(DateTime, nullable=False)
+    # Mientras enviado es falso la fila es un reclamo: fecha_envio es cuándo se tomó
+    fecha_envio = Column(DateTime, default=datetime.now, nullable=False)
+    enviado = Column(Boolean, nullable=False, default=False, server_default=true())
@@ -0,0 +1,43 @@
+import base64
+import json
+from datetime import datetime
+
+# Cursores opacos para paginación keyset: lista de valores en JSON + base64
+
+
+def _serializar(valor):
+    if isinstance(valor, datetime):
+        return {"dt": valor.isoformat()}
+    raise TypeError(f"Tipo no soportado en cursor: {type(valor).__name__}")
+
+def _deserializar(valor):
+    if isinstance(valor, dict) and "dt" in valor:
+        return datetime.fromisoformat(valor["dt"])
+    return valor
+
+
+def codificar_cursor(*valores) -> str:
+    crudo = json.dumps(list(valores), default=_serializar, separators=(",", ":"))
+    return base64.urlsafe_b64encode(crudo.encode("utf-8")).decode("ascii").rstrip("=")
+
+def _es_del_tipo(valor, tipo) -> bool:
+    # bool es subclase de int: true/false en el JSON no es un id válido
+    if isinstance(valor, bool):
+        return tipo is bool
+    if tipo is float:
+        return isinstance(valor, (int, float))
+    return isinstance(valor, tipo)
+
+def decodificar_cursor(cursor: str, cantidad: int, tipos: tuple = None) -> list:
+    # tipos: tipo esperado de cada valor; un cursor armado a mano no debe llegar a la consulta
+    try:
+        relleno = "=" * (-len(cursor) % 4)
+        valores = json.loads(base64.urlsafe_b64decode(cursor + relleno))
+        if not isinstance(valores, list) or len(valores) != cantidad:
+            raise ValueError
+        valores = [_deserializar(v) for v in valores]
+    except Exception:
+        raise ValueError("Cursor inválido")
+    if tipos is not None and not all(_es_del_tipo(v, t) for v, t in zip(valores, tipos)):
+        raise ValueError("Cursor inválido")
+    return valores
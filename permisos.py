@@ -0,0 +1,137 @@
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Annotated, Optional
+from fastapi import Depends, Header
+from sqlalchemy import select, and_, func
+from sqlalchemy.orm import Session
+from dotenv import load_dotenv
+import os
+import threading
+import time
+from models import Usuario, Proyecto, ProyectoIntegrante, RolProyecto
+from utils import get_db, db_endpoint
+
+load_dotenv()
+
+# Cache de membresías (correo, proyecto) -> rol, por proceso
+MEMBRESIA_CACHE_TTL = float(os.getenv("MEMBRESIA_CACHE_TTL", "30"))
+MEMBRESIA_CACHE_MAX = int(os.getenv("MEMBRESIA_CACHE_MAX", "10000"))
+
+
+class ErrorAPI(Exception):
+    # Se convierte en JSONResponse({"error": ...}) desde main
+    def __init__(self, status_code: int, error: str, headers: dict = None):
+        self.status_code = status_code
+        self.error = error
+        self.headers = headers
+
+
+@dataclass(frozen=True)
+class Membresia:
+    id_usuario: int
+    nombre: str
+    correo: str
+    id_proyecto: int
+    id_dueño: int
+    rol: Optional[RolProyecto]
+
+    @property
+    def es_dueño(self) -> bool:
+        return self.id_dueño == self.id_usuario
+
+    @property
+    def es_integrante(self) -> bool:
+        return self.es_dueño or self.rol is not None
+
+    @property
+    def puede_editar(self) -> bool:
+        return self.es_dueño or self.rol in (RolProyecto.editor, RolProyecto.dueño)
+
+
+class CacheMembresias:
+    def __init__(self, ttl: float, max_entradas: int):
+        self.ttl = ttl
+        self.max_entradas = max_entradas
+        self._lock = threading.Lock()
+        self._entradas: "OrderedDict[tuple, tuple]" = OrderedDict()
+        self.aciertos = 0
+        self.fallos = 0
+
+    def get(self, correo: str, proyecto_id: int) -> Optional[Membresia]:
+        clave = (correo, proyecto_id)
+        with self._lock:
+            entrada = self._entradas.get(clave)
+            if entrada is None or entrada[0] < time.monotonic():
+                if entrada is not None:
+                    del self._entradas[clave]
+                self.fallos += 1
+                return None
+            self._entradas.move_to_end(clave)
+            self.aciertos += 1
+            return entrada[1]
+
+    def set(self, membresia: Membresia):
+        clave = (membresia.correo.lower(), membresia.id_proyecto)
+        with self._lock:
+            self._entradas[clave] = (time.monotonic() + self.ttl, membresia)
+            self._entradas.move_to_end(clave)
+            while len(self._entradas) > self.max_entradas:
+                self._entradas.popitem(last=False)
+
+    def invalidar_proyecto(self, proyecto_id: int):
+        with self._lock:
+            for clave in [c for c in self._entradas if c[1] == proyecto_id]:
+                del self._entradas[clave]
+
+    def limpiar(self):
+        with self._lock:
+            self._entradas.clear()
+
+
+cache_membresias = CacheMembresias(MEMBRESIA_CACHE_TTL, MEMBRESIA_CACHE_MAX)
+
+
+def resolver_membresia(db: Session, correo: str, proyecto_id: int) -> Membresia:
+    correo = correo.lower()
+    membresia = cache_membresias.get(correo, proyecto_id)
+    if membresia is not None:
+        return membresia
+
+    # Usuario, proyecto y rol en una sola consulta
+    fila = db.execute(
+        select(
+            Usuario.id.label("id_usuario"),
+            Usuario.nombre,
+            Usuario.correo,
+            Proyecto.id.label("id_proyecto"),
+            Proyecto.id_dueño,
+            ProyectoIntegrante.rol,
+        )
+        .select_from(Usuario)
+        .outerjoin(Proyecto, Proyecto.id == proyecto_id)
+        .outerjoin(ProyectoIntegrante, and_(
+            ProyectoIntegrante.id_proyecto == Proyecto.id,
+            ProyectoIntegrante.id_usuario == Usuario.id
+        ))
+        .where(func.lower(Usuario.correo) == correo)
+    ).first()
+
+    if not fila:
+        raise ErrorAPI(404, "Usuario no encontrado")
+    if fila.id_proyecto is None:
+        raise ErrorAPI(404, "Proyecto no encontrado")
+
+    membresia = Membresia(**fila._asdict())
+    cache_membresias.set(membresia)
+    return membresia
+
+
+# Dependencias para los endpoints de /proyectos/{proyecto_id}
+@db_endpoint
+def membresia_proyecto(proyecto_id: int, x_user_mail: Annotated[str, Header(...)], db: Session = Depends(get_db)) -> Membresia:
+    return resolver_membresia(db, x_user_mail, proyecto_id)
+
+# Variante para los endpoints que reciben el header X-User-Email
+@db_endpoint
+def membresia_proyecto_email(proyecto_id: int, x_user_email: Annotated[str, Header(...)], db: Session = Depends(get_db)) -> Membresia:
+    return resolver_membresia(db, x_user_email, proyecto_id)
@@ -0,0 +1,113 @@
+import os
+import threading
+import time
+from collections import OrderedDict
+from fastapi import Request
+from dotenv import load_dotenv
+from permisos import ErrorAPI
+
+load_dotenv()
+
+# Límite de intentos (token bucket) por IP y por correo para login, registro y reseteo de contraseña.
+# Se evalúa como dependencia, antes de abrir sesión de BD o usar el pool de bcrypt
+RATE_LIMIT_ACTIVO = os.getenv("RATE_LIMIT_ACTIVO", "true").lower() in ("1", "true", "si")
+RATE_LIMIT_IP_CAPACIDAD = float(os.getenv("RATE_LIMIT_IP_CAPACIDAD", "30"))
+RATE_LIMIT_IP_POR_MINUTO = float(os.getenv("RATE_LIMIT_IP_POR_MINUTO", "30"))
+RATE_LIMIT_CORREO_CAPACIDAD = float(os.getenv("RATE_LIMIT_CORREO_CAPACIDAD", "10"))
+RATE_LIMIT_CORREO_POR_MINUTO = float(os.getenv("RATE_LIMIT_CORREO_POR_MINUTO", "2"))
+# Si la app corre detrás de un proxy propio, la IP real viene en X-Forwarded-For
+RATE_LIMIT_CONFIAR_PROXY = os.getenv("RATE_LIMIT_CONFIAR_PROXY", "false").lower() in ("1", "true", "si")
+RATE_LIMIT_MAX_CLAVES = int(os.getenv("RATE_LIMIT_MAX_CLAVES", "100000"))
+
+
+class AlmacenMemoria:
+    # Buckets en memoria del proceso. Un almacén compartido (Redis, etc.) debe implementar
+    # consumir() de forma atómica con la misma semántica
+    def __init__(self, max_claves: int = RATE_LIMIT_MAX_CLAVES):
+        self.max_claves = max_claves
+        self._buckets = OrderedDict()
+        self._lock = threading.Lock()
+
+    def consumir(self, clave: str, capacidad: float, por_segundo: float, costo: float = 1) -> float:
+        # Devuelve 0 si se permite, o los segundos hasta que haya fichas suficientes
+        ahora = time.monotonic()
+        with self._lock:
+            fichas, ultimo = self._buckets.pop(clave, (capacidad, ahora))
+            fichas = min(capacidad, fichas + (ahora - ultimo) * por_segundo)
+            if fichas >= costo:
+                fichas -= costo
+                espera = 0.0
+            else:
+                espera = (costo - fichas) / por_segundo
+            self._buckets[clave] = (fichas, ahora)
+            while len(self._buckets) > self.max_claves:
+                self._buckets.popitem(last=False)
+            return espera
+
+    def limpiar(self):
+        with self._lock:
+            self._buckets.clear()
+
+    def __len__(self):
+        return len(self._buckets)
+
+
+class Limitador:
+    def __init__(self, almacen=None, activo: bool = RATE_LIMIT_ACTIVO):
+        self.almacen = almacen if almacen is not None else AlmacenMemoria()
+        self.activo = activo
+        self._lock = threading.Lock()
+        self.permitidas = 0
+        self.rechazadas = 0
+
+    def verificar(self, accion: str, ip: str, correo: str = None):
+        if not self.activo:
+            return
+        esperas = [self.almacen.consumir(f"{accion}:ip:{ip}", RATE_LIMIT_IP_CAPACIDAD, RATE_LIMIT_IP_POR_MINUTO / 60)]
+        if correo:
+            esperas.append(self.almacen.consumir(
+                f"{accion}:correo:{correo}", RATE_LIMIT_CORREO_CAPACIDAD, RATE_LIMIT_CORREO_POR_MINUTO / 60
+            ))
+        espera = max(esperas)
+        with self._lock:
+            if espera > 0:
+                self.rechazadas += 1
+            else:
+                self.permitidas += 1
+        if espera > 0:
+            raise ErrorAPI(429, "Demasiados intentos, intente más tarde", headers={"Retry-After": str(int(espera) + 1)})
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "activo": self.activo,
+                "claves": len(self.almacen),
+                "permitidas": self.permitidas,
+                "rechazadas": self.rechazadas,
+            }
+
+
+limitador = Limitador()
+
+
+def ip_cliente(request: Request) -> str:
+    if RATE_LIMIT_CONFIAR_PROXY:
+        reenviada = request.headers.get("x-forwarded-for")
+        if reenviada:
+            return reenviada.split(",")[0].strip()
+    return request.client.host if request.client else "desconocida"
+
+def normalizar_correo(correo) -> str:
+    return correo.strip().lower() if isinstance(correo, str) else None
+
+
+def limite_intentos(accion: str):
+    # FastAPI ya leyó y cacheó el cuerpo JSON en el Request, leerlo aquí no cuesta otra lectura
+    async def dependencia(request: Request):
+        try:
+            cuerpo = await request.json()
+        except ValueError:
+            cuerpo = None
+        correo = normalizar_correo(cuerpo.get("correo")) if isinstance(cuerpo, dict) else None
+        limitador.verificar(accion, ip_cliente(request), correo)
+    return dependencia
@@ -0,0 +1,282 @@
+import argparse
+import logging
+import os
+import threading
+import time
+from collections import defaultdict
+from datetime import datetime, timedelta
+from sqlalchemy import select, update, delete, tuple_, exists, and_
+from dotenv import load_dotenv
+from db import SessionLocal, iniciar_engine
+from models import Tarea, Proyecto, TareaResponsable, Usuario, EstadoTarea, RecordatorioEnviado
+from utils import insert_ignorando_conflictos
+from correo import EnvioDirecto
+
+load_dotenv()
+
+# Recordatorios de vencimiento: un hilo en segundo plano barre periódicamente las tareas abiertas
+# que vencen dentro de la ventana (o ya vencieron) y envía un resumen por responsable.
+# El registro recordatorios_enviados hace que cada aviso se envíe una sola vez, aunque haya
+# varios workers corriendo el barrido: cada resumen primero se reclama (filas con enviado falso,
+# confirmadas en una transacción corta), se entrega por SMTP sin transacción abierta y recién
+# entonces se marca como enviado. Si el envío falla se borra el reclamo y el próximo barrido lo
+# reintenta; un reclamo que nunca se resolvió (worker caído) vence y se vuelve a tomar.
+# Para una pasada manual: python recordatorios.py
+RECORDATORIOS_ACTIVO = os.getenv("RECORDATORIOS_ACTIVO", "true").lower() in ("1", "true", "si")
+# Segundos entre barridos; el primero ocurre un intervalo después del arranque
+RECORDATORIOS_INTERVALO = float(os.getenv("RECORDATORIOS_INTERVALO", "3600"))
+# Horas hacia adelante que se consideran "próximas a vencer"
+RECORDATORIOS_VENTANA_HORAS = float(os.getenv("RECORDATORIOS_VENTANA_HORAS", "24"))
+# Días hacia atrás: tareas vencidas hace más tiempo ya no se recuerdan
+RECORDATORIOS_ATRASO_DIAS = float(os.getenv("RECORDATORIOS_ATRASO_DIAS", "7"))
+# Usuarios por lote del barrido (keyset por id): en memoria solo están los avisos de un lote
+RECORDATORIOS_LOTE = int(os.getenv("RECORDATORIOS_LOTE", "500"))
+# Minutos tras los cuales un reclamo sin marcar como enviado se considera abandonado.
+# Debe superar holgadamente SMTP_TIMEOUT
+RECORDATORIOS_RECLAMO_MINUTOS = float(os.getenv("RECORDATORIOS_RECLAMO_MINUTOS", "30"))
+
+logger = logging.getLogger("recordatorios")
+
+COLUMNAS_REGISTRO = ["id_tarea", "id_usuario", "tipo", "fecha_limite"]
+
+
+def _condiciones(desde: datetime, hasta: datetime, ahora: datetime, vencimiento_reclamo: datetime) -> list:
+    # Tareas abiertas en el rango (ix_tareas_fecha_limite) cuyo responsable todavía no tiene el aviso
+    # correspondiente enviado o reclamado hace poco
+    tipo_proxima = and_(RecordatorioEnviado.tipo == "proxima", Tarea.fecha_limite >= ahora)
+    tipo_vencida = and_(RecordatorioEnviado.tipo == "vencida", Tarea.fecha_limite < ahora)
+    registrado = exists().where(
+        RecordatorioEnviado.id_tarea == Tarea.id,
+        RecordatorioEnviado.id_usuario == TareaResponsable.id_usuario,
+        RecordatorioEnviado.fecha_limite == Tarea.fecha_limite,
+        tipo_proxima | tipo_vencida,
+        RecordatorioEnviado.enviado | (RecordatorioEnviado.fecha_envio >= vencimiento_reclamo),
+    )
+    return [
+        Tarea.fecha_limite >= desde, Tarea.fecha_limite <= hasta, Tarea.estado != EstadoTarea.completado, ~registrado,
+    ]
+
+def _lote_usuarios(db, condiciones: list, despues, lote: int) -> list:
+    # Keyset sobre el id de usuario: cada lote es una consulta corta y trae solo lote usuarios
+    consulta = (
+        select(TareaResponsable.id_usuario)
+        .join(Tarea, Tarea.id == TareaResponsable.id_tarea)
+        .where(*condiciones)
+        .distinct()
+        .order_by(TareaResponsable.id_usuario)
+        .limit(lote)
+    )
+    if despues is not None:
+        consulta = consulta.where(TareaResponsable.id_usuario > despues)
+    return db.execute(consulta).scalars().all()
+
+def _pendientes(db, condiciones: list, ids_usuarios: list) -> list:
+    return db.execute(
+        select(
+            Usuario.id.label("id_usuario"), Usuario.correo, Usuario.nombre,
+            Tarea.id.label("id_tarea"), Tarea.titulo, Tarea.fecha_limite, Proyecto.nombre.label("proyecto"),
+        )
+        .join(TareaResponsable, TareaResponsable.id_tarea == Tarea.id)
+        .join(Usuario, Usuario.id == TareaResponsable.id_usuario)
+        .join(Proyecto, Proyecto.id == Tarea.id_proyecto)
+        .where(*condiciones, TareaResponsable.id_usuario.in_(ids_usuarios))
+    ).all()
+
+
+def redactar(nombre: str, tareas: list, ahora: datetime) -> tuple:
+    vencidas = [t for t in tareas if t.fecha_limite < ahora]
+    proximas = [t for t in tareas if t.fecha_limite >= ahora]
+    partes = []
+    if proximas:
+        partes.append(f"{len(proximas)} próxima{'s' if len(proximas) != 1 else ''} a vencer")
+    if vencidas:
+        partes.append(f"{len(vencidas)} vencida{'s' if len(vencidas) != 1 else ''}")
+    asunto = "Recordatorio de tareas: " + " y ".join(partes)
+
+    lineas = [f"Hola {nombre},", ""]
+    for titulo, grupo in (("Vencidas:", vencidas), ("Próximas a vencer:", proximas)):
+        if not grupo:
+            continue
+        lineas.append(titulo)
+        for t in sorted(grupo, key=lambda t: (t.fecha_limite, t.id_tarea)):
+            lineas.append(f"  - [{t.proyecto}] {t.titulo} (vence {t.fecha_limite:%d/%m/%Y %H:%M})")
+        lineas.append("")
+    return asunto, "\n".join(lineas)
+
+
+def _reclamar(db, tareas: list, ahora: datetime, vencimiento_reclamo: datetime) -> dict:
+    # Devuelve {id_tarea: id del registro} de lo que este barrido logró reclamar: otro worker pudo
+    # haberse adelantado. Se confirma antes del envío para no retener la conexión ni los bloqueos
+    filas = [
+        {"id_tarea": t.id_tarea, "id_usuario": t.id_usuario, "fecha_limite": t.fecha_limite,
+         "tipo": "vencida" if t.fecha_limite < ahora else "proxima", "fecha_envio": ahora, "enviado": False}
+        for t in tareas
+    ]
+    reclamadas = dict(insert_ignorando_conflictos(
+        db, RecordatorioEnviado, filas, COLUMNAS_REGISTRO, [RecordatorioEnviado.id_tarea, RecordatorioEnviado.id]
+    ))
+    # Reclamos abandonados: el UPDATE condicionado los toma una sola vez aunque compitan varios workers
+    abandonadas = [f for f in filas if f["id_tarea"] not in reclamadas]
+    if abandonadas:
+        reclamadas.update(db.execute(
+            update(RecordatorioEnviado)
+            .where(
+                RecordatorioEnviado.id_usuario == abandonadas[0]["id_usuario"],
+                tuple_(RecordatorioEnviado.id_tarea, RecordatorioEnviado.tipo, RecordatorioEnviado.fecha_limite).in_(
+                    [(f["id_tarea"], f["tipo"], f["fecha_limite"]) for f in abandonadas]
+                ),
+                ~RecordatorioEnviado.enviado,
+                RecordatorioEnviado.fecha_envio < vencimiento_reclamo,
+            )
+            .values(fecha_envio=ahora)
+            .returning(RecordatorioEnviado.id_tarea, RecordatorioEnviado.id)
+            .execution_options(synchronize_session=False)
+        ).all())
+    db.commit()
+    return reclamadas
+
+def _enviar_resumen(session_factory, envio, tareas: list, ahora: datetime, vencimiento_reclamo: datetime) -> bool:
+    with session_factory() as db:
+        reclamadas = _reclamar(db, tareas, ahora, vencimiento_reclamo)
+    tareas = [t for t in tareas if t.id_tarea in reclamadas]
+    if not tareas:
+        return False
+    propios = RecordatorioEnviado.id.in_(list(reclamadas.values()))
+    asunto, cuerpo = redactar(tareas[0].nombre, tareas, ahora)
+    try:
+        envio(tareas[0].correo, asunto, cuerpo)
+    except Exception:
+        # Se libera el reclamo (si nadie lo retomó): el próximo barrido lo reintenta
+        with session_factory() as db:
+            db.execute(delete(RecordatorioEnviado).where(
+                propios, ~RecordatorioEnviado.enviado, RecordatorioEnviado.fecha_envio == ahora
+            ))
+            db.commit()
+        raise
+    # Si esto fallara después de la entrega, el reclamo vence y el aviso se repite: preferible a perderlo
+    with session_factory() as db:
+        db.execute(update(RecordatorioEnviado).where(propios).values(enviado=True))
+        db.commit()
+    return True
+
+
+def barrer(session_factory=SessionLocal, ahora: datetime = None, ventana_horas: float = RECORDATORIOS_VENTANA_HORAS,
+           atraso_dias: float = RECORDATORIOS_ATRASO_DIAS, lote: int = RECORDATORIOS_LOTE, envio=None,
+           reclamo_minutos: float = RECORDATORIOS_RECLAMO_MINUTOS) -> dict:
+    ahora = ahora or datetime.now()
+    vencimiento_reclamo = ahora - timedelta(minutes=reclamo_minutos)
+    condiciones = _condiciones(ahora - timedelta(days=atraso_dias), ahora + timedelta(hours=ventana_horas),
+                               ahora, vencimiento_reclamo)
+
+    # Usuarios con avisos pendientes por lotes; un resumen por usuario, cada uno con sus transacciones cortas
+    propio = envio is None
+    envio = EnvioDirecto() if propio else envio
+    lotes = usuarios = enviados = errores = 0
+    despues = None
+    try:
+        while True:
+            with session_factory() as db:
+                ids_usuarios = _lote_usuarios(db, condiciones, despues, lote)
+                if not ids_usuarios:
+                    break
+                por_usuario = defaultdict(list)
+                for fila in _pendientes(db, condiciones, ids_usuarios):
+                    por_usuario[fila.id_usuario].append(fila)
+            lotes += 1
+            usuarios += len(ids_usuarios)
+            despues = ids_usuarios[-1]
+            for id_usuario, tareas in por_usuario.items():
+                try:
+                    if _enviar_resumen(session_factory, envio, tareas, ahora, vencimiento_reclamo):
+                        enviados += 1
+                except Exception:
+                    errores += 1
+                    logger.exception("No se pudo enviar el recordatorio al usuario %s", id_usuario)
+            if len(ids_usuarios) < lote:
+                break
+    finally:
+        if propio:
+            envio.cerrar()
+    return {"lotes": lotes, "usuarios": usuarios, "resumenes_enviados": enviados, "errores": errores}
+
+
+class ProgramadorRecordatorios:
+    def __init__(self, barrido=barrer, intervalo: float = RECORDATORIOS_INTERVALO, activo: bool = RECORDATORIOS_ACTIVO):
+        self._barrido = barrido
+        self.intervalo = intervalo
+        self.activo = activo
+        self._hilo = None
+        self._detener = threading.Event()
+        self._lock = threading.Lock()
+        self.barridos = 0
+        self.fallidos = 0
+        self.resumenes_enviados = 0
+        self.ultimo_barrido = None
+        self.ultima_duracion_ms = None
+
+    def iniciar(self):
+        if not self.activo:
+            return
+        with self._lock:
+            if self._hilo is not None and self._hilo.is_alive():
+                return
+            self._detener.clear()
+            self._hilo = threading.Thread(target=self._worker, name="recordatorios", daemon=True)
+            self._hilo.start()
+
+    def detener(self, timeout: float = 10):
+        self._detener.set()
+        if self._hilo is not None:
+            self._hilo.join(timeout)
+
+    def ejecutar(self) -> dict:
+        inicio = time.perf_counter()
+        try:
+            resultado = self._barrido()
+        except Exception:
+            with self._lock:
+                self.fallidos += 1
+            raise
+        with self._lock:
+            self.barridos += 1
+            self.resumenes_enviados += resultado["resumenes_enviados"]
+            self.ultimo_barrido = datetime.now()
+            self.ultima_duracion_ms = round((time.perf_counter() - inicio) * 1000, 3)
+        return resultado
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "activo": self.activo,
+                "corriendo": self._hilo is not None and self._hilo.is_alive(),
+                "intervalo": self.intervalo,
+                "barridos": self.barridos,
+                "fallidos": self.fallidos,
+                "resumenes_enviados": self.resumenes_enviados,
+                "ultimo_barrido": self.ultimo_barrido.isoformat() if self.ultimo_barrido else None,
+                "ultima_duracion_ms": self.ultima_duracion_ms,
+            }
+
+    def _worker(self):
+        # Event.wait en lugar de sleep: detener() corta la espera de inmediato
+        while not self._detener.wait(self.intervalo):
+            try:
+                self.ejecutar()
+            except Exception:
+                # Un barrido fallido no detiene al programador
+                logger.exception("Falló el barrido de recordatorios")
+
+
+programador_recordatorios = ProgramadorRecordatorios()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Barrido de recordatorios de vencimiento")
+    parser.add_argument("--ventana-horas", type=float, default=RECORDATORIOS_VENTANA_HORAS)
+    parser.add_argument("--atraso-dias", type=float, default=RECORDATORIOS_ATRASO_DIAS)
+    args = parser.parse_args()
+
+    iniciar_engine()
+    resultado = barrer(ventana_horas=args.ventana_horas, atraso_dias=args.atraso_dias)
+    print(f"Usuarios con avisos: {resultado['usuarios']} en {resultado['lotes']} lotes, "
+          f"resúmenes enviados: {resultado['resumenes_enviados']}, errores: {resultado['errores']}")
@@ -1,5 +1,6 @@
-from pydantic import BaseModel, ConfigDict, RootModel
+from pydantic import BaseModel, ConfigDict, RootModel, Field, TypeAdapter
 from typing import Optional, Literal, Dict, List
+from typing_extensions import TypedDict
 from datetime import datetime
 from models import EstadoTarea
 # Para registro de usuario
@@ -35,6 +36,9 @@ class ProyectoUsuarioInfo(BaseModel):
     descripcion: Optional[str] = None
     fecha_finalizacion: Optional[datetime] = None
     rol_usuario: str
+    # Cantidad de tareas por valor de EstadoTarea
+    tareas_por_estado: Dict[str, int] = {}
+    total_tareas: int = 0
     
 class IntegrantesAddRequest(RootModel):
     root:Dict[str, Literal["editor", "lector"]]
@@ -55,6 +59,11 @@ class TareaCreate(BaseModel):
     descripcion: Optional[str] = None
     fecha_limite: Optional[datetime] = None
 
+# Fila de importación masiva (NDJSON / CSV)
+class TareaImport(TareaCreate):
+    titulo: str = Field(min_length=1, max_length=100)
+    estado: Optional[EstadoTarea] = None
+
 class ResponsableResumen(BaseModel):
     model_config = ConfigDict(from_attributes=True)
         
@@ -75,14 +84,107 @@ class TareaResponse(BaseModel):
 
 class ResponsablesAddRequest(BaseModel):
     correos: List[str]
+
+class ResponsablesBulkRequest(RootModel):
+    root: Dict[int, List[str]]
+    model_config = {
+        "json_schema_extra": {"examples": [
+                {
+                    "12": ["test@gmail.com", "jose@gmail.com"],
+                    "15": ["perez@gmail.com"]
+                }]}
+}
     
 class TareaEstadoUpdate(BaseModel):
     estado: EstadoTarea
 
+class FiltroTareas(BaseModel):
+    estado: Optional[EstadoTarea] = None
+    responsable: Optional[int] = None
+
+    @property
+    def tiene_criterio(self) -> bool:
+        # {} o {"estado": null} no filtran nada: no deben alcanzar a todas las tareas del proyecto
+        return self.estado is not None or self.responsable is not None
+
+class TareasEstadoBulkUpdate(BaseModel):
+    estado: EstadoTarea
+    ids: Optional[List[int]] = Field(default=None, max_length=10000)
+    filtro: Optional[FiltroTareas] = None
+    model_config = {
+        "json_schema_extra": {"examples": [
+                {"estado": "completado", "ids": [12, 15, 18]},
+                {"estado": "completado", "filtro": {"estado": "en progreso", "responsable": 4}}
+            ]}
+}
+
 class IntegranteResponse(BaseModel):
     model_config = ConfigDict(from_attributes=True)
 
     id_usuario: int
     nombre: str
     correo: str
-    rol: str
\ No newline at end of file
+    rol: str
+
+class TareaBusquedaResponse(BaseModel):
+    id: int
+    id_proyecto: int
+    nombre_proyecto: str
+    titulo: str
+    descripcion: Optional[str] = None
+    estado: str
+
+# Filas de los listados: reflejan ProyectoUsuarioInfo, TareaResponse e IntegranteResponse campo a campo.
+# Los endpoints arman estos dicts y los adaptadores precompilados los escriben como JSON en una sola
+# pasada de pydantic-core, sin instanciar modelos (los response_model quedan para el esquema OpenAPI)
+class ProyectoUsuarioFila(TypedDict):
+    id: int
+    nombre_proyecto: str
+    descripcion: Optional[str]
+    fecha_finalizacion: Optional[datetime]
+    rol_usuario: str
+    tareas_por_estado: Dict[str, int]
+    total_tareas: int
+
+class ResponsableFila(TypedDict):
+    id: int
+    nombre: str
+
+class TareaFila(TypedDict):
+    id: int
+    id_proyecto: int
+    titulo: str
+    descripcion: Optional[str]
+    estado: str
+    fecha_creacion: datetime
+    fecha_limite: Optional[datetime]
+    responsables: Optional[List[ResponsableFila]]
+
+class IntegranteFila(TypedDict):
+    id_usuario: int
+    nombre: str
+    correo: str
+    rol: str
+
+class TareaBusquedaFila(TypedDict):
+    id: int
+    id_proyecto: int
+    nombre_proyecto: str
+    titulo: str
+    descripcion: Optional[str]
+    estado: str
+
+# Respuesta de /proyectos/{id}/cambios
+class CambiosProyecto(TypedDict):
+    cursor: str
+    hay_mas: bool
+    tareas: List[TareaFila]
+    tareas_eliminadas: List[int]
+    integrantes: List[IntegranteFila]
+    integrantes_eliminados: List[int]
+
+ProyectosUsuarioAdapter = TypeAdapter(List[ProyectoUsuarioFila])
+TareasAdapter = TypeAdapter(List[TareaFila])
+IntegrantesAdapter = TypeAdapter(List[IntegranteFila])
+CambiosAdapter = TypeAdapter(CambiosProyecto)
+BusquedaAdapter = TypeAdapter(List[TareaBusquedaFila])
@@ -0,0 +1,40 @@
+from starlette.responses import Response, JSONResponse as _JSONResponse
+from metricas import medir
+
+# Respuesta JSON para listados grandes. Por defecto FastAPI valida el resultado contra
+# response_model, lo convierte a objetos JSON-compatibles y recién entonces llama a json.dumps.
+# Aquí los dicts que arma el endpoint van directo a bytes con un TypeAdapter precompilado
+# (schemas.*Adapter). Al devolver una Response, FastAPI no vuelve a validar ni serializar
+
+
+class RespuestaLista(Response):
+    media_type = "application/json"
+
+    def __init__(self, adapter, contenido, status_code: int = 200, headers: dict = None):
+        with medir("serializacion"):
+            cuerpo = adapter.dump_json(contenido)
+        super().__init__(content=cuerpo, status_code=status_code, headers=headers)
+
+
+class JSONResponse(_JSONResponse):
+    # Igual a la de Starlette, pero el tiempo de json.dumps cuenta como serialización en Server-Timing
+    def render(self, content) -> bytes:
+        with medir("serializacion"):
+            return super().render(content)
+
+
+def tarea_a_fila(tarea) -> dict:
+    # Tarea con responsables y usuarios ya cargados -> schemas.TareaFila
+    return {
+        "id": tarea.id,
+        "id_proyecto": tarea.id_proyecto,
+        "titulo": tarea.titulo,
+        "descripcion": tarea.descripcion,
+        "estado": tarea.estado.value if hasattr(tarea.estado, "value") else str(tarea.estado),
+        "fecha_creacion": tarea.fecha_creacion,
+        "fecha_limite": tarea.fecha_limite,
+        "responsables": [
+            {"id": tr.usuario.id, "nombre": tr.usuario.nombre}
+            for tr in getattr(tarea, "responsables", []) if getattr(tr, "usuario", None)
+        ],
+    }
@@ -1,2 +1,3 @@
 #!/bin/bash
-uvicorn main:app --host 0.0.0.0 --port $PORT
\ No newline at end of file
+# El esquema se aplica antes de arrancar; la app no crea tablas al importarse
+python migraciones.py && uvicorn main:app --host 0.0.0.0 --port $PORT
\ No newline at end of file
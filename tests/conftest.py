@@ -0,0 +1,26 @@
+import uuid
+import pytest
+from fastapi.testclient import TestClient
+from main import app
+from migraciones import migrar
+from rate_limit import limitador
+
+client = TestClient(app)
+
+
+@pytest.fixture(scope="session", autouse=True)
+def _esquema():
+    # La app ya no crea tablas al importarse: la base de pruebas se prepara con las migraciones
+    migrar()
+
+@pytest.fixture(autouse=True)
+def _limpiar_rate_limit():
+    # Todas las pruebas comparten la IP del TestClient: el límite de /register no depende del orden
+    limitador.almacen.limpiar()
+
+
+def registrar(nombre):
+    correo = f"{nombre.lower()}-{uuid.uuid4().hex[:8]}@test.com"
+    r = client.post("/register", json={"correo": correo, "nombre": nombre, "contraseña": "1234"})
+    assert r.status_code == 201, r.text
+    return correo
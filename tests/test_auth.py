@@ -0,0 +1,39 @@
+import threading
+import time
+import pytest
+from auth import HashingPool, HashingPoolBusy, hash_password, verify_password
+
+def test_hash_y_verificacion():
+    hashed = hash_password("1234")
+    assert verify_password("1234", hashed)
+    assert not verify_password("otra", hashed)
+
+def test_pool_rechaza_cuando_la_cola_esta_llena():
+    pool = HashingPool(workers=1, max_queue=1)
+    liberar = threading.Event()
+    iniciadas = threading.Semaphore(0)
+
+    def bloquear():
+        iniciadas.release()
+        liberar.wait(5)
+        return True
+
+    hilos = [threading.Thread(target=pool.run, args=(bloquear,)) for _ in range(2)]
+    for h in hilos:
+        h.start()
+    iniciadas.acquire(timeout=5)
+    while pool.stats()["en_cola"] < 1:
+        time.sleep(0.01)
+
+    with pytest.raises(HashingPoolBusy):
+        pool.run(bloquear)
+
+    stats = pool.stats()
+    assert stats["en_ejecucion"] == 1
+    assert stats["en_cola"] == 1
+    assert stats["rechazadas"] == 1
+
+    liberar.set()
+    for h in hilos:
+        h.join()
+    assert pool.stats()["completadas"] == 2
@@ -0,0 +1,63 @@
+import uuid
+from fastapi.testclient import TestClient
+from main import app
+from conftest import registrar
+from paginacion import codificar_cursor
+
+client = TestClient(app)
+
+
+def _buscar(correo, **params):
+    return client.get("/tareas/buscar", params=params, headers={"x-user-mail": correo})
+
+
+def test_busqueda_rankeada_paginada_y_limitada_a_mis_proyectos():
+    clave = uuid.uuid4().hex[:6]
+    yo = registrar("Yo")
+    ajeno = registrar("Ajeno")
+    p1 = client.post("/proyectos", json={"nombre": "Uno"}, headers={"x-user-mail": yo}).json()["id_proyecto"]
+    p2 = client.post("/proyectos", json={"nombre": "Dos"}, headers={"x-user-mail": yo}).json()["id_proyecto"]
+    p3 = client.post("/proyectos", json={"nombre": "Ajeno"}, headers={"x-user-mail": ajeno}).json()["id_proyecto"]
+
+    def crear(pid, correo, titulo, descripcion=None):
+        return client.post(f"/proyectos/{pid}/tareas", json={"titulo": titulo, "descripcion": descripcion},
+                           headers={"x-user-email": correo}).json()["id_tarea"]
+
+    mejor = crear(p1, yo, f"Reunión {clave} {clave}", f"Planificación {clave}")
+    otras = [crear(p2, yo, f"Tarea {i}", f"Mencionar {clave} en la reunion") for i in range(3)]
+    crear(p3, ajeno, f"Reunión {clave}")
+    borrada = crear(p1, yo, f"Borrar {clave}")
+    client.delete(f"/proyectos/{p1}/tareas/{borrada}", headers={"x-user-mail": yo})
+
+    r = _buscar(yo, q=f"reunion {clave}")
+    assert r.status_code == 200, r.text
+    ids = [t["id"] for t in r.json()]
+    # Sin acentos, sin tareas de proyectos ajenos ni borradas, la más relevante primero
+    assert ids[0] == mejor
+    assert sorted(ids) == sorted([mejor] + otras)
+    assert r.json()[0]["nombre_proyecto"] == "Uno"
+    assert r.json()[0]["estado"] == "pendiente"
+
+    # Prefijo del último término y filtro por proyecto
+    assert [t["id"] for t in _buscar(yo, q=clave[:4], proyecto_id=p1).json()] == [mejor]
+
+    vistos, cursor = [], None
+    while True:
+        params = {"q": f"reunion {clave}", "limite": 2}
+        if cursor:
+            params["cursor"] = cursor
+        r = _buscar(yo, **params)
+        vistos += [t["id"] for t in r.json()]
+        cursor = r.headers.get("x-next-cursor")
+        if not cursor:
+            break
+    assert vistos == ids
+
+    assert _buscar(yo, q=clave, cursor=codificar_cursor("1", 1)).status_code == 400
+    assert _buscar(yo, q=clave, cursor=codificar_cursor(1.5, None)).status_code == 400
+
+def test_busqueda_sin_palabras():
+    yo = registrar("Yo")
+    assert _buscar(yo, q="***").status_code == 400
+    # Caracteres de la sintaxis de MATCH no rompen la consulta
+    assert _buscar(yo, q='"foo" OR bar*').status_code == 200
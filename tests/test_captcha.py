@@ -0,0 +1,164 @@
+import asyncio
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs
+import pytest
+from fastapi.testclient import TestClient
+from captcha import VerificadorCaptcha, CaptchaNoDisponible, CircuitoAbierto, verificador_captcha
+from main import app
+
+
+class ManejadorRecaptcha(BaseHTTPRequestHandler):
+    # Imita siteverify: token "ok" es válido, "lento" tarda más que el timeout, "error" responde 500
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, *args):
+        pass
+
+    def do_POST(self):
+        datos = parse_qs(self.rfile.read(int(self.headers["Content-Length"])).decode())
+        token = datos.get("response", [""])[0]
+        with self.server.lock:
+            self.server.solicitudes += 1
+            self.server.puertos.add(self.client_address[1])
+        if token == "lento":
+            time.sleep(0.5)
+        if token == "error":
+            cuerpo, estado = b"{}", 500
+        else:
+            cuerpo, estado = json.dumps({"success": token == "ok"}).encode(), 200
+        self.send_response(estado)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(cuerpo)))
+        self.end_headers()
+        self.wfile.write(cuerpo)
+
+
+@pytest.fixture
+def servidor():
+    s = ThreadingHTTPServer(("127.0.0.1", 0), ManejadorRecaptcha)
+    s.daemon_threads = True
+    s.lock = threading.Lock()
+    s.solicitudes = 0
+    s.puertos = set()
+    threading.Thread(target=s.serve_forever, daemon=True).start()
+    yield s
+    s.shutdown()
+    s.server_close()
+
+def _url(servidor):
+    return f"http://127.0.0.1:{servidor.server_address[1]}/siteverify"
+
+
+def test_reutiliza_conexiones(servidor):
+    verificador = VerificadorCaptcha(url=_url(servidor), secret="s")
+
+    async def escenario():
+        try:
+            return [await verificador.verificar(t) for t in ["ok", "no", "ok", "ok"]]
+        finally:
+            await verificador.cerrar()
+
+    assert asyncio.run(escenario()) == [True, False, True, True]
+    # Keep-alive: todas las verificaciones por la misma conexión
+    assert len(servidor.puertos) == 1
+    stats = verificador.stats()
+    assert stats["solicitudes"] == 4 and stats["errores"] == 0
+    assert stats["latencia_max_ms"] > 0
+
+
+def test_timeout_y_circuit_breaker(servidor):
+    verificador = VerificadorCaptcha(url=_url(servidor), secret="s", read_timeout=0.1,
+                                     umbral_fallos=2, enfriamiento=0.3)
+
+    async def escenario():
+        try:
+            for token in ["lento", "error"]:
+                with pytest.raises(CaptchaNoDisponible):
+                    await verificador.verificar(token)
+            assert verificador.estado_circuito() == "abierto"
+            # Con el circuito abierto no se llama al servicio
+            antes = servidor.solicitudes
+            with pytest.raises(CircuitoAbierto):
+                await verificador.verificar("ok")
+            assert servidor.solicitudes == antes
+            await asyncio.sleep(0.35)
+            assert verificador.estado_circuito() == "semi-abierto"
+            assert await verificador.verificar("ok") is True
+            assert verificador.estado_circuito() == "cerrado"
+        finally:
+            await verificador.cerrar()
+
+    asyncio.run(escenario())
+    assert verificador.stats()["rechazadas"] == 1
+
+
+def test_prueba_cancelada_libera_el_circuito(servidor):
+    verificador = VerificadorCaptcha(url=_url(servidor), secret="s", umbral_fallos=1, enfriamiento=0.1)
+
+    async def escenario():
+        try:
+            with pytest.raises(CaptchaNoDisponible):
+                await verificador.verificar("error")
+            await asyncio.sleep(0.15)
+            assert verificador.estado_circuito() == "semi-abierto"
+            # La solicitud de prueba se cancela (cliente desconectado) antes de responder
+            prueba = asyncio.create_task(verificador.verificar("lento"))
+            await asyncio.sleep(0.1)
+            prueba.cancel()
+            with pytest.raises(asyncio.CancelledError):
+                await prueba
+            assert await verificador.verificar("ok") is True
+            assert verificador.estado_circuito() == "cerrado"
+        finally:
+            await verificador.cerrar()
+
+    asyncio.run(escenario())
+
+
+def test_cliente_de_otro_loop_se_cierra(servidor):
+    verificador = VerificadorCaptcha(url=_url(servidor), secret="s")
+    # Cada asyncio.run es un loop nuevo, como los requests del TestClient sin lifespan
+    assert asyncio.run(verificador.verificar("ok")) is True
+    anterior = verificador._client
+    assert anterior.is_closed
+
+    async def escenario():
+        try:
+            assert await verificador.verificar("ok") is True
+            assert verificador._client is not anterior
+        finally:
+            await verificador.cerrar()
+
+    asyncio.run(escenario())
+    assert len(servidor.puertos) == 2
+
+
+def test_limite_de_concurrencia(servidor):
+    verificador = VerificadorCaptcha(url=_url(servidor), secret="s", max_concurrencia=1)
+
+    async def escenario():
+        try:
+            lenta = asyncio.create_task(verificador.verificar("lento"))
+            await asyncio.sleep(0.1)
+            with pytest.raises(CaptchaNoDisponible):
+                await verificador.verificar("ok")
+            assert await lenta is False
+        finally:
+            await verificador.cerrar()
+
+    asyncio.run(escenario())
+
+
+def test_endpoint_verify_captcha(servidor, monkeypatch):
+    monkeypatch.setattr(verificador_captcha, "url", _url(servidor))
+    with TestClient(app) as c:
+        assert c.post("/api/verify-captcha", json={"token": "ok"}).json() == {"success": True}
+        r = c.post("/api/verify-captcha", json={"token": "no"})
+        assert r.status_code == 400
+        assert r.json()["error"] == "Captcha inválido"
+        r = c.post("/api/verify-captcha", json={"token": "error"})
+        assert r.status_code == 503 and "Retry-After" in r.headers
+        assert c.get("/internal/captcha").json()["solicitudes"] >= 3
@@ -0,0 +1,27 @@
+import json
+import os
+import subprocess
+import sys
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def test_prueba_de_carga_reducida(tmp_path):
+    # La prueba de carga corre en su propio proceso: fija la URL de la base antes de importar la app
+    salida = tmp_path / "carga.json"
+    comando = [sys.executable, "benchmarks/carga.py", "--usuarios", "6", "--proyectos", "3", "--tareas", "10",
+               "--clientes", "3", "--solicitudes", "40", "--calentamiento", "0", "--salida", str(salida)]
+    resultado = subprocess.run(comando, cwd=RAIZ, capture_output=True, text=True, timeout=180)
+    assert resultado.returncode == 0, resultado.stderr[-2000:]
+
+    datos = json.loads(salida.read_text(encoding="utf-8"))
+    assert datos["total"]["solicitudes"] == 40
+    assert datos["total"]["errores"] == 0
+    for nombre, endpoint in datos["endpoints"].items():
+        assert endpoint["p50_ms"] <= endpoint["p95_ms"] <= endpoint["p99_ms"], nombre
+        assert endpoint["consultas_por_request"] >= 1, nombre
+
+    # Misma corrida contra sí misma como baseline, con tolerancia amplia: sin regresiones
+    comando += ["--baseline", str(salida), "--tolerancia", "100"]
+    resultado = subprocess.run(comando, cwd=RAIZ, capture_output=True, text=True, timeout=180)
+    assert resultado.returncode == 0, resultado.stdout[-2000:]
@@ -0,0 +1,122 @@
+import smtplib
+import socketserver
+import threading
+import time
+from correo import ColaCorreo
+
+
+class ServidorSMTP(socketserver.ThreadingTCPServer):
+    # SMTP mínimo en memoria para pruebas
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, rechazar_primeros=0):
+        super().__init__(("127.0.0.1", 0), ManejadorSMTP)
+        self.mensajes = []
+        self.conexiones = 0
+        self.rechazar_primeros = rechazar_primeros
+        self.lock = threading.Lock()
+
+
+class ManejadorSMTP(socketserver.StreamRequestHandler):
+    def responder(self, linea):
+        self.wfile.write((linea + "\r\n").encode())
+
+    def handle(self):
+        servidor = self.server
+        with servidor.lock:
+            servidor.conexiones += 1
+        self.responder("220 localhost ESMTP")
+        destinatarios = []
+        while True:
+            linea = self.rfile.readline().decode().rstrip("\r\n")
+            if not linea:
+                return
+            comando = linea.split(" ")[0].upper()
+            if comando == "EHLO":
+                self.responder("250-localhost")
+                self.responder("250 AUTH PLAIN LOGIN")
+            elif comando == "AUTH":
+                self.responder("235 ok")
+            elif comando == "MAIL":
+                destinatarios = []
+                self.responder("250 ok")
+            elif comando == "RCPT":
+                destinatarios.append(linea)
+                self.responder("250 ok")
+            elif comando == "DATA":
+                self.responder("354 fin con .")
+                datos = []
+                while True:
+                    l = self.rfile.readline().decode()
+                    if l.rstrip("\r\n") == ".":
+                        break
+                    datos.append(l)
+                with servidor.lock:
+                    if servidor.rechazar_primeros > 0:
+                        servidor.rechazar_primeros -= 1
+                        self.responder("451 intente luego")
+                        continue
+                    servidor.mensajes.append("".join(datos))
+                self.responder("250 ok")
+            elif comando == "QUIT":
+                self.responder("221 bye")
+                return
+            else:
+                self.responder("250 ok")
+
+
+def _levantar(**kwargs):
+    servidor = ServidorSMTP(**kwargs)
+    threading.Thread(target=servidor.serve_forever, daemon=True).start()
+    return servidor
+
+def _esperar(condicion, timeout=5):
+    limite = time.monotonic() + timeout
+    while not condicion():
+        assert time.monotonic() < limite, "timeout"
+        time.sleep(0.01)
+
+
+def test_envia_en_lote_reutilizando_la_conexion():
+    servidor = _levantar()
+    puerto = servidor.server_address[1]
+    cola = ColaCorreo(conectar=lambda: smtplib.SMTP("127.0.0.1", puerto), remitente="app@test.com", inactividad=5)
+    try:
+        inicio = time.monotonic()
+        for i in range(20):
+            cola.enviar(f"u{i}@test.com", "Asunto", f"cuerpo {i}")
+        # encolar no espera al envío
+        assert time.monotonic() - inicio < 0.5
+        _esperar(lambda: cola.stats()["enviados"] == 20)
+        assert len(servidor.mensajes) == 20
+        assert servidor.conexiones == 1
+        assert cola.stats()["en_cola"] == 0
+    finally:
+        cola.detener()
+        servidor.shutdown()
+
+
+def test_reintenta_con_backoff():
+    servidor = _levantar(rechazar_primeros=2)
+    puerto = servidor.server_address[1]
+    cola = ColaCorreo(conectar=lambda: smtplib.SMTP("127.0.0.1", puerto), backoff_base=0.05, max_intentos=5)
+    try:
+        cola.enviar("a@test.com", "Asunto", "hola")
+        _esperar(lambda: cola.stats()["enviados"] == 1)
+        assert cola.stats()["reintentos"] == 2
+        assert cola.stats()["fallidos"] == 0
+    finally:
+        cola.detener()
+        servidor.shutdown()
+
+
+def test_descarta_tras_max_intentos():
+    cola = ColaCorreo(conectar=lambda: smtplib.SMTP("127.0.0.1", 1, timeout=1), backoff_base=0.01, max_intentos=3)
+    try:
+        cola.enviar("a@test.com", "Asunto", "hola")
+        _esperar(lambda: cola.stats()["fallidos"] == 1)
+        assert cola.stats()["enviados"] == 0
+        assert cola.stats()["reintentos"] == 2
+    finally:
+        cola.detener()
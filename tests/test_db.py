@@ -0,0 +1,22 @@
+import logging
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.exc import OperationalError
+import db
+
+
+def test_sentencias_fallidas_no_dejan_estado_en_la_conexion(monkeypatch, caplog):
+    engine = create_engine("sqlite://")
+    db.log_sentencias(engine)
+    monkeypatch.setattr(db, "DB_SLOW_QUERY_MS", 0)
+    with caplog.at_level(logging.WARNING, logger="db"), engine.connect() as conn:
+        for _ in range(3):
+            with pytest.raises(OperationalError):
+                conn.exec_driver_sql("SELECT * FROM no_existe")
+        assert conn.exec_driver_sql("SELECT 1").scalar() == 1
+        # Nada acumulado en la conexión del pool por las sentencias que fallaron
+        assert conn.info == {}
+    # Solo la sentencia exitosa se mide y se loguea
+    (registro,) = caplog.records
+    assert registro.getMessage().endswith("SELECT 1")
+    engine.dispose()
@@ -0,0 +1,51 @@
+import os
+import subprocess
+import sys
+import textwrap
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# El modo se decide al importar db.py, por eso se prueba en un proceso aparte
+SCRIPT = textwrap.dedent("""
+    import asyncio, inspect
+    from fastapi.testclient import TestClient
+    import db
+    from main import app, login, listar_tareas_proyecto
+    from utils import get_db
+    from migraciones import migrar
+
+    migrar()
+    assert db.DB_ASYNC and db.async_engine.url.drivername == "sqlite+aiosqlite"
+    assert inspect.iscoroutinefunction(login) and inspect.isasyncgenfunction(get_db)
+    assert inspect.iscoroutinefunction(listar_tareas_proyecto)
+
+    client = TestClient(app)
+    r = client.post("/register", json={"correo": "async@test.com", "nombre": "Async", "contraseña": "1234"})
+    assert r.status_code == 201, r.text
+    r = client.post("/login", json={"correo": "async@test.com", "contraseña": "1234"})
+    assert r.status_code == 200, r.text
+    r = client.post("/login", json={"correo": "async@test.com", "contraseña": "mal"})
+    assert r.status_code == 401, r.text
+
+    r = client.post("/proyectos", json={"nombre": "P"}, headers={"x-user-mail": "async@test.com"})
+    assert r.status_code == 201, r.text
+    pid = r.json()["id_proyecto"]
+    r = client.post(f"/proyectos/{pid}/tareas", json={"titulo": "T"}, headers={"x-user-email": "async@test.com"})
+    assert r.status_code == 201, r.text
+    r = client.get(f"/proyectos/{pid}/tareas", headers={"x-user-mail": "async@test.com"})
+    assert r.status_code == 200 and r.json()[0]["titulo"] == "T", r.text
+    r = client.post(f"/proyectos/{pid}/tareas/importar", content=b'{"titulo": "I1"}\\n{"titulo": "I2"}\\n',
+                    headers={"x-user-mail": "async@test.com", "content-type": "application/x-ndjson"})
+    assert r.status_code == 201 and r.json()["insertadas"] == 2, r.text
+    print("OK")
+""")
+
+def test_modo_async_con_aiosqlite(tmp_path):
+    env = dict(os.environ)
+    env["DB_ASYNC"] = "true"
+    env["SUPABASE_DB_URL"] = f"sqlite:///{tmp_path / 'async.db'}"
+    resultado = subprocess.run(
+        [sys.executable, "-c", SCRIPT], cwd=RAIZ, env=env, capture_output=True, text=True, timeout=120
+    )
+    assert resultado.returncode == 0, resultado.stderr[-2000:]
+    assert resultado.stdout.strip().endswith("OK")
@@ -0,0 +1,144 @@
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from fastapi.testclient import TestClient
+from sqlalchemy import select, update, delete
+from db import SessionLocal
+from models import Tarea, EstadisticaProyecto
+from main import app
+from conftest import registrar
+import estadisticas
+
+client = TestClient(app)
+
+
+def _sin_deriva(pid):
+    db = SessionLocal()
+    try:
+        return estadisticas.verificar(db, proyecto_id=pid) == []
+    finally:
+        db.close()
+
+
+def test_estadisticas_se_mantienen_con_cada_escritura():
+    dueño = registrar("Duenio")
+    editor = registrar("Editor")
+    h_dueño, h_email = {"x-user-mail": dueño}, {"x-user-email": dueño}
+    pid = client.post("/proyectos", json={"nombre": "Stats"}, headers=h_dueño).json()["id_proyecto"]
+    client.post(f"/proyectos/{pid}/integrantes", json={editor: "editor"}, headers=h_dueño)
+
+    vencida = (datetime.now() - timedelta(days=1)).isoformat()
+    ids = [client.post(f"/proyectos/{pid}/tareas", json={"titulo": f"T{i}", "fecha_limite": vencida if i < 2 else None},
+                       headers=h_email).json()["id_tarea"] for i in range(4)]
+    client.post(f"/proyectos/{pid}/tareas/{ids[0]}/responsables", json={"correos": [editor]}, headers=h_dueño)
+    client.post(f"/proyectos/{pid}/tareas/responsables", json={str(ids[1]): [editor, dueño]}, headers=h_dueño)
+    assert _sin_deriva(pid)
+
+    client.put(f"/proyectos/{pid}/tareas/{ids[0]}/estado", json={"estado": "completado"}, headers=h_dueño)
+    client.put(f"/proyectos/{pid}/tareas/estado", json={"estado": "en progreso", "ids": [ids[2], ids[3]]}, headers=h_dueño)
+    client.delete(f"/proyectos/{pid}/tareas/{ids[1]}", headers=h_dueño)
+    client.post(f"/proyectos/{pid}/tareas/importar", content=b'{"titulo": "I1", "estado": "completado"}\n{"titulo": "I2"}\n',
+                headers={**h_dueño, "content-type": "application/x-ndjson"})
+    assert _sin_deriva(pid)
+
+    r = client.get(f"/proyectos/{pid}/estadisticas", headers=h_dueño)
+    assert r.status_code == 200, r.text
+    data = r.json()
+    assert data["tareas_por_estado"] == {"sin asignar": 0, "pendiente": 1, "en progreso": 2, "completado": 2}
+    assert data["total_tareas"] == 5
+    assert data["vencidas"] == 0
+    (responsable,) = data["responsables"]
+    assert responsable["nombre"] == "Editor"
+    assert (responsable["asignadas"], responsable["abiertas"]) == (1, 0)
+
+
+def test_verificar_detecta_y_repara_deriva():
+    dueño = registrar("Duenio")
+    pid = client.post("/proyectos", json={"nombre": "Deriva"}, headers={"x-user-mail": dueño}).json()["id_proyecto"]
+    tid = client.post(f"/proyectos/{pid}/tareas", json={"titulo": "T"}, headers={"x-user-email": dueño}).json()["id_tarea"]
+
+    db = SessionLocal()
+    try:
+        # Escritura por fuera de los endpoints: el resumen queda desfasado
+        db.execute(update(Tarea).where(Tarea.id == tid).values(fecha_limite=datetime.now() - timedelta(hours=1)))
+        db.execute(update(EstadisticaProyecto).where(EstadisticaProyecto.id_proyecto == pid).values(pendiente=7))
+        db.commit()
+        assert estadisticas.verificar(db, proyecto_id=pid) == [pid]
+        assert estadisticas.verificar(db, reparar=True, proyecto_id=pid) == [pid]
+        assert estadisticas.verificar(db, proyecto_id=pid) == []
+    finally:
+        db.close()
+
+    data = client.get(f"/proyectos/{pid}/estadisticas", headers={"x-user-mail": dueño}).json()
+    assert data["tareas_por_estado"]["pendiente"] == 1
+    assert data["vencidas"] == 1
+
+
+def test_cambios_simultaneos_de_estado_no_generan_deriva():
+    dueño = registrar("Duenio")
+    h_dueño = {"x-user-mail": dueño}
+    pid = client.post("/proyectos", json={"nombre": "Carrera"}, headers=h_dueño).json()["id_proyecto"]
+    ids = [client.post(f"/proyectos/{pid}/tareas", json={"titulo": f"T{i}"}, headers={"x-user-email": dueño}).json()["id_tarea"]
+           for i in range(2)]
+    client.post(f"/proyectos/{pid}/tareas/{ids[0]}/responsables", json={"correos": [dueño]}, headers=h_dueño)
+
+    # Varios requests a la vez sobre la misma tarea, todos desde el mismo estado anterior
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        estados = list(pool.map(
+            lambda _: client.put(f"/proyectos/{pid}/tareas/{ids[0]}/estado", json={"estado": "completado"},
+                                 headers=h_dueño).status_code,
+            range(8),
+        ))
+        bajas = list(pool.map(lambda _: client.delete(f"/proyectos/{pid}/tareas/{ids[1]}", headers=h_dueño).status_code,
+                              range(4)))
+    assert set(estados) == {200}
+    assert sorted(bajas) == [200, 404, 404, 404]
+    assert _sin_deriva(pid)
+    data = client.get(f"/proyectos/{pid}/estadisticas", headers=h_dueño).json()
+    assert data["tareas_por_estado"]["completado"] == 1 and data["total_tareas"] == 1
+
+
+def test_resumen_sin_fila_no_escribe():
+    dueño = registrar("Duenio")
+    pid = client.post("/proyectos", json={"nombre": "Sin fila"}, headers={"x-user-mail": dueño}).json()["id_proyecto"]
+    client.post(f"/proyectos/{pid}/tareas", json={"titulo": "T"}, headers={"x-user-email": dueño})
+
+    db = SessionLocal()
+    try:
+        db.execute(delete(EstadisticaProyecto).where(EstadisticaProyecto.id_proyecto == pid))
+        db.commit()
+        r = client.get(f"/proyectos/{pid}/estadisticas", headers={"x-user-mail": dueño})
+        assert r.status_code == 200
+        assert r.json()["total_tareas"] == 1
+        assert db.execute(select(EstadisticaProyecto).where(EstadisticaProyecto.id_proyecto == pid)).first() is None
+    finally:
+        db.close()
+
+    # La próxima escritura arma la fila desde las tablas base
+    client.post(f"/proyectos/{pid}/tareas", json={"titulo": "T2"}, headers={"x-user-email": dueño})
+    assert _sin_deriva(pid)
+
+
+def test_operaciones_masivas_simultaneas_no_generan_deriva():
+    dueño = registrar("Duenio")
+    editores = [registrar(f"Editor{i}") for i in range(3)]
+    h_dueño = {"x-user-mail": dueño}
+    pid = client.post("/proyectos", json={"nombre": "Masivo"}, headers=h_dueño).json()["id_proyecto"]
+    client.post(f"/proyectos/{pid}/integrantes", json={e: "editor" for e in editores}, headers=h_dueño)
+    ids = [client.post(f"/proyectos/{pid}/tareas", json={"titulo": f"T{i}"}, headers={"x-user-email": dueño}).json()["id_tarea"]
+           for i in range(12)]
+
+    # Cambios de estado masivos que se pisan entre sí y asignaciones masivas sobre las mismas tareas
+    pedidos = [
+        ("put", "/tareas/estado", {"estado": estado, "ids": ids[i % 3:]})
+        for i, estado in enumerate(["completado", "en progreso", "completado", "pendiente", "completado", "sin asignar"])
+    ] + [
+        ("post", "/tareas/responsables", {str(id_tarea): [editor] for id_tarea in ids[i::2]})
+        for i, editor in enumerate(editores)
+    ]
+    with ThreadPoolExecutor(max_workers=len(pedidos)) as pool:
+        estados = list(pool.map(
+            lambda p: getattr(client, p[0])(f"/proyectos/{pid}{p[1]}", json=p[2], headers=h_dueño).status_code,
+            pedidos,
+        ))
+    assert all(codigo in (200, 201) for codigo in estados), estados
+    assert _sin_deriva(pid)
@@ -0,0 +1,102 @@
+import asyncio
+import json
+import threading
+import time
+from fastapi.testclient import TestClient
+from sqlalchemy import text
+from db import SessionLocal
+from eventos import Broker, broker, encolar_evento
+from main import app
+from conftest import registrar
+
+client = TestClient(app)
+
+
+def _esperar(condicion, timeout=5):
+    limite = time.monotonic() + timeout
+    while not condicion():
+        assert time.monotonic() < limite, "timeout"
+        time.sleep(0.01)
+
+
+def test_buffer_acotado_por_suscriptor():
+    b = Broker(tamaño_buffer=3)
+
+    async def escenario():
+        lento = b.suscribir(1)
+        otro_proyecto = b.suscribir(2)
+        for i in range(10):
+            b.publicar(1, {"tipo": "tarea.alta", "ids": [i]})
+        await asyncio.sleep(0)
+        # El cliente lento no acumula más que el buffer y recibe una marca para resincronizar
+        assert lento.cola.qsize() <= 3
+        eventos = [lento.cola.get_nowait() for _ in range(lento.cola.qsize())]
+        assert {"tipo": "resincronizar"} in eventos
+        assert eventos[-1] == {"tipo": "tarea.alta", "ids": [9]}
+        assert otro_proyecto.cola.empty()
+        b.cancelar(lento)
+        b.cancelar(otro_proyecto)
+        assert b.stats()["suscriptores"] == 0
+
+    asyncio.run(escenario())
+
+def test_buffer_de_un_evento_conserva_marca_y_evento():
+    b = Broker(tamaño_buffer=1)
+
+    async def escenario():
+        sub = b.suscribir(1)
+        for i in range(3):
+            b.publicar(1, {"tipo": "tarea.alta", "ids": [i]})
+        await asyncio.sleep(0)
+        eventos = [sub.cola.get_nowait() for _ in range(sub.cola.qsize())]
+        assert eventos == [{"tipo": "resincronizar"}, {"tipo": "tarea.alta", "ids": [2]}]
+        b.cancelar(sub)
+
+    asyncio.run(escenario())
+
+
+def test_se_publica_solo_al_confirmar(monkeypatch):
+    publicados = []
+    monkeypatch.setattr(broker, "publicar", lambda pid, evento: publicados.append((pid, evento)))
+    db = SessionLocal()
+    try:
+        db.execute(text("SELECT 1"))
+        encolar_evento(db, 1, {"tipo": "a"})
+        db.rollback()
+        db.commit()
+        assert publicados == []
+        db.execute(text("SELECT 1"))
+        encolar_evento(db, 1, {"tipo": "b"})
+        db.commit()
+        assert publicados == [(1, {"tipo": "b"})]
+    finally:
+        db.close()
+
+
+def test_stream_sse_del_proyecto():
+    dueño = registrar("Duenio")
+    ajeno = registrar("Ajeno")
+    pid = client.post("/proyectos", json={"nombre": "Vivo"}, headers={"x-user-mail": dueño}).json()["id_proyecto"]
+    assert client.get(f"/proyectos/{pid}/eventos", headers={"x-user-mail": ajeno}).status_code == 403
+
+    respuesta = {}
+    def escuchar():
+        respuesta["r"] = client.get(f"/proyectos/{pid}/eventos", headers={"x-user-mail": dueño})
+    hilo = threading.Thread(target=escuchar)
+    hilo.start()
+    _esperar(lambda: broker.stats()["suscriptores"] >= 1)
+
+    tid = client.post(f"/proyectos/{pid}/tareas", json={"titulo": "T"}, headers={"x-user-email": dueño}).json()["id_tarea"]
+    client.put(f"/proyectos/{pid}/tareas/{tid}/estado", json={"estado": "completado"}, headers={"x-user-mail": dueño})
+    # La eliminación del proyecto cierra el stream
+    client.delete(f"/proyectos/{pid}", headers={"x-user-mail": dueño})
+    hilo.join(10)
+    assert not hilo.is_alive()
+
+    r = respuesta["r"]
+    assert r.headers["content-type"].startswith("text/event-stream")
+    bloques = [b for b in r.text.split("\n\n") if "data: " in b]
+    eventos = [json.loads(b.split("data: ", 1)[1]) for b in bloques]
+    assert [e["tipo"] for e in eventos] == ["tarea.alta", "tarea.modificacion", "proyecto.baja"]
+    assert eventos[0]["ids"] == [tid]
+    assert bloques[0].startswith("id: ")
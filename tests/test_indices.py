@@ -0,0 +1,101 @@
+from datetime import datetime
+from sqlalchemy import create_engine, select, insert, func, text, inspect
+from models import Usuario, Proyecto, Tarea, TareaResponsable, ProyectoIntegrante, RolProyecto, EstadoTarea, Cambio
+from migraciones import migrar, schema_version, metadata_versiones, metadata_v1, v1_esquema_inicial
+from db import Base
+
+
+def _plan(conn, consulta) -> str:
+    sql = str(consulta.compile(conn, compile_kwargs={"literal_binds": True}))
+    return " | ".join(fila[-1] for fila in conn.execute(text("EXPLAIN QUERY PLAN " + sql)))
+
+
+def test_consultas_frecuentes_usan_indices(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'indices.db'}")
+    assert migrar(engine) == [1, 2, 3, 4, 5, 6, 7, 8]
+
+    with engine.connect() as conn:
+        plan = _plan(conn, select(ProyectoIntegrante).where(
+            ProyectoIntegrante.id_proyecto == 1, ProyectoIntegrante.id_usuario == 2))
+        assert "ux_proyecto_integrante" in plan
+
+        plan = _plan(conn, select(TareaResponsable).where(
+            TareaResponsable.id_tarea == 1, TareaResponsable.id_usuario == 2))
+        assert "ux_tarea_responsable" in plan
+
+        plan = _plan(conn, select(Tarea).where(Tarea.id_proyecto == 1, Tarea.estado == EstadoTarea.pendiente))
+        assert "ix_tareas_proyecto_estado" in plan
+
+        plan = _plan(conn, select(Tarea).where(
+            Tarea.id_proyecto == 1, Tarea.fecha_limite >= datetime(2025, 1, 1), Tarea.fecha_limite < datetime(2025, 2, 1)))
+        assert "ix_tareas_proyecto_fecha_limite" in plan
+
+        plan = _plan(conn, select(Tarea).where(Tarea.id_proyecto == 1).order_by(Tarea.fecha_creacion, Tarea.id).limit(100))
+        assert "ix_tareas_proyecto_creacion" in plan
+        assert "TEMP B-TREE" not in plan
+
+        plan = _plan(conn, select(Usuario).where(func.lower(Usuario.correo) == "a@test.com"))
+        assert "ix_usuarios_correo_lower" in plan
+
+        plan = _plan(conn, select(Cambio).where(Cambio.id_proyecto == 1, Cambio.id > 10).order_by(Cambio.id).limit(100))
+        assert "ix_cambios_proyecto_id" in plan
+        assert "TEMP B-TREE" not in plan
+
+        plan = _plan(conn, select(Tarea.id).where(
+            Tarea.fecha_limite >= datetime(2025, 1, 1), Tarea.fecha_limite <= datetime(2025, 1, 2)
+        ).order_by(Tarea.fecha_limite, Tarea.id).limit(500))
+        assert "ix_tareas_fecha_limite" in plan
+        assert "TEMP B-TREE" not in plan
+
+
+def test_migracion_sobre_base_existente(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'existente.db'}")
+    # Base creada antes de los índices, con filas duplicadas
+    metadata_v1.create_all(bind=engine)
+    metadata_versiones.create_all(bind=engine)
+    with engine.begin() as conn:
+        conn.execute(insert(schema_version).values(version=1, descripcion="Esquema inicial", aplicada=datetime.now()))
+        conn.execute(insert(Usuario).values(id=1, correo="a@test.com", nombre="A", contrasena="x"))
+        conn.execute(text('INSERT INTO proyectos (id, nombre, "id_dueño") VALUES (1, \'P\', 1)'))
+        conn.execute(insert(Tarea).values(id=1, id_proyecto=1, titulo="T"))
+        for _ in range(3):
+            conn.execute(insert(ProyectoIntegrante).values(id_proyecto=1, id_usuario=1, rol=RolProyecto.dueño))
+            conn.execute(insert(TareaResponsable).values(id_tarea=1, id_usuario=1))
+
+    assert migrar(engine) == [2, 3, 4, 5, 6, 7, 8]
+    assert migrar(engine) == []
+
+    with engine.connect() as conn:
+        assert conn.execute(select(func.count()).select_from(ProyectoIntegrante)).scalar() == 1
+        assert conn.execute(select(func.count()).select_from(TareaResponsable)).scalar() == 1
+    nombres = {i["name"] for i in inspect(engine).get_indexes("ProyectoIntegrantes")}
+    assert "ux_proyecto_integrante" in nombres
+    with engine.connect() as conn:
+        assert conn.execute(select(Proyecto.version).where(Proyecto.id == 1)).scalar() == 0
+
+
+def test_v1_es_el_esquema_inicial(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'v1.db'}")
+    with engine.begin() as conn:
+        v1_esquema_inicial(conn)
+    inspector = inspect(engine)
+    assert set(inspector.get_table_names()) == {
+        "usuarios", "recuperarcontrasenatokens", "proyectos", "tareas", "TareaResponsables", "ProyectoIntegrantes"
+    }
+    # Lo que agregan las versiones siguientes no está en v1
+    assert "version" not in {c["name"] for c in inspector.get_columns("proyectos")}
+    assert not any(i["name"].startswith("ux_") for t in inspector.get_table_names() for i in inspector.get_indexes(t))
+
+
+def test_migraciones_llegan_a_los_modelos(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'completo.db'}")
+    migrar(engine)
+    inspector = inspect(engine)
+    for tabla in Base.metadata.sorted_tables:
+        assert {c["name"] for c in inspector.get_columns(tabla.name)} == {c.name for c in tabla.columns}, tabla.name
+        with engine.connect() as conn:
+            indices = {fila[0] for fila in conn.execute(
+                text("SELECT name FROM sqlite_master WHERE type = 'index' AND tbl_name = :t AND sql IS NOT NULL"),
+                {"t": tabla.name},
+            )}
+        assert {i.name for i in tabla.indexes} <= indices, tabla.name
@@ -1,5 +1,11 @@
+import csv
+import io
+import json
+from datetime import datetime
 from fastapi.testclient import TestClient
 from main import app
+from conftest import registrar
+from paginacion import codificar_cursor
 
 client = TestClient(app)
 
@@ -45,4 +51,354 @@ def test_login_wrong_password():
         "/login",
         json={"correo": "test@test.com", "contraseña": "wrongpass"}
     )
-    assert response.status_code == 401
\ No newline at end of file
+    assert response.status_code == 401
+
+def test_estado_pool_db():
+    antes = client.get("/internal/db-pool").json()["sync"]
+    # Un request que consulta la base toma una conexión del pool y la devuelve al terminar
+    client.post("/login", json={"correo": "test@test.com", "contraseña": "wrongpass"})
+    response = client.get("/internal/db-pool")
+    assert response.status_code == 200
+    data = response.json()["sync"]
+    assert data["checkouts"] > antes["checkouts"]
+    assert data["en_uso"] == antes["en_uso"] == 0
+    assert 1 <= data["conexiones_creadas"] <= data["tamaño"] + data["max_overflow"]
+    assert data["inactivas"] >= 1
+
+def test_permisos_integrante_se_invalidan_al_eliminar():
+    dueño = registrar("Duenio")
+    lector = registrar("Lector")
+    pid = client.post("/proyectos", json={"nombre": "Permisos"}, headers={"x-user-mail": dueño}).json()["id_proyecto"]
+
+    assert client.get(f"/proyectos/{pid}/tareas", headers={"x-user-mail": lector}).status_code == 403
+    r = client.post(f"/proyectos/{pid}/integrantes", json={lector: "lector"}, headers={"x-user-mail": dueño})
+    assert r.status_code == 201
+    assert client.get(f"/proyectos/{pid}/tareas", headers={"x-user-mail": lector}).status_code == 200
+    # un lector no puede crear tareas
+    r = client.post(f"/proyectos/{pid}/tareas", json={"titulo": "T"}, headers={"x-user-email": lector})
+    assert r.status_code == 403
+
+    r = client.request("DELETE", f"/proyectos/{pid}/integrantes", json={"correo": lector}, headers={"x-user-mail": dueño})
+    assert r.status_code == 200
+    assert client.get(f"/proyectos/{pid}/tareas", headers={"x-user-mail": lector}).status_code == 403
+
+def test_proyecto_inexistente():
+    dueño = registrar("Duenio")
+    r = client.get("/proyectos/999999999/tareas", headers={"x-user-mail": dueño})
+    assert r.status_code == 404
+    assert r.json()["error"] == "Proyecto no encontrado"
+
+def test_listar_tareas_paginado_y_filtrado():
+    dueño = registrar("Duenio")
+    editor = registrar("Editor")
+    pid = client.post("/proyectos", json={"nombre": "Paginado"}, headers={"x-user-mail": dueño}).json()["id_proyecto"]
+    client.post(f"/proyectos/{pid}/integrantes", json={editor: "editor"}, headers={"x-user-mail": dueño})
+    ids = []
+    for i in range(5):
+        r = client.post(f"/proyectos/{pid}/tareas", json={"titulo": f"T{i}"}, headers={"x-user-email": dueño})
+        ids.append(r.json()["id_tarea"])
+    client.post(f"/proyectos/{pid}/tareas/{ids[1]}/responsables", json={"correos": [editor]}, headers={"x-user-mail": dueño})
+    client.put(f"/proyectos/{pid}/tareas/{ids[2]}/estado", json={"estado": "completado"}, headers={"x-user-mail": dueño})
+
+    vistos = []
+    cursor = None
+    while True:
+        params = {"limite": 2}
+        if cursor:
+            params["cursor"] = cursor
+        r = client.get(f"/proyectos/{pid}/tareas", params=params, headers={"x-user-mail": dueño})
+        assert r.status_code == 200
+        assert len(r.json()) <= 2
+        vistos += [t["id"] for t in r.json()]
+        cursor = r.headers.get("x-next-cursor")
+        if not cursor:
+            break
+    assert vistos == ids
+
+    r = client.get(f"/proyectos/{pid}/tareas", params={"estado": "completado"}, headers={"x-user-mail": dueño})
+    assert [t["id"] for t in r.json()] == [ids[2]]
+
+    id_editor = next(t for t in client.get(f"/proyectos/{pid}/tareas", headers={"x-user-mail": dueño}).json() if t["id"] == ids[1])["responsables"][0]["id"]
+    r = client.get(f"/proyectos/{pid}/tareas", params={"responsable": id_editor}, headers={"x-user-mail": dueño})
+    assert [t["id"] for t in r.json()] == [ids[1]]
+    assert r.json()[0]["responsables"][0]["nombre"] == "Editor"
+
+    r = client.get(f"/proyectos/{pid}/tareas", params={"cursor": "basura"}, headers={"x-user-mail": dueño})
+    assert r.status_code == 400
+    # Cursores bien codificados pero con valores de otro tipo
+    for forjado in (codificar_cursor("x", 1), codificar_cursor(datetime.now(), "1"), codificar_cursor(datetime.now(), True)):
+        r = client.get(f"/proyectos/{pid}/tareas", params={"cursor": forjado}, headers={"x-user-mail": dueño})
+        assert r.status_code == 400
+
+def test_agregar_integrantes_masivo():
+    dueño = registrar("Duenio")
+    nuevos = [registrar(f"Integrante{i}") for i in range(10)]
+    pid = client.post("/proyectos", json={"nombre": "Masivo"}, headers={"x-user-mail": dueño}).json()["id_proyecto"]
+
+    r = client.post(f"/proyectos/{pid}/integrantes", json={c.upper(): "lector" for c in nuevos}, headers={"x-user-mail": dueño})
+    assert r.status_code == 201
+    assert len(r.json()["integrantes"]) == 10
+    assert r.json()["conflictos"] == []
+
+    r = client.post(
+        f"/proyectos/{pid}/integrantes",
+        json={nuevos[0]: "editor", "noexiste@test.com": "lector"},
+        headers={"x-user-mail": dueño}
+    )
+    assert r.status_code == 400
+    data = r.json()
+    assert data["ya_integrantes"] == [nuevos[0]]
+    assert data["usuarios_no_existentes"] == ["noexiste@test.com"]
+    assert data["roles_invalidos"] == []
+
+    r = client.get(f"/proyectos/{pid}/integrantes", headers={"x-user-mail": dueño})
+    assert len(r.json()) == 11
+
+def test_agregar_responsables_masivo():
+    dueño = registrar("Duenio")
+    editor = registrar("Editor")
+    ajeno = registrar("Ajeno")
+    pid = client.post("/proyectos", json={"nombre": "Responsables"}, headers={"x-user-mail": dueño}).json()["id_proyecto"]
+    client.post(f"/proyectos/{pid}/integrantes", json={editor: "editor"}, headers={"x-user-mail": dueño})
+    t1, t2 = [client.post(f"/proyectos/{pid}/tareas", json={"titulo": t}, headers={"x-user-email": dueño}).json()["id_tarea"] for t in ("A", "B")]
+
+    r = client.post(
+        f"/proyectos/{pid}/tareas/responsables",
+        json={str(t1): [dueño, editor], str(t2): [ajeno], "999999999": [editor]},
+        headers={"x-user-mail": editor}
+    )
+    assert r.status_code == 400
+    data = r.json()
+    assert data["tareas_no_encontradas"] == [999999999]
+    assert data["tareas"][str(t2)]["usuarios_no_existentes_en_proyecto"] == [ajeno]
+
+    r = client.post(
+        f"/proyectos/{pid}/tareas/responsables",
+        json={str(t1): [dueño, editor], str(t2): [editor]},
+        headers={"x-user-mail": editor}
+    )
+    assert r.status_code == 201
+    assert len(r.json()["tareas"][str(t1)]["agregados"]) == 2
+    assert r.json()["tareas"][str(t2)]["conflictos"] == []
+
+    tareas = {t["id"]: t for t in client.get(f"/proyectos/{pid}/tareas", headers={"x-user-mail": dueño}).json()}
+    assert len(tareas[t1]["responsables"]) == 2
+    assert [x["nombre"] for x in tareas[t2]["responsables"]] == ["Editor"]
+
+    r = client.post(f"/proyectos/{pid}/tareas/responsables", json={str(t2): [editor]}, headers={"x-user-mail": editor})
+    assert r.status_code == 400
+    assert r.json()["tareas"][str(t2)]["ya_responsables"] == [editor]
+
+def test_importar_tareas_ndjson_y_csv():
+    dueño = registrar("Duenio")
+    pid = client.post("/proyectos", json={"nombre": "Import"}, headers={"x-user-mail": dueño}).json()["id_proyecto"]
+
+    filas = [json.dumps({"titulo": f"T{i}", "fecha_limite": "2030-01-01T00:00:00"}) for i in range(1200)]
+    filas.insert(10, json.dumps({"descripcion": "sin titulo"}))
+    filas.insert(20, "{no es json")
+    filas.append(json.dumps({"titulo": "Hecha", "estado": "completado"}))
+    r = client.post(
+        f"/proyectos/{pid}/tareas/importar",
+        content="\n".join(filas).encode(),
+        headers={"x-user-mail": dueño, "content-type": "application/x-ndjson"}
+    )
+    assert r.status_code == 201, r.text
+    data = r.json()
+    assert data["insertadas"] == 1201
+    assert data["filas_con_error"] == 2
+    assert [e["fila"] for e in data["errores"]] == [11, 21]
+    assert data["errores"][0]["errores"][0]["campo"] == "titulo"
+
+    r = client.get(f"/proyectos/{pid}/tareas", params={"estado": "completado"}, headers={"x-user-mail": dueño})
+    assert [t["titulo"] for t in r.json()] == ["Hecha"]
+
+    csv_body = 'titulo,descripcion,fecha_limite,estado\r\nCSV 1,"linea 1\r\nlinea 2",,en progreso\r\n,vacia,,\r\nCSV 2,,2030-05-01,\r\n'
+    r = client.post(
+        f"/proyectos/{pid}/tareas/importar",
+        content=csv_body.encode(),
+        headers={"x-user-mail": dueño, "content-type": "text/csv"}
+    )
+    assert r.status_code == 201, r.text
+    assert r.json()["insertadas"] == 2
+    assert r.json()["errores"][0]["fila"] == 2
+    r = client.get(f"/proyectos/{pid}/tareas", params={"estado": "en progreso"}, headers={"x-user-mail": dueño})
+    assert r.json()[0]["descripcion"] == "linea 1\nlinea 2"
+
+def test_exportar_tareas():
+    dueño = registrar("Duenio")
+    pid = client.post("/proyectos", json={"nombre": "Export"}, headers={"x-user-mail": dueño}).json()["id_proyecto"]
+    cuerpo = "\n".join(json.dumps({"titulo": f"T{i}", "descripcion": "a, \"b\""}) for i in range(450))
+    client.post(f"/proyectos/{pid}/tareas/importar", content=cuerpo.encode(),
+                headers={"x-user-mail": dueño, "content-type": "application/x-ndjson"})
+    primera = client.get(f"/proyectos/{pid}/tareas", params={"limite": 1}, headers={"x-user-mail": dueño}).json()[0]["id"]
+    client.post(f"/proyectos/{pid}/tareas/{primera}/responsables", json={"correos": [dueño]}, headers={"x-user-mail": dueño})
+
+    with client.stream("GET", f"/proyectos/{pid}/tareas/exportar", headers={"x-user-mail": dueño}) as r:
+        assert r.status_code == 200
+        assert r.headers["content-type"] == "application/x-ndjson"
+        tareas = [json.loads(l) for l in r.iter_lines() if l]
+    assert len(tareas) == 450
+    assert tareas[0]["id"] == primera
+    assert tareas[0]["responsables"][0]["nombre"] == "Duenio"
+    assert tareas[1]["responsables"] == []
+
+    r = client.get(f"/proyectos/{pid}/tareas/exportar", params={"formato": "csv"}, headers={"x-user-mail": dueño})
+    filas = list(csv.DictReader(io.StringIO(r.text)))
+    assert len(filas) == 450
+    assert filas[0]["descripcion"] == 'a, "b"'
+
+    ajeno = registrar("Ajeno")
+    assert client.get(f"/proyectos/{pid}/tareas/exportar", headers={"x-user-mail": ajeno}).status_code == 403
+
+def test_cambiar_estado_masivo():
+    dueño = registrar("Duenio")
+    editor = registrar("Editor")
+    pid = client.post("/proyectos", json={"nombre": "Estados"}, headers={"x-user-mail": dueño}).json()["id_proyecto"]
+    client.post(f"/proyectos/{pid}/integrantes", json={editor: "editor"}, headers={"x-user-mail": dueño})
+    ids = [client.post(f"/proyectos/{pid}/tareas", json={"titulo": f"T{i}"}, headers={"x-user-email": dueño}).json()["id_tarea"] for i in range(4)]
+    client.post(f"/proyectos/{pid}/tareas/responsables", json={str(ids[0]): [editor], str(ids[1]): [editor]}, headers={"x-user-mail": dueño})
+
+    r = client.put(f"/proyectos/{pid}/tareas/estado", json={"estado": "en progreso", "ids": ids[:3] + [999999999]}, headers={"x-user-mail": editor})
+    assert r.status_code == 200
+    assert r.json()["actualizadas"] == ids[:3]
+    assert r.json()["no_encontradas"] == [999999999]
+
+    id_editor = next(t for t in client.get(f"/proyectos/{pid}/tareas", headers={"x-user-mail": dueño}).json() if t["id"] == ids[0])["responsables"][0]["id"]
+    r = client.put(
+        f"/proyectos/{pid}/tareas/estado",
+        json={"estado": "completado", "filtro": {"estado": "en progreso", "responsable": id_editor}},
+        headers={"x-user-mail": editor}
+    )
+    assert r.json()["actualizadas"] == ids[:2]
+
+    estados = {t["id"]: t["estado"] for t in client.get(f"/proyectos/{pid}/tareas", headers={"x-user-mail": dueño}).json()}
+    assert [estados[i] for i in ids] == ["completado", "completado", "en progreso", "pendiente"]
+
+    assert client.put(f"/proyectos/{pid}/tareas/estado", json={"estado": "completado"}, headers={"x-user-mail": editor}).status_code == 400
+    # Un filtro vacío no es un criterio: no debe actualizar todo el proyecto
+    for filtro in ({}, {"estado": None}, {"estado": None, "responsable": None}):
+        r = client.put(f"/proyectos/{pid}/tareas/estado", json={"estado": "sin asignar", "filtro": filtro}, headers={"x-user-mail": editor})
+        assert r.status_code == 400
+    estados = {t["id"]: t["estado"] for t in client.get(f"/proyectos/{pid}/tareas", headers={"x-user-mail": dueño}).json()}
+    assert [estados[i] for i in ids] == ["completado", "completado", "en progreso", "pendiente"]
+    # responsable 0 es un criterio concreto (no coincide con nadie), no se ignora
+    r = client.put(f"/proyectos/{pid}/tareas/estado", json={"estado": "sin asignar", "filtro": {"responsable": 0}}, headers={"x-user-mail": editor})
+    assert r.status_code == 200 and r.json()["actualizadas"] == []
+
+def test_etag_y_304_en_listados():
+    dueño = registrar("Duenio")
+    otro = registrar("Otro")
+    pid = client.post("/proyectos", json={"nombre": "ETag"}, headers={"x-user-mail": dueño}).json()["id_proyecto"]
+    client.post(f"/proyectos/{pid}/tareas", json={"titulo": "T1"}, headers={"x-user-email": dueño})
+
+    r = client.get(f"/proyectos/{pid}/tareas", headers={"x-user-mail": dueño})
+    etag = r.headers["etag"]
+    r = client.get(f"/proyectos/{pid}/tareas", headers={"x-user-mail": dueño, "if-none-match": etag})
+    assert r.status_code == 304 and r.content == b""
+    # Otros filtros son otra representación
+    r = client.get(f"/proyectos/{pid}/tareas", params={"limite": 1}, headers={"x-user-mail": dueño, "if-none-match": etag})
+    assert r.status_code == 200
+
+    # Cualquier cambio en tareas invalida la etiqueta
+    tid = client.post(f"/proyectos/{pid}/tareas", json={"titulo": "T2"}, headers={"x-user-email": dueño}).json()["id_tarea"]
+    r = client.get(f"/proyectos/{pid}/tareas", headers={"x-user-mail": dueño, "if-none-match": etag})
+    assert r.status_code == 200 and len(r.json()) == 2
+    etag = r.headers["etag"]
+    client.put(f"/proyectos/{pid}/tareas/{tid}/estado", json={"estado": "completado"}, headers={"x-user-mail": dueño})
+    assert client.get(f"/proyectos/{pid}/tareas", headers={"x-user-mail": dueño, "if-none-match": etag}).status_code == 200
+
+    r = client.get(f"/proyectos/{pid}/integrantes", headers={"x-user-mail": dueño})
+    etag = r.headers["etag"]
+    assert client.get(f"/proyectos/{pid}/integrantes", headers={"x-user-mail": dueño, "if-none-match": etag}).status_code == 304
+    client.post(f"/proyectos/{pid}/integrantes", json={otro: "lector"}, headers={"x-user-mail": dueño})
+    r = client.get(f"/proyectos/{pid}/integrantes", headers={"x-user-mail": dueño, "if-none-match": etag})
+    assert r.status_code == 200 and r.headers["etag"] != etag
+
+def test_cambios_incrementales():
+    dueño = registrar("Duenio")
+    otro = registrar("Otro")
+    pid = client.post("/proyectos", json={"nombre": "Delta"}, headers={"x-user-mail": dueño}).json()["id_proyecto"]
+    t1 = client.post(f"/proyectos/{pid}/tareas", json={"titulo": "T1"}, headers={"x-user-email": dueño}).json()["id_tarea"]
+
+    # Punto de partida: nada que sincronizar todavía
+    r = client.get(f"/proyectos/{pid}/cambios", headers={"x-user-mail": dueño})
+    cursor = r.json()["cursor"]
+    r = client.get(f"/proyectos/{pid}/cambios", params={"since": cursor}, headers={"x-user-mail": dueño})
+    assert r.json()["tareas"] == [] and r.json()["cursor"] == cursor
+
+    t2 = client.post(f"/proyectos/{pid}/tareas", json={"titulo": "T2"}, headers={"x-user-email": dueño}).json()["id_tarea"]
+    client.post(f"/proyectos/{pid}/integrantes", json={otro: "editor"}, headers={"x-user-mail": dueño})
+    client.post(f"/proyectos/{pid}/tareas/{t2}/responsables", json={"correos": [otro]}, headers={"x-user-mail": dueño})
+    client.put(f"/proyectos/{pid}/tareas/{t2}/estado", json={"estado": "completado"}, headers={"x-user-mail": dueño})
+    client.delete(f"/proyectos/{pid}/tareas/{t1}", headers={"x-user-mail": dueño})
+
+    r = client.get(f"/proyectos/{pid}/cambios", params={"since": cursor}, headers={"x-user-mail": dueño})
+    assert r.status_code == 200, r.text
+    data = r.json()
+    assert [t["id"] for t in data["tareas"]] == [t2]
+    assert data["tareas"][0]["estado"] == "completado"
+    assert [x["nombre"] for x in data["tareas"][0]["responsables"]] == ["Otro"]
+    assert data["tareas_eliminadas"] == [t1]
+    assert [i["correo"] for i in data["integrantes"]] == [otro]
+
+    # Baja de integrante como tombstone, paginando de a un cambio
+    client.request("DELETE", f"/proyectos/{pid}/integrantes", json={"correo": otro}, headers={"x-user-mail": dueño})
+    r = client.get(f"/proyectos/{pid}/cambios", params={"since": data["cursor"], "limite": 1}, headers={"x-user-mail": dueño})
+    assert r.json()["integrantes_eliminados"] == [data["integrantes"][0]["id_usuario"]]
+    assert r.json()["hay_mas"] is False
+
+    assert client.get(f"/proyectos/{pid}/cambios", params={"since": "x"}, headers={"x-user-mail": dueño}).status_code == 400
+
+def test_listar_proyectos_con_resumen_y_paginado():
+    from sqlalchemy import update
+    from db import SessionLocal
+    from models import Proyecto
+
+    dueño = registrar("Duenio")
+    lector = registrar("Lector")
+    pids = []
+    for i in range(3):
+        pid = client.post("/proyectos", json={"nombre": f"P{i}"}, headers={"x-user-mail": dueño}).json()["id_proyecto"]
+        pids.append(pid)
+    client.post(f"/proyectos/{pids[1]}/integrantes", json={lector: "lector"}, headers={"x-user-mail": dueño})
+    for titulo in ["A", "B"]:
+        client.post(f"/proyectos/{pids[1]}/tareas", json={"titulo": titulo}, headers={"x-user-email": dueño})
+    tid = client.get(f"/proyectos/{pids[1]}/tareas", headers={"x-user-mail": dueño}).json()[0]["id"]
+    client.put(f"/proyectos/{pids[1]}/tareas/{tid}/estado", json={"estado": "completado"}, headers={"x-user-mail": dueño})
+
+    db = SessionLocal()
+    db.execute(update(Proyecto).where(Proyecto.id == pids[0]).values(fecha_limite=datetime(2030, 1, 1)))
+    db.execute(update(Proyecto).where(Proyecto.id == pids[2]).values(fecha_limite=datetime(2029, 1, 1)))
+    db.commit()
+    db.close()
+
+    r = client.get("/proyectos", headers={"x-user-mail": lector})
+    assert r.status_code == 200
+    (proyecto,) = r.json()
+    assert proyecto["rol_usuario"] == "lector"
+    assert proyecto["total_tareas"] == 2
+    assert proyecto["tareas_por_estado"]["completado"] == 1
+    assert proyecto["tareas_por_estado"]["sin asignar"] + proyecto["tareas_por_estado"]["pendiente"] == 1
+
+    # Orden por fecha límite, sin fecha al final, de a un proyecto por página
+    vistos, cursor = [], None
+    while True:
+        params = {"orden": "fecha_limite", "limite": 1}
+        if cursor:
+            params["cursor"] = cursor
+        r = client.get("/proyectos", params=params, headers={"x-user-mail": dueño})
+        vistos += [p["id"] for p in r.json()]
+        cursor = r.headers.get("x-next-cursor")
+        if not cursor:
+            break
+    assert vistos == [pids[2], pids[0], pids[1]]
+
+    # El cursor de cada orden solo acepta sus propios tipos
+    for orden, forjado in (("id", codificar_cursor("1")), ("id", codificar_cursor(datetime.now())),
+                           ("fecha_limite", codificar_cursor(1, 1)), ("fecha_limite", codificar_cursor(datetime.now(), "1"))):
+        r = client.get("/proyectos", params={"orden": orden, "cursor": forjado}, headers={"x-user-mail": dueño})
+        assert r.status_code == 400
+
+    r = client.get("/proyectos", headers={"x-user-mail": "nadie@test.com"})
+    assert r.status_code == 404
+    assert r.json()["error"] == "Correo de usuario no encontrado"
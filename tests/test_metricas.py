@@ -0,0 +1,85 @@
+import logging
+import uuid
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from main import app
+from metricas import registro_metricas, consultas_de_server_timing, RegistroMetricas, Medicion, MiddlewareMetricas
+
+client = TestClient(app)
+
+
+def _timing(respuesta) -> dict:
+    entradas = {}
+    for entrada in respuesta.headers["server-timing"].split(", "):
+        nombre, *params = entrada.split(";")
+        entradas[nombre] = float(next(p for p in params if p.startswith("dur=")).split("=")[1])
+    return entradas
+
+
+def test_server_timing_por_request():
+    correo = f"metricas-{uuid.uuid4().hex[:8]}@test.com"
+    r = client.post("/register", json={"correo": correo, "nombre": "Metricas", "contraseña": "1234"})
+    assert r.status_code == 201
+    assert _timing(r)["bcrypt"] > 0
+
+    r = client.post("/login", json={"correo": correo, "contraseña": "1234"})
+    timing = _timing(r)
+    assert timing["bcrypt"] > 0 and timing["db"] > 0
+    assert timing["total"] >= timing["bcrypt"]
+
+    pid = client.post("/proyectos", json={"nombre": "M"}, headers={"x-user-mail": correo}).json()["id_proyecto"]
+    r = client.get(f"/proyectos/{pid}/tareas", headers={"x-user-mail": correo})
+    assert r.status_code == 200
+    assert consultas_de_server_timing(r.headers["server-timing"]) >= 1
+    assert _timing(r)["serializacion"] > 0
+
+    # Sin base: cero consultas
+    r = client.get("/")
+    assert consultas_de_server_timing(r.headers["server-timing"]) == 0
+
+
+def test_metrics_agrupa_por_plantilla_de_ruta():
+    correo = f"metricas-{uuid.uuid4().hex[:8]}@test.com"
+    client.post("/register", json={"correo": correo, "nombre": "Metricas", "contraseña": "1234"})
+    for _ in range(2):
+        pid = client.post("/proyectos", json={"nombre": "M"}, headers={"x-user-mail": correo}).json()["id_proyecto"]
+        client.get(f"/proyectos/{pid}/tareas", headers={"x-user-mail": correo})
+    client.get("/no-existe")
+
+    r = client.get("/metrics")
+    assert r.status_code == 200 and r.headers["content-type"].startswith("text/plain")
+    texto = r.text
+    assert "# TYPE http_request_db_queries histogram" in texto
+    assert 'http_request_duration_seconds_count{method="GET",route="/proyectos/{proyecto_id}/tareas"}' in texto
+    assert f"/proyectos/{pid}/tareas" not in texto
+    assert 'http_requests_total{method="GET",route="desconocida",status="404"}' in texto
+
+
+def test_presupuesto_de_consultas(caplog):
+    registro = RegistroMetricas(presupuesto=25, presupuestos={("GET", "/proyectos"): 2})
+    medicion = Medicion()
+    medicion.consultas = 3
+    with caplog.at_level(logging.WARNING, logger="metricas"):
+        registro.observar("GET", "/proyectos", 200, medicion, 0.01)
+        registro.observar("GET", "/proyectos/{proyecto_id}/tareas", 200, medicion, 0.01)
+    assert [r.getMessage() for r in caplog.records] == [
+        "Presupuesto de consultas excedido en GET /proyectos: 3 consultas (presupuesto 2)"
+    ]
+    texto = registro.exportar()
+    assert 'http_request_query_budget_exceeded_total{method="GET",route="/proyectos"} 1' in texto
+    assert 'http_request_db_queries_bucket{method="GET",route="/proyectos",le="3"} 1' in texto
+    assert 'http_request_db_queries_bucket{method="GET",route="/proyectos",le="2"} 0' in texto
+
+
+def test_excepciones_se_registran_como_500():
+    registro = RegistroMetricas()
+    app_error = FastAPI()
+    app_error.add_middleware(MiddlewareMetricas, registro=registro, activo=True)
+
+    @app_error.get("/falla")
+    def falla():
+        raise RuntimeError("falla")
+
+    r = TestClient(app_error, raise_server_exceptions=False).get("/falla")
+    assert r.status_code == 500
+    assert 'http_requests_total{method="GET",route="/falla",status="500"} 1' in registro.exportar()
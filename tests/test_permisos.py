@@ -0,0 +1,32 @@
+import time
+from models import RolProyecto
+from permisos import CacheMembresias, Membresia
+
+def _membresia(correo, proyecto_id):
+    return Membresia(id_usuario=1, nombre="X", correo=correo, id_proyecto=proyecto_id, id_dueño=2, rol=RolProyecto.lector)
+
+def test_cache_expira_por_ttl():
+    cache = CacheMembresias(ttl=0.05, max_entradas=10)
+    cache.set(_membresia("a@test.com", 1))
+    assert cache.get("a@test.com", 1).rol == RolProyecto.lector
+    time.sleep(0.06)
+    assert cache.get("a@test.com", 1) is None
+
+def test_cache_descarta_la_menos_usada():
+    cache = CacheMembresias(ttl=60, max_entradas=2)
+    cache.set(_membresia("a@test.com", 1))
+    cache.set(_membresia("b@test.com", 1))
+    cache.get("a@test.com", 1)
+    cache.set(_membresia("c@test.com", 2))
+    assert cache.get("b@test.com", 1) is None
+    assert cache.get("a@test.com", 1) is not None
+
+def test_invalidar_proyecto():
+    cache = CacheMembresias(ttl=60, max_entradas=10)
+    cache.set(_membresia("a@test.com", 1))
+    cache.set(_membresia("a@test.com", 2))
+    cache.invalidar_proyecto(1)
+    assert cache.get("a@test.com", 1) is None
+    assert cache.get("a@test.com", 2) is not None
+    m = _membresia("a@test.com", 2)
+    assert m.es_integrante and not m.puede_editar and not m.es_dueño
@@ -0,0 +1,61 @@
+import time
+import pytest
+from fastapi.testclient import TestClient
+from auth import hashing_pool
+from db import pool_stats
+from main import app
+from rate_limit import AlmacenMemoria, limitador
+import rate_limit
+
+client = TestClient(app)
+
+@pytest.fixture(autouse=True)
+def _limpiar():
+    limitador.almacen.limpiar()
+    yield
+    limitador.almacen.limpiar()
+
+
+def test_token_bucket_recarga():
+    almacen = AlmacenMemoria()
+    assert [almacen.consumir("k", 3, 10) for _ in range(3)] == [0, 0, 0]
+    espera = almacen.consumir("k", 3, 10)
+    assert 0 < espera <= 0.1
+    time.sleep(0.12)
+    assert almacen.consumir("k", 3, 10) == 0
+    # Las claves son independientes
+    assert almacen.consumir("otra", 3, 10) == 0
+
+def test_almacen_acotado():
+    almacen = AlmacenMemoria(max_claves=10)
+    for i in range(50):
+        almacen.consumir(f"k{i}", 1, 1)
+    assert len(almacen) == 10
+
+
+def test_login_rechaza_sin_tocar_bd_ni_bcrypt(monkeypatch):
+    monkeypatch.setattr(rate_limit, "RATE_LIMIT_CORREO_CAPACIDAD", 3)
+    cuerpo = {"correo": "Victima@Test.com", "contraseña": "x"}
+    for _ in range(3):
+        assert client.post("/login", json=cuerpo).status_code != 429
+
+    hashes = hashing_pool.stats()["completadas"]
+    checkouts = pool_stats.snapshot()["checkouts"]
+    # El correo se normaliza: mayúsculas y espacios cuentan para el mismo bucket
+    r = client.post("/login", json={"correo": " victima@test.com ", "contraseña": "x"})
+    assert r.status_code == 429
+    assert int(r.headers["Retry-After"]) >= 1
+    assert r.json()["error"] == "Demasiados intentos, intente más tarde"
+    assert hashing_pool.stats()["completadas"] == hashes
+    assert pool_stats.snapshot()["checkouts"] == checkouts
+
+    # Otro correo desde la misma IP sigue pudiendo intentar
+    assert client.post("/login", json={"correo": "otro@test.com", "contraseña": "x"}).status_code != 429
+
+def test_limite_por_ip(monkeypatch):
+    monkeypatch.setattr(rate_limit, "RATE_LIMIT_IP_CAPACIDAD", 2)
+    for i in range(2):
+        assert client.post("/reset-password", json={"correo": f"ip{i}@test.com", "token": None, "nueva_contraseña": "x"}).status_code != 429
+    r = client.post("/reset-password", json={"correo": "ip9@test.com", "token": None, "nueva_contraseña": "x"})
+    assert r.status_code == 429
+    assert client.get("/internal/rate-limit").json()["rechazadas"] >= 1
@@ -0,0 +1,176 @@
+import smtplib
+import time
+from datetime import datetime, timedelta
+import pytest
+from sqlalchemy import create_engine, insert, select, func, text
+from sqlalchemy.orm import sessionmaker
+from models import Usuario, Tarea, TareaResponsable, EstadoTarea, RecordatorioEnviado
+from migraciones import migrar
+import recordatorios
+from correo import EnvioDirecto
+from test_correo import _levantar
+
+AHORA = datetime(2025, 3, 10, 12, 0)
+
+
+@pytest.fixture
+def sesiones(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'recordatorios.db'}")
+    migrar(engine)
+    with engine.begin() as conn:
+        conn.execute(insert(Usuario), [
+            {"id": 1, "correo": "ana@test.com", "nombre": "Ana", "contrasena": "x"},
+            {"id": 2, "correo": "beto@test.com", "nombre": "Beto", "contrasena": "x"},
+        ])
+        conn.execute(text('INSERT INTO proyectos (id, nombre, "id_dueño") VALUES (1, \'Web\', 1)'))
+        tareas = [
+            (1, "Vence en una hora", AHORA + timedelta(hours=1), EstadoTarea.pendiente),
+            (2, "Vencida ayer", AHORA - timedelta(days=1), EstadoTarea.en_progreso),
+            (3, "Completada", AHORA + timedelta(hours=2), EstadoTarea.completado),
+            (4, "Fuera de la ventana", AHORA + timedelta(days=5), EstadoTarea.pendiente),
+            (5, "Vencida hace un mes", AHORA - timedelta(days=30), EstadoTarea.pendiente),
+            (6, "Sin responsables", AHORA + timedelta(hours=3), EstadoTarea.pendiente),
+            (7, "Vence mañana", AHORA + timedelta(hours=20), EstadoTarea.sin_asignar),
+        ]
+        conn.execute(insert(Tarea), [
+            {"id": i, "id_proyecto": 1, "titulo": t, "fecha_limite": f, "estado": e} for i, t, f, e in tareas
+        ])
+        conn.execute(insert(TareaResponsable), [
+            {"id_tarea": 1, "id_usuario": 1}, {"id_tarea": 2, "id_usuario": 1}, {"id_tarea": 3, "id_usuario": 1},
+            {"id_tarea": 4, "id_usuario": 1}, {"id_tarea": 5, "id_usuario": 1},
+            {"id_tarea": 1, "id_usuario": 2}, {"id_tarea": 7, "id_usuario": 2},
+        ])
+    yield sessionmaker(bind=engine)
+    engine.dispose()
+
+class EnvioFalso:
+    def __init__(self, correos, error=None):
+        self.correos = correos
+        self.error = error
+
+    def __call__(self, to, subject, body):
+        if self.error:
+            raise self.error
+        self.correos.append((to, subject, body))
+
+    def cerrar(self):
+        pass
+
+
+@pytest.fixture
+def enviados(monkeypatch):
+    correos = []
+    monkeypatch.setattr(recordatorios, "EnvioDirecto", lambda: EnvioFalso(correos))
+    return correos
+
+
+def test_un_resumen_por_responsable_en_lotes(sesiones, enviados):
+    resultado = recordatorios.barrer(sesiones, ahora=AHORA, lote=1)
+    # Ana y Beto tienen avisos pendientes: un usuario por lote
+    assert resultado["usuarios"] == 2
+    assert resultado["lotes"] == 2
+    assert resultado["resumenes_enviados"] == 2
+
+    por_correo = {to: (asunto, cuerpo) for to, asunto, cuerpo in enviados}
+    asunto, cuerpo = por_correo["ana@test.com"]
+    assert asunto == "Recordatorio de tareas: 1 próxima a vencer y 1 vencida"
+    assert "[Web] Vencida ayer" in cuerpo and "[Web] Vence en una hora" in cuerpo
+    for excluida in ("Completada", "Fuera de la ventana", "hace un mes"):
+        assert excluida not in cuerpo
+    asunto, cuerpo = por_correo["beto@test.com"]
+    assert asunto == "Recordatorio de tareas: 2 próximas a vencer"
+
+
+def test_barrido_idempotente(sesiones, enviados):
+    recordatorios.barrer(sesiones, ahora=AHORA)
+    assert recordatorios.barrer(sesiones, ahora=AHORA)["resumenes_enviados"] == 0
+    assert len(enviados) == 2
+    with sesiones() as db:
+        assert db.execute(select(func.count()).select_from(RecordatorioEnviado)).scalar() == 4
+
+    # Pasada la fecha límite corresponde el aviso de vencida, una sola vez
+    despues = AHORA + timedelta(hours=2)
+    assert recordatorios.barrer(sesiones, ahora=despues)["resumenes_enviados"] == 2
+    assert recordatorios.barrer(sesiones, ahora=despues)["resumenes_enviados"] == 0
+    assert "1 vencida" in enviados[-1][1]
+
+
+def test_fecha_limite_nueva_genera_otro_recordatorio(sesiones, enviados):
+    recordatorios.barrer(sesiones, ahora=AHORA)
+    with sesiones() as db:
+        db.get(Tarea, 7).fecha_limite = AHORA + timedelta(hours=10)
+        db.commit()
+    recordatorios.barrer(sesiones, ahora=AHORA)
+    assert enviados[-1][0] == "beto@test.com"
+    assert "Vence mañana" in enviados[-1][2] and "Vence en una hora" not in enviados[-1][2]
+
+
+def test_error_de_envio_no_registra(sesiones):
+    envio = EnvioFalso([], error=smtplib.SMTPServerDisconnected("sin conexión"))
+    assert recordatorios.barrer(sesiones, ahora=AHORA, envio=envio)["errores"] == 2
+    with sesiones() as db:
+        assert db.execute(select(func.count()).select_from(RecordatorioEnviado)).scalar() == 0
+
+
+def test_se_registra_solo_lo_que_el_servidor_smtp_acepto(sesiones):
+    # El primer resumen es rechazado por el servidor: queda sin registrar y sale en el barrido siguiente
+    servidor = _levantar(rechazar_primeros=1)
+    puerto = servidor.server_address[1]
+    envio = EnvioDirecto(conectar=lambda: smtplib.SMTP("127.0.0.1", puerto), remitente="app@test.com")
+    try:
+        assert recordatorios.barrer(sesiones, ahora=AHORA, envio=envio)["resumenes_enviados"] == 1
+        assert len(servidor.mensajes) == 1
+        assert recordatorios.barrer(sesiones, ahora=AHORA, envio=envio)["resumenes_enviados"] == 1
+        assert len(servidor.mensajes) == 2
+        assert recordatorios.barrer(sesiones, ahora=AHORA, envio=envio)["resumenes_enviados"] == 0
+    finally:
+        envio.cerrar()
+        servidor.shutdown()
+
+
+def test_el_envio_ocurre_con_el_reclamo_ya_confirmado(sesiones):
+    vistos = []
+
+    def envio(to, subject, body):
+        # Otra sesión ve el reclamo: no queda una transacción abierta durante el envío SMTP
+        with sesiones() as db:
+            vistos.append(db.execute(
+                select(func.count()).select_from(RecordatorioEnviado).where(~RecordatorioEnviado.enviado)
+            ).scalar())
+            db.execute(text("UPDATE usuarios SET intentos_fallidos = 0"))
+            db.commit()
+
+    assert recordatorios.barrer(sesiones, ahora=AHORA, envio=envio)["resumenes_enviados"] == 2
+    assert vistos == [2, 2]
+    with sesiones() as db:
+        assert db.execute(select(func.count()).select_from(RecordatorioEnviado).where(~RecordatorioEnviado.enviado)).scalar() == 0
+
+
+def test_reclamo_abandonado_se_retoma(sesiones, enviados):
+    with sesiones() as db:
+        db.execute(insert(RecordatorioEnviado), [
+            # Reclamo viejo de un worker caído y reclamo reciente de otro worker en curso
+            {"id_tarea": 1, "id_usuario": 2, "tipo": "proxima", "fecha_limite": AHORA + timedelta(hours=1),
+             "fecha_envio": AHORA - timedelta(hours=1), "enviado": False},
+            {"id_tarea": 2, "id_usuario": 1, "tipo": "vencida", "fecha_limite": AHORA - timedelta(days=1),
+             "fecha_envio": AHORA - timedelta(minutes=5), "enviado": False},
+        ])
+        db.commit()
+    recordatorios.barrer(sesiones, ahora=AHORA, reclamo_minutos=30)
+    por_correo = {to: cuerpo for to, _, cuerpo in enviados}
+    assert "Vence en una hora" in por_correo["beto@test.com"]
+    assert "Vencida ayer" not in por_correo["ana@test.com"]
+
+
+def test_programador_periodico():
+    llamadas = []
+    programador = recordatorios.ProgramadorRecordatorios(
+        barrido=lambda: llamadas.append(1) or {"resumenes_enviados": 1}, intervalo=0.05, activo=True
+    )
+    programador.iniciar()
+    time.sleep(0.3)
+    programador.detener()
+    stats = programador.stats()
+    assert not stats["corriendo"]
+    assert stats["barridos"] == len(llamadas) >= 2
+    assert stats["resumenes_enviados"] == stats["barridos"]
@@ -0,0 +1,43 @@
+import asyncio
+import json
+from datetime import datetime
+from typing import List
+import pytest
+from fastapi.responses import JSONResponse
+from fastapi.routing import serialize_response
+from fastapi.utils import create_model_field
+from schemas import (
+    ProyectoUsuarioInfo, TareaResponse, IntegranteResponse,
+    ProyectoUsuarioFila, TareaFila, IntegranteFila,
+    ProyectosUsuarioAdapter, TareasAdapter, IntegrantesAdapter,
+)
+from serializacion import RespuestaLista
+
+CASOS = [
+    (ProyectoUsuarioInfo, ProyectoUsuarioFila, ProyectosUsuarioAdapter, [
+        {"id": 1, "nombre_proyecto": "P", "descripcion": None, "fecha_finalizacion": datetime(2025, 5, 1, 12, 30), "rol_usuario": "dueño",
+         "tareas_por_estado": {"pendiente": 2, "completado": 1}, "total_tareas": 3},
+    ]),
+    (TareaResponse, TareaFila, TareasAdapter, [
+        {"id": 1, "id_proyecto": 2, "titulo": "Título ñ", "descripcion": "d", "estado": "en progreso",
+         "fecha_creacion": datetime(2025, 1, 1, 8, 0, 0, 123456), "fecha_limite": None,
+         "responsables": [{"id": 3, "nombre": "Ana"}]},
+        {"id": 2, "id_proyecto": 2, "titulo": "T", "descripcion": None, "estado": "pendiente",
+         "fecha_creacion": datetime(2025, 1, 2), "fecha_limite": datetime(2025, 2, 1), "responsables": []},
+    ]),
+    (IntegranteResponse, IntegranteFila, IntegrantesAdapter, [
+        {"id_usuario": 1, "nombre": "Ana", "correo": "ana@test.com", "rol": "editor"},
+    ]),
+]
+
+
+@pytest.mark.parametrize("modelo, fila, adapter, datos", CASOS)
+def test_misma_salida_que_response_model(modelo, fila, adapter, datos):
+    # Las filas deben reflejar el response_model campo a campo
+    assert list(fila.__annotations__) == list(modelo.model_fields)
+    campo = create_model_field(name="r", type_=List[modelo], mode="serialization")
+    esperado = JSONResponse(asyncio.run(serialize_response(field=campo, response_content=datos))).body
+    r = RespuestaLista(adapter, datos, headers={"X-Next-Cursor": "abc"})
+    assert json.loads(r.body) == json.loads(esperado)
+    assert r.headers["content-type"] == "application/json"
+    assert r.headers["x-next-cursor"] == "abc"
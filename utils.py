@@ -1,23 +1,79 @@
-from db import SessionLocal
-import os, smtplib
-from email.mime.text import MIMEText
-from dotenv import load_dotenv
+from db import SessionLocal, AsyncSessionLocal, DB_ASYNC, iniciar_engine
+from sqlalchemy.dialects import postgresql, sqlite
+from starlette.concurrency import run_in_threadpool
+import functools
+from correo import cola_correo
 
 
-def get_db():
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
+# iniciar_engine() es un chequeo trivial una vez creado el motor; cubre el uso sin lifespan
+if DB_ASYNC:
+    async def get_db():
+        iniciar_engine()
+        async with AsyncSessionLocal() as db:
+            yield db
+else:
+    def get_db():
+        iniciar_engine()
+        db = SessionLocal()
+        try:
+            yield db
+        finally:
+            db.close()
+
+
+async def run_db(db, fn, *args):
+    # Para endpoints async que necesitan la base: fn(session, *args) sin bloquear el event loop
+    if DB_ASYNC:
+        return await db.run_sync(fn, *args)
+    return await run_in_threadpool(fn, db, *args)
+
+
+def db_endpoint(fn):
+    # En modo async el cuerpo del endpoint corre sobre la AsyncSession con run_sync:
+    # el código sigue siendo el mismo pero no ocupa un hilo del threadpool mientras espera a la base
+    if not DB_ASYNC:
+        return fn
+
+    @functools.wraps(fn)
+    async def wrapper(*args, **kwargs):
+        db = kwargs["db"]
+        return await db.run_sync(lambda session: fn(*args, **{**kwargs, "db": session}))
+
+    return wrapper
+
+
+# Tamaño de lote para listas IN e inserts masivos (límite de parámetros del driver)
+TAMAÑO_LOTE = 1000
+
+def en_lotes(items, tamaño: int = TAMAÑO_LOTE):
+    items = list(items)
+    for i in range(0, len(items), tamaño):
+        yield items[i:i + tamaño]
+
+
+def insert_ignorando_conflictos(db, modelo, filas, columnas_conflicto, returning):
+    # INSERT ... VALUES (...), (...) ON CONFLICT DO NOTHING RETURNING, un statement por lote.
+    # Devuelve solo las filas efectivamente insertadas
+    dialecto = db.get_bind().dialect.name
+    if dialecto == "postgresql":
+        insert = postgresql.insert
+    elif dialecto == "sqlite":
+        insert = sqlite.insert
+    else:
+        raise NotImplementedError(f"Insert masivo no soportado para '{dialecto}'")
+
+    insertadas = []
+    for lote in en_lotes(filas):
+        stmt = (
+            insert(modelo)
+            .values(lote)
+            .on_conflict_do_nothing(index_elements=columnas_conflicto)
+            .returning(*returning)
+        )
+        insertadas.extend(db.execute(stmt).all())
+    return insertadas
 
 
 def send_email(to, subject, body):
-    load_dotenv()
-    msg = MIMEText(body)
-    msg["Subject"] = subject
-    msg["From"] = os.getenv("EMAIL_USER")
-    msg["To"] = to
-    with smtplib.SMTP_SSL("smtp.gmail.com", 465) as server:
-        server.login(os.getenv("EMAIL_USER"), os.getenv("EMAIL_PASS"))
-        server.send_message(msg)
+    # Se encola y lo envía el worker de correo.py reutilizando la conexión SMTP
+    cola_correo.enviar(to, subject, body)